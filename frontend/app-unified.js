@@ -96,7 +96,7 @@ const initializeAuth = () => {
 };
 
 // React hooks
-const { useState, useEffect, useCallback } = React;
+const { useState, useEffect, useCallback, useRef } = React;
 
 // Utility functions
 const formatDate = (date) => {
@@ -384,18 +384,56 @@ const TodoApp = () => {
     const [todos, setTodos] = useState([]);
     const [loading, setLoading] = useState(false);
     const [filter, setFilter] = useState('all');
+    // Server watermark from the last sync; later loads fetch only changes
+    const syncWatermark = useRef(null);
 
     useEffect(() => {
         if (auth.user) {
+            syncWatermark.current = null;
             loadTodos();
+            window.addEventListener('focus', loadTodos);
+            return () => window.removeEventListener('focus', loadTodos);
         }
     }, [auth.user]);
 
     const loadTodos = async () => {
         try {
-            setLoading(true);
-            const response = await apiCall('/todos');
-            setTodos(response.todos || []);
+            if (!syncWatermark.current) {
+                setLoading(true);
+                const response = await apiCall('/todos');
+                setTodos(response.todos || []);
+                syncWatermark.current = response.watermark;
+                return;
+            }
+
+            // Delta sync: apply changed todos and delete tombstones. The
+            // server's watermark trails its read, so syncs overlap and the
+            // same todo may come back again; todos are replaced by id.
+            // Pages after the first are read later, so the first page's
+            // watermark is the one that is safe to keep.
+            let cursor = null;
+            let nextWatermark = null;
+            do {
+                const params = new URLSearchParams({ since: syncWatermark.current });
+                if (cursor) params.set('cursor', cursor);
+                const response = await apiCall(`/todos?${params}`);
+                if (response.reset) {
+                    syncWatermark.current = null;
+                    return loadTodos();
+                }
+
+                const changed = new Map((response.todos || []).map(todo => [todo.id, todo]));
+                const deleted = new Set(response.deleted || []);
+                setTodos(prev => [
+                    ...prev.filter(todo => !changed.has(todo.id) && !deleted.has(todo.id)),
+                    ...changed.values()
+                ]);
+                nextWatermark = nextWatermark || response.watermark;
+                cursor = response.nextCursor;
+            } while (cursor);
+            if (nextWatermark) {
+                syncWatermark.current = nextWatermark;
+            }
         } catch (error) {
             console.error('❌ Failed to load todos:', error);
         } finally {
@@ -152,6 +152,10 @@ resource "aws_api_gateway_integration" "ai_extract_options_integration" {
   http_method = aws_api_gateway_method.ai_extract_options.http_method
 
   type = "MOCK"
+
+  # Keep the mock template working now that */* is a binary media type
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = jsonencode({
       statusCode = 200
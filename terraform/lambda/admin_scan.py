@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Parallel segmented scan of the todos table for exports and backfills
+
+Splits the table into --segments Scan segments (Segment/TotalSegments)
+and works through them on a pool of --workers threads, handing every item
+to a transform. Throttled pages are retried with a backoff shared by all
+workers, progress is checkpointed after every page so an interrupted run
+resumes where it stopped, and throughput is reported while it runs.
+
+    cd terraform/lambda
+    # Count items in the deployed table
+    PYTHONPATH=gemini_extractor python admin_scan.py --table todos-table --transform count
+    # Rebuild every user's stats item, resumable
+    PYTHONPATH=gemini_extractor python admin_scan.py --table todos-table --transform repair-stats \\
+        --checkpoint repair.json
+    # Export the whole table as NDJSON
+    PYTHONPATH=gemini_extractor python admin_scan.py --table todos-table --transform export --output todos.ndjson
+    # Move todos completed over 90 days ago to the archive bucket (run daily)
+    TODOS_ARCHIVE_BUCKET=todo-archive PYTHONPATH=gemini_extractor python admin_scan.py \\
+        --table todos-table --transform archive --archive-after-days 90
+    # Shorten long rank keys (and rank unranked todos once the rank index exists)
+    TODOS_RANK_INDEX=user-rank-index PYTHONPATH=gemini_extractor python admin_scan.py \\
+        --table todos-table --transform rebalance-ranks
+    # Fill open_due_date on existing todos, then set TODOS_OPEN_DUE_INDEX on the Lambda
+    PYTHONPATH=gemini_extractor python admin_scan.py --table todos-table --transform backfill-open-due
+    # Try it against the in-memory stand-in from local_dynamodb.py
+    PYTHONPATH=gemini_extractor python admin_scan.py --local-users 50 --local-todos 200 --transform count
+
+Built-in transforms: count, export, repair-stats, reindex-search, reshard,
+archive, rebalance-ranks and backfill-open-due. Any other callable taking one item can be plugged in as
+package.module:name. A page that was being processed when a run stopped is processed again on
+resume, so transforms should be idempotent.
+"""
+
+import abc
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+# index.py reads its configuration at import time
+os.environ.setdefault('DYNAMODB_TABLE', 'todos-table')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+THROTTLING_ERRORS = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+}
+
+
+class AdaptiveBackoff:
+    """
+    Delay between Scan requests shared by all workers
+
+    Every throttled request doubles the delay (up to max_delay) and every
+    successful page halves it again, so the pool settles just under the
+    throughput the table allows instead of each worker hammering it.
+    """
+
+    def __init__(self, base_delay=0.05, max_delay=5.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.delay = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            delay = self.delay
+        if delay:
+            time.sleep(random.uniform(delay / 2, delay))
+
+    def throttled(self):
+        with self.lock:
+            self.delay = min(self.max_delay, max(self.base_delay, self.delay * 2))
+
+    def succeeded(self):
+        with self.lock:
+            self.delay = self.delay / 2 if self.delay > self.base_delay else 0.0
+
+
+class Checkpoint:
+    """
+    Per-segment scan position persisted as JSON after every page
+
+    The file records the segment count it was made for; resuming with a
+    different count would skip or repeat items, so it is refused.
+    """
+
+    def __init__(self, path, total_segments):
+        self.path = path
+        self.total_segments = total_segments
+        self.segments = {}  # segment -> {'last_key', 'done', 'items'}
+        self.lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as checkpoint_file:
+                state = json.load(checkpoint_file, parse_float=Decimal)
+            if state['total_segments'] != total_segments:
+                raise SystemExit(f'{path} was written for {state["total_segments"]} segments, '
+                                 f'not {total_segments}; pass --restart to discard it')
+            self.segments = {int(segment): position for segment, position in state['segments'].items()}
+
+    def position(self, segment):
+        with self.lock:
+            return dict(self.segments.get(segment, {'last_key': None, 'done': False, 'items': 0}))
+
+    def save(self, segment, last_key, items):
+        with self.lock:
+            self.segments[segment] = {'last_key': last_key, 'done': last_key is None, 'items': items}
+            if not self.path:
+                return
+            temporary_path = self.path + '.tmp'
+            with open(temporary_path, 'w') as checkpoint_file:
+                json.dump({'total_segments': self.total_segments, 'segments': self.segments},
+                          checkpoint_file, default=json_default)
+            os.replace(temporary_path, self.path)
+
+
+class Progress:
+    """Thread-safe counters behind the periodic and final throughput report"""
+
+    def __init__(self, total_segments):
+        self.total_segments = total_segments
+        self.started = time.perf_counter()
+        self.items = 0
+        self.pages = 0
+        self.throttled = 0
+        self.segments_done = 0
+        self.lock = threading.Lock()
+
+    def page(self, items):
+        with self.lock:
+            self.items += items
+            self.pages += 1
+
+    def throttle(self):
+        with self.lock:
+            self.throttled += 1
+
+    def segment_done(self):
+        with self.lock:
+            self.segments_done += 1
+
+    def line(self):
+        with self.lock:
+            elapsed = time.perf_counter() - self.started
+            return (f'{elapsed:7.1f}s items={self.items} ({self.items / max(elapsed, 1e-9):.0f}/s) '
+                    f'pages={self.pages} throttled={self.throttled} '
+                    f'segments={self.segments_done}/{self.total_segments}')
+
+
+def json_default(value):
+    """Encode DynamoDB Decimals and sets for checkpoints and exports"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def is_throttling(error):
+    return getattr(error, 'response', {}).get('Error', {}).get('Code') in THROTTLING_ERRORS
+
+
+def scan_segment(table, segment, total_segments, transform, checkpoint, backoff, progress,
+                 page_size=None, max_retries=10):
+    """
+    Scan one segment to the end, starting from its checkpointed position
+    """
+    position = checkpoint.position(segment)
+    if position['done']:
+        progress.segment_done()
+        return position['items']
+
+    params = {'Segment': segment, 'TotalSegments': total_segments}
+    if page_size:
+        params['Limit'] = page_size
+    last_key = position['last_key']
+    items_done = position['items']
+    while True:
+        if last_key:
+            params['ExclusiveStartKey'] = last_key
+        for attempt in range(max_retries + 1):
+            backoff.wait()
+            try:
+                response = table.scan(**params)
+                break
+            except Exception as e:
+                if not is_throttling(e) or attempt == max_retries:
+                    raise
+                backoff.throttled()
+                progress.throttle()
+        backoff.succeeded()
+
+        items = response.get('Items', [])
+        for item in items:
+            transform(item)
+        items_done += len(items)
+        last_key = response.get('LastEvaluatedKey')
+        checkpoint.save(segment, last_key, items_done)
+        progress.page(len(items))
+        if not last_key:
+            progress.segment_done()
+            return items_done
+
+
+def run_scan(table, transform, total_segments=8, workers=8, checkpoint_path=None, page_size=None,
+             report_every=5.0, report=print):
+    """
+    Scan the whole table in parallel segments, returning the Progress
+
+    Importable for tests and one-off scripts; the CLI is a thin wrapper.
+    """
+    checkpoint = Checkpoint(checkpoint_path, total_segments)
+    backoff = AdaptiveBackoff()
+    progress = Progress(total_segments)
+    finished = threading.Event()
+
+    def reporter():
+        while not finished.wait(report_every):
+            report(progress.line())
+
+    reporter_thread = None
+    if report_every:
+        reporter_thread = threading.Thread(target=reporter, daemon=True)
+        reporter_thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(scan_segment, table, segment, total_segments, transform,
+                                   checkpoint, backoff, progress, page_size)
+                       for segment in range(total_segments)]
+            for future in futures:
+                future.result()
+    finally:
+        finished.set()
+        if reporter_thread:
+            reporter_thread.join()
+        close = getattr(transform, 'close', None)
+        if close:
+            close()
+    report(progress.line())
+    return progress
+
+
+# Transforms ---------------------------------------------------------------
+
+def is_todo_item(handler_module, item):
+    """Skip the per-user bookkeeping, search and recurrence partitions"""
+    user_id = item.get('user_id', '')
+    return not (user_id.endswith(handler_module.META_USER_SUFFIX)
+                or user_id.endswith(handler_module.SEARCH_USER_SUFFIX)
+                or user_id.endswith(handler_module.RECURRENCE_USER_SUFFIX))
+
+
+class CountItems:
+    """Count items by kind; useful as a dry run"""
+
+    def __init__(self, handler_module, report=print):
+        self.handler_module = handler_module
+        self.report = report
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        if not is_todo_item(self.handler_module, item):
+            kind = 'bookkeeping'
+        elif item.get('deleted'):
+            kind = 'tombstones'
+        else:
+            kind = 'todos'
+        with self.lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+
+    def close(self):
+        self.report(' '.join(f'{kind}={count}' for kind, count in sorted(self.counts.items())))
+
+
+class ExportItems:
+    """Append every live todo, as stored, to an NDJSON file"""
+
+    def __init__(self, handler_module, output):
+        self.handler_module = handler_module
+        self.output = open(output, 'a', encoding='utf-8')
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        if not is_todo_item(self.handler_module, item) or item.get('deleted'):
+            return
+        line = json.dumps(item, default=json_default) + '\n'
+        with self.lock:
+            self.output.write(line)
+
+    def close(self):
+        self.output.close()
+
+
+class EachUser(abc.ABC):
+    """
+    Run a per-user job once for every user that owns a todo
+
+    Subclasses implement run(user_id).
+    """
+
+    def __init__(self, handler_module):
+        self.handler_module = handler_module
+        self.seen = set()
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        if not is_todo_item(self.handler_module, item):
+            return
+        user_id = self.handler_module.todo_owner(item['user_id'])
+        with self.lock:
+            if user_id in self.seen:
+                return
+            self.seen.add(user_id)
+        self.run(user_id)
+
+    @abc.abstractmethod
+    def run(self, user_id):
+        """Do the job for one user; called from the worker threads"""
+
+
+class RepairStats(EachUser):
+    """Recount the stats item of every user that owns a todo"""
+
+    def run(self, user_id):
+        self.handler_module.repair_todo_stats(user_id)
+
+
+class ArchiveTodos(EachUser):
+    """Move every user's long-completed todos to the archive bucket"""
+
+    def __init__(self, handler_module, older_than_days=None):
+        super().__init__(handler_module)
+        self.older_than_days = handler_module.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+        self.archived = 0
+
+    def run(self, user_id):
+        archived = self.handler_module.archive_completed_todos(user_id, self.older_than_days)
+        with self.lock:
+            self.archived += archived
+
+    def close(self):
+        print(f'archived={self.archived} users={len(self.seen)}')
+
+
+class RebalanceRanks(EachUser):
+    """Rewrite the rank keys of users whose keys got long or are missing"""
+
+    def __init__(self, handler_module):
+        super().__init__(handler_module)
+        self.rewritten = 0
+
+    def run(self, user_id):
+        rewritten = self.handler_module.rebalance_ranks(user_id)
+        with self.lock:
+            self.rewritten += rewritten
+
+    def close(self):
+        print(f'rewritten={self.rewritten} users={len(self.seen)}')
+
+
+class ReindexSearch:
+    """Write the search postings of every live todo"""
+
+    def __init__(self, handler_module):
+        self.handler_module = handler_module
+
+    def __call__(self, item):
+        if not is_todo_item(self.handler_module, item) or item.get('deleted'):
+            return
+        self.handler_module.update_search_postings(self.handler_module.todo_owner(item['user_id']), None, item)
+
+
+class BackfillOpenDue:
+    """
+    Set or clear open_due_date on every live todo so the sparse open-due
+    index holds exactly the incomplete todos with a due date
+
+    Each write is conditioned on the todo's updated_at; a todo edited
+    meanwhile already got the attribute from that edit.
+    """
+
+    def __init__(self, handler_module):
+        self.handler_module = handler_module
+        self.updated = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        if not is_todo_item(self.handler_module, item) or item.get('deleted'):
+            return
+        open_due = self.handler_module.open_due_date(item)
+        if item.get('open_due_date') == open_due:
+            return
+        condition, values = self.handler_module.unchanged_since_read_condition(item)
+        params = {'Key': {'user_id': item['user_id'], 'id': item['id']}, 'ConditionExpression': condition}
+        if open_due:
+            params['UpdateExpression'] = 'SET open_due_date = :open_due_date'
+            values = dict(values, **{':open_due_date': open_due})
+        else:
+            params['UpdateExpression'] = 'REMOVE open_due_date'
+        if values:
+            params['ExpressionAttributeValues'] = values
+        try:
+            self.handler_module.table.update_item(**params)
+        except ClientError as e:
+            if not self.handler_module.is_conditional_check_failure(e):
+                raise
+            return
+        with self.lock:
+            self.updated += 1
+
+    def close(self):
+        print(f'updated={self.updated}')
+
+
+class ReshardTodos:
+    """
+    Move todos to the partition todo_partition assigns them
+
+    Run with the Lambda's TODOS_SHARDED_USERS and TODOS_SHARD_COUNT after
+    flagging users or changing the shard count. For newly sharded users,
+    list them in the Lambda's TODOS_RESHARDING_USERS until the run has
+    finished, so their reads still find todos that were not moved yet.
+
+    The copy is written before the original is deleted, so a rerun
+    finishes an interrupted move. The delete is conditioned on the
+    original's updated_at: if a write changed it in between (the Lambda
+    writes a todo where it finds it, the original first), the fresh
+    original is copied again.
+    """
+
+    def __init__(self, handler_module):
+        self.handler_module = handler_module
+        self.moved = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        if not is_todo_item(self.handler_module, item):
+            return
+        partition = self.handler_module.todo_partition(self.handler_module.todo_owner(item['user_id']), item['id'])
+        if partition == item['user_id']:
+            return
+        key = {'user_id': item['user_id'], 'id': item['id']}
+        for attempt in range(self.handler_module.WRITE_CONFLICT_RETRIES):
+            self.handler_module.table.put_item(Item=dict(item, user_id=partition))
+            # Tombstones are moved too, so unchanged_since_read_condition
+            # (which requires a live todo) does not fit
+            params = {'Key': key}
+            if 'updated_at' in item:
+                params['ConditionExpression'] = 'updated_at = :expected_updated_at'
+                params['ExpressionAttributeValues'] = {':expected_updated_at': item['updated_at']}
+            else:
+                params['ConditionExpression'] = 'attribute_exists(id) AND attribute_not_exists(updated_at)'
+            try:
+                self.handler_module.table.delete_item(**params)
+            except ClientError as e:
+                if not self.handler_module.is_conditional_check_failure(e):
+                    raise
+                item = self.handler_module.table.get_item(Key=key, ConsistentRead=True).get('Item')
+                if item is None:
+                    # Gone meanwhile (an expired tombstone); the copy is
+                    # then the only version
+                    return
+                continue
+            with self.lock:
+                self.moved += 1
+            return
+        print(f"Skipped {key['user_id']}/{key['id']}: changed during every move attempt; rerun to move it")
+
+    def close(self):
+        print(f'moved={self.moved}')
+
+
+def make_transform(name, handler_module, output=None, archive_after_days=None):
+    """Build a built-in transform or import a package.module:callable"""
+    if name == 'count':
+        return CountItems(handler_module)
+    if name == 'export':
+        if not output:
+            raise SystemExit('--transform export needs --output')
+        return ExportItems(handler_module, output)
+    if name == 'repair-stats':
+        return RepairStats(handler_module)
+    if name == 'reindex-search':
+        return ReindexSearch(handler_module)
+    if name == 'reshard':
+        return ReshardTodos(handler_module)
+    if name == 'archive':
+        if handler_module.s3 is None:
+            raise SystemExit('--transform archive needs TODOS_ARCHIVE_BUCKET')
+        return ArchiveTodos(handler_module, archive_after_days)
+    if name == 'rebalance-ranks':
+        return RebalanceRanks(handler_module)
+    if name == 'backfill-open-due':
+        return BackfillOpenDue(handler_module)
+    module_name, _, attribute = name.partition(':')
+    if not attribute:
+        raise SystemExit(f'unknown transform {name!r}; use a built-in or package.module:callable')
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def seed_local_table(handler_module, users, todos_per_user, seed):
+    """Fill a LocalTable through the handler, the way load_test.py does"""
+    from load_test import TABLE_INDEXES, Workload
+    from local_dynamodb import LocalTable, install
+
+    table = LocalTable(name=os.environ['DYNAMODB_TABLE'], indexes=TABLE_INDEXES, seed=seed)
+    install(handler_module, table)
+    handler_module.print = lambda *args, **kwargs: None
+    Workload(users, seed).seed_todos(handler_module, todos_per_user)
+    del handler_module.print
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--table', help='DynamoDB table to scan (default: $DYNAMODB_TABLE)')
+    parser.add_argument('--endpoint-url', help='e.g. http://localhost:8000 for DynamoDB Local')
+    parser.add_argument('--transform', default='count',
+                        help='count, export, repair-stats, reindex-search, reshard, archive, '
+                             'rebalance-ranks, backfill-open-due or package.module:callable')
+    parser.add_argument('--output', help='NDJSON file for --transform export (appended to)')
+    parser.add_argument('--archive-after-days', type=int,
+                        help='archive todos completed this long ago (default: $TODOS_ARCHIVE_AFTER_DAYS or 90)')
+    parser.add_argument('--segments', type=int, default=8, help='Scan TotalSegments')
+    parser.add_argument('--workers', type=int, default=8, help='threads scanning segments concurrently')
+    parser.add_argument('--page-size', type=int, help='Scan Limit per request (default: 1 MB pages)')
+    parser.add_argument('--checkpoint', help='JSON file to resume from and record progress in')
+    parser.add_argument('--restart', action='store_true', help='discard an existing checkpoint')
+    parser.add_argument('--report-every', type=float, default=5.0, help='seconds between progress lines')
+    parser.add_argument('--local-users', type=int,
+                        help='scan an in-memory table seeded with this many users instead of DynamoDB')
+    parser.add_argument('--local-todos', type=int, default=100, help='todos per seeded local user')
+    parser.add_argument('--local-throttle-rate', type=float, default=0.0,
+                        help='fraction of local Scan requests to throttle')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.table:
+        os.environ['DYNAMODB_TABLE'] = args.table
+    if args.checkpoint and args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    import index
+
+    if args.local_users:
+        table = seed_local_table(index, args.local_users, args.local_todos, args.seed)
+        table.throttle_rate = args.local_throttle_rate
+        table.throttle_operations = {'Scan'}
+        from local_s3 import LocalS3, install
+        install(index, LocalS3())
+    else:
+        import boto3
+        resource = boto3.resource('dynamodb', endpoint_url=args.endpoint_url)
+        table = resource.Table(os.environ['DYNAMODB_TABLE'])
+        index.dynamodb = resource
+        index.table = table
+        if index.dynamodb_client is not None:
+            index.dynamodb_client = boto3.client('dynamodb', endpoint_url=args.endpoint_url)
+
+    transform = make_transform(args.transform, index, args.output, args.archive_after_days)
+    run_scan(table, transform, args.segments, args.workers, args.checkpoint, args.page_size, args.report_every)
+
+
+if __name__ == '__main__':
+    main()
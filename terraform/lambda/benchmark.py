@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the todo handler (index.py)
+
+Runs against synthetic data without touching AWS. boto3 must be importable,
+for example by reusing the copy vendored with the AI extractor:
+
+    cd terraform/lambda
+    PYTHONPATH=gemini_extractor python benchmark.py serializer
+    PYTHONPATH=gemini_extractor python benchmark.py data-access
+    PYTHONPATH=gemini_extractor python benchmark.py compression
+    PYTHONPATH=gemini_extractor python benchmark.py storage
+"""
+
+import argparse
+import gzip
+import json
+import math
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+# index.py reads its table name at import time
+os.environ.setdefault('DYNAMODB_TABLE', 'benchmark-todos')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import index  # noqa: E402
+
+CATEGORIES = ['work', 'personal', 'health', 'learning', 'shopping', 'other']
+PRIORITIES = ['low', 'medium', 'high']
+
+
+def make_backend_items(count, user_id='benchmark-user'):
+    """Build `count` todo items shaped like the ones DynamoDB returns"""
+    base_time = datetime(2024, 1, 1)
+    items = []
+    for i in range(count):
+        created = base_time + timedelta(minutes=i)
+        item = {
+            'user_id': user_id,
+            'id': f'{i:08d}-6f1c-4a57-9d0e-3b2f1c9a7e5d',
+            'task': f'Follow up on item {i} from the weekly planning meeting',
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'priority': PRIORITIES[i % len(PRIORITIES)],
+            'completed': i % 3 == 0,
+            'created_at': created.isoformat(),
+            'updated_at': (created + timedelta(hours=1)).isoformat(),
+        }
+        if i % 2 == 0:
+            item['description'] = f'Notes for item {i}: check the shared document and reply to the thread.'
+        if i % 4 == 0:
+            item['due_date'] = (created + timedelta(days=7)).strftime('%Y-%m-%d')
+        items.append(item)
+    return items
+
+
+def time_call(function, repeat):
+    """Return the median wall time of `function` in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def peak_allocation_kb(function):
+    """Return the peak memory traced while running `function`, in KB"""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def legacy_serialize(items):
+    """The pre-encoder read path: format, rebuild every Decimal, then dump"""
+    def convert_decimal_to_number(obj):
+        if isinstance(obj, list):
+            return [convert_decimal_to_number(item) for item in obj]
+        elif isinstance(obj, dict):
+            return {key: convert_decimal_to_number(value) for key, value in obj.items()}
+        elif isinstance(obj, Decimal):
+            return float(obj)
+        return obj
+
+    todos = [index.format_todo_for_frontend(item) for item in items]
+    todos = convert_decimal_to_number(todos)
+    return json.dumps({'todos': todos, 'count': len(todos)})
+
+
+def current_serialize(items):
+    """The read path as get_todos runs it today"""
+    todos = [index.format_todo_for_frontend(item) for item in items]
+    return index.create_success_response({'todos': todos, 'count': len(todos)})['body']
+
+
+def bench_serializer(sizes, repeat):
+    """Latency and peak allocation of the read-path serializer per list size"""
+    print(f"{'todos':>7} {'path':>8} {'ms':>8} {'peak KB':>9}")
+    for size in sizes:
+        items = make_backend_items(size)
+        assert json.loads(legacy_serialize(items)) == json.loads(current_serialize(items))
+        for name, serialize in (('legacy', legacy_serialize), ('current', current_serialize)):
+            elapsed = time_call(lambda: serialize(items), repeat)
+            peak = peak_allocation_kb(lambda: serialize(items))
+            print(f'{size:>7} {name:>8} {elapsed:>8.2f} {peak:>9.0f}')
+
+
+def bench_data_access(sizes, repeat):
+    """Decode + format + serialize cost of resource vs client read paths"""
+    from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+    serializer = TypeSerializer()
+    deserializer = TypeDeserializer()
+
+    def resource_path(wire_items):
+        # What boto3's Table does to every returned item before we see it
+        items = [{name: deserializer.deserialize(value) for name, value in item.items()}
+                 for item in wire_items]
+        return current_serialize(items)
+
+    def client_path(wire_items):
+        return current_serialize([index.from_wire_item(item) for item in wire_items])
+
+    print(f"{'todos':>7} {'layer':>9} {'ms':>8}")
+    for size in sizes:
+        wire_items = [{name: serializer.serialize(value) for name, value in item.items()}
+                      for item in make_backend_items(size)]
+        assert json.loads(resource_path(wire_items)) == json.loads(client_path(wire_items))
+        for name, read_path in (('resource', resource_path), ('client', client_path)):
+            elapsed = time_call(lambda: read_path(wire_items), repeat)
+            print(f'{size:>7} {name:>9} {elapsed:>8.2f}')
+
+
+def bench_compression(sizes, levels, repeat):
+    """Response size and gzip CPU cost per list size and compression level"""
+    print(f"{'todos':>7} {'level':>5} {'raw KB':>9} {'gzip KB':>9} {'base64 KB':>10} {'ratio':>6} {'ms':>8}")
+    for size in sizes:
+        body = current_serialize(make_backend_items(size)).encode('utf-8')
+        for level in levels:
+            compressed = gzip.compress(body, compresslevel=level, mtime=0)
+            elapsed = time_call(lambda: gzip.compress(body, compresslevel=level, mtime=0), repeat)
+            # Lambda returns the body base64-encoded; API Gateway sends the gzip bytes
+            encoded = (len(compressed) + 2) // 3 * 4
+            print(f'{size:>7} {level:>5} {len(body) / 1024:>9.1f} {len(compressed) / 1024:>9.1f} '
+                  f'{encoded / 1024:>10.1f} {len(body) / len(compressed):>6.1f} {elapsed:>8.2f}')
+
+
+def dynamodb_item_size(item):
+    """Item size as DynamoDB bills it: attribute name bytes plus value bytes"""
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode('utf-8'))
+        if isinstance(value, bool):
+            size += 1
+        elif isinstance(value, (int, Decimal)):
+            # About one byte per two significant digits, plus one
+            digits = len(str(abs(int(value))).strip('0')) or 1
+            size += (digits + 1) // 2 + 1
+        else:
+            size += len(str(value).encode('utf-8'))
+    return size
+
+
+def bench_storage(sizes):
+    """Item size and read/write capacity of the full vs compact schema"""
+    print(f"{'todos':>7} {'schema':>8} {'avg B':>7} {'list RCU':>9} {'strong RCU':>11} {'put WCU':>8} {'saved':>6}")
+    for size in sizes:
+        full_items = make_backend_items(size)
+        compact_items = [index.compact_item(item) for item in full_items]
+        assert [index.format_todo_for_frontend(item) for item in full_items] == \
+               [index.format_todo_for_frontend(item) for item in compact_items]
+        baseline = None
+        for name, items in (('full', full_items), ('compact', compact_items)):
+            item_sizes = [dynamodb_item_size(item) for item in items]
+            # A Query is billed on the summed size of the items it reads, per
+            # 4 KB; eventually consistent reads cost half a unit
+            strong_rcu = math.ceil(sum(item_sizes) / 4096)
+            # A write is billed per 1 KB of the item (and the same again for
+            # every ALL-projected index holding it)
+            put_wcu = sum(math.ceil(item_size / 1024) for item_size in item_sizes) / size
+            baseline = baseline or strong_rcu
+            print(f'{size:>7} {name:>8} {sum(item_sizes) / size:>7.0f} {strong_rcu / 2:>9.1f} {strong_rcu:>11} '
+                  f'{put_wcu:>8.1f} {1 - strong_rcu / baseline:>6.0%}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measurement (median is reported)')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    serializer = subparsers.add_parser('serializer', help=bench_serializer.__doc__)
+    serializer.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+
+    data_access = subparsers.add_parser('data-access', help=bench_data_access.__doc__)
+    data_access.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+
+    compression = subparsers.add_parser('compression', help=bench_compression.__doc__)
+    compression.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 5000, 10000])
+    compression.add_argument('--levels', type=int, nargs='+', default=[1, 5, 6, 9])
+
+    storage = subparsers.add_parser('storage', help=bench_storage.__doc__)
+    storage.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+
+    args = parser.parse_args()
+    if args.benchmark == 'serializer':
+        bench_serializer(args.sizes, args.repeat)
+    elif args.benchmark == 'data-access':
+        bench_data_access(args.sizes, args.repeat)
+    elif args.benchmark == 'compression':
+        bench_compression(args.sizes, args.levels, args.repeat)
+    elif args.benchmark == 'storage':
+        bench_storage(args.sizes)
+
+
+if __name__ == '__main__':
+    main()
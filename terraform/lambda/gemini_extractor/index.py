@@ -1,5 +1,6 @@
 import json
 import os
+import base64
 import boto3
 import logging
 import re
@@ -371,8 +372,11 @@ class AITaskExtractor:
 def handler(event, context):
     """Enhanced Lambda handler for AI task extraction"""
     try:
-        # Parse request
-        body = json.loads(event.get('body', '{}'))
+        # Parse request (bodies arrive base64-encoded since the API enables binary media types)
+        raw_body = event.get('body') or '{}'
+        if event.get('isBase64Encoded'):
+            raw_body = base64.b64decode(raw_body).decode('utf-8')
+        body = json.loads(raw_body)
         text_to_extract = body.get('text', '').strip()
         extraction_mode = body.get('mode', 'general')  # general, email, notes
         
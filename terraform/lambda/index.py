@@ -1,61 +1,330 @@
 import json
 import boto3
+from botocore.exceptions import ClientError
 import uuid
-from datetime import datetime
+import base64
+import binascii
+import hashlib
+import gzip
+import zlib
+import random
+import time
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 import os
+import re
+import bisect
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from dateutil.rrule import rrule, rrulestr
 
 # Initialize DynamoDB resource
 dynamodb = boto3.resource('dynamodb')
 table_name = os.environ['DYNAMODB_TABLE']
 table = dynamodb.Table(table_name)
 
+# Read path data access layer: 'resource' goes through the boto3 Table (and
+# its TypeDeserializer/Decimal conversion), 'client' uses the low-level
+# client and decodes the wire format directly into plain Python values
+DATA_ACCESS_MODE = os.environ.get('TODOS_DATA_ACCESS', 'resource')
+dynamodb_client = boto3.client('dynamodb') if DATA_ACCESS_MODE == 'client' else None
+
+# Pagination settings for GET /todos
+DEFAULT_PAGE_SIZE = int(os.environ.get('TODOS_DEFAULT_PAGE_SIZE', '100'))
+MAX_PAGE_SIZE = int(os.environ.get('TODOS_MAX_PAGE_SIZE', '1000'))
+
+# Delta sync settings: deletes leave a tombstone that expires via DynamoDB TTL
+UPDATED_AT_INDEX = os.environ.get('TODOS_UPDATED_AT_INDEX', 'user-updated-at-index')
+TOMBSTONE_TTL_DAYS = int(os.environ.get('TODOS_TOMBSTONE_TTL_DAYS', '30'))
+# The watermark handed to clients trails the time of the read, since a
+# write stamps updated_at with its own clock before it commits
+SYNC_WATERMARK_MARGIN_SECONDS = int(os.environ.get('TODOS_SYNC_WATERMARK_MARGIN_SECONDS', '60'))
+
+# Server-side filtering for GET /todos: indexes the query planner can use
+# instead of reading the whole partition (see plan_todo_query)
+CATEGORY_INDEX = os.environ.get('TODOS_CATEGORY_INDEX', 'user-category-index')
+DUE_DATE_INDEX = os.environ.get('TODOS_DUE_DATE_INDEX', 'user-due-date-index')
+# Sparse user_id+open_due_date index: open_due_date mirrors due_date on
+# incomplete todos only, so completing a todo drops it from the index. Off
+# until existing todos are backfilled (admin_scan.py --transform
+# backfill-open-due); the attribute is maintained either way.
+OPEN_DUE_INDEX = os.environ.get('TODOS_OPEN_DUE_INDEX', '')
+SORT_FIELDS = ('createdAt', 'updatedAt', 'dueDate', 'priority', 'title', 'rank')
+
+# Manual ordering: todos carry a fractional `rank` key (see key_between), so
+# moving one rewrites only that todo. The user_id+rank local secondary
+# index serves sort=rank and finds where new todos are appended; without
+# it rank sorts happen in memory and new todos stay unranked (sorted last)
+# until a move or admin_scan.py --transform rebalance-ranks ranks the list.
+RANK_INDEX = os.environ.get('TODOS_RANK_INDEX', '')
+# Keys grow by about a character per few moves into the same gap; the
+# rebalance job rewrites a user's keys once one gets longer than this
+RANK_REBALANCE_LENGTH = int(os.environ.get('TODOS_RANK_REBALANCE_LENGTH', '12'))
+# Ordered as DynamoDB compares strings (by UTF-8 bytes)
+RANK_DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+# Recurring todos: a todo with a `recurrence` RRULE is a series, expanded
+# into occurrences by GET /todos?from=&to= (see get_todos_in_window). Only
+# completed occurrences are stored, as exception items in the user's
+# recurrence partition keyed by occurrence, then series id.
+RECURRENCE_USER_SUFFIX = '#recur'
+RECURRENCE_MAX_OCCURRENCES = int(os.environ.get('TODOS_RECURRENCE_MAX_OCCURRENCES', '500'))
+RECURRENCE_CACHE_SIZE = int(os.environ.get('TODOS_RECURRENCE_CACHE_SIZE', '256'))
+# Expansion walks a rule from its start, so rules finer than daily are refused
+SUB_DAILY_FREQUENCY = re.compile(r'FREQ=(HOURLY|MINUTELY|SECONDLY)', re.IGNORECASE)
+
+# Frontend field -> (stored attribute, default) for ?fields= projections;
+# mirrors format_todo_for_frontend
+FRONTEND_FIELDS = {
+    'id': ('id', None),
+    'title': ('task', ''),
+    'category': ('category', 'other'),
+    'priority': ('priority', 'medium'),
+    'completed': ('completed', False),
+    'createdAt': ('created_at', ''),
+    'updatedAt': ('updated_at', ''),
+    'description': ('description', ''),
+    'dueDate': ('due_date', ''),
+    'rank': ('rank', ''),
+    'recurrence': ('recurrence', '')
+}
+PRIORITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+
+# Compact storage schema (opt-in): items written while it is on use short
+# attribute names, created_at as integer microseconds since the epoch and
+# priority codes. updated_at, category and due_date keep their names and
+# string values because the secondary indexes are keyed on them (updated_at
+# is also the sync watermark and write condition). Both schemas are read;
+# an item moves to the configured one when it is next rewritten.
+COMPACT_SCHEMA = os.environ.get('TODOS_COMPACT_SCHEMA', 'false').lower() == 'true'
+COMPACT_NAMES = {'task': 't', 'description': 'd', 'priority': 'p', 'created_at': 'c'}
+FULL_NAMES = {compact: attribute for attribute, compact in COMPACT_NAMES.items()}
+PRIORITY_CODES = {'low': 1, 'medium': 2, 'high': 3}
+PRIORITY_NAMES = {code: priority for priority, code in PRIORITY_CODES.items()}
+COMPACT_NAMES_SET = frozenset(FULL_NAMES)
+EPOCH = datetime(1970, 1, 1)
+
+# Response compression: bodies at least this large are gzipped when the
+# client sends Accept-Encoding: gzip
+GZIP_MIN_BYTES = int(os.environ.get('TODOS_GZIP_MIN_BYTES', '4096'))
+GZIP_LEVEL = int(os.environ.get('TODOS_GZIP_LEVEL', '5'))
+
+# Per-user bookkeeping item (list version); kept in its own partition so it
+# never shows up in todo queries
+META_USER_SUFFIX = '#meta'
+META_ITEM_ID = 'meta'
+
+# Warm-container cache of formatted todo lists (0 entries disables it).
+# The todo cap bounds its memory: a formatted todo takes under 1 KB of
+# Python objects, so the default (~20 MB) fits a 128 MB function
+LIST_CACHE_MAX_USERS = int(os.environ.get('TODOS_CACHE_MAX_USERS', '256'))
+LIST_CACHE_MAX_TODOS = int(os.environ.get('TODOS_CACHE_MAX_TODOS', '20000'))
+LIST_CACHE_TTL_SECONDS = float(os.environ.get('TODOS_CACHE_TTL_SECONDS', '60'))
+
+# Idempotency-Key for POST /todos and POST /todos/batch: the first result is
+# recorded in the meta partition until DynamoDB TTL removes it; a claim that
+# never got its result (crashed invocation) lapses after the lock time
+IDEMPOTENCY_ITEM_PREFIX = 'idem#'
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_TTL_HOURS = int(os.environ.get('TODOS_IDEMPOTENCY_TTL_HOURS', '24'))
+IDEMPOTENCY_LOCK_SECONDS = int(os.environ.get('TODOS_IDEMPOTENCY_LOCK_SECONDS', '60'))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('TODOS_IDEMPOTENCY_CACHE_SIZE', '512'))
+
+# Bulk write settings for POST /todos/batch
+BATCH_MAX_OPERATIONS = int(os.environ.get('TODOS_BATCH_MAX_OPERATIONS', '500'))
+BATCH_WRITE_CHUNK_SIZE = 25  # DynamoDB BatchWriteItem hard limit
+BATCH_MAX_RETRIES = int(os.environ.get('TODOS_BATCH_MAX_RETRIES', '5'))
+BATCH_BACKOFF_BASE_SECONDS = 0.05
+BATCH_BACKOFF_MAX_SECONDS = 2.0
+
+# POST /todos/ops runs its operations as TransactWriteItems groups; two
+# items of each group are the combined stats update and the list version
+TRANSACT_MAX_ITEMS = 100  # DynamoDB TransactWriteItems hard limit
+OPS_GROUP_SIZE = TRANSACT_MAX_ITEMS - 2
+
+# Frontend field -> stored attribute for fields a PUT may change
+UPDATABLE_FIELDS = {
+    'title': 'task',
+    'completed': 'completed',
+    'category': 'category',
+    'priority': 'priority',
+    'description': 'description',
+    'dueDate': 'due_date',
+    'recurrence': 'recurrence'
+}
+
+# Materialized counters for GET /todos/stats, kept in the bookkeeping
+# partition next to the list version. Writes that change them re-read the
+# todo and retry this often when it changed in between.
+STATS_ITEM_ID = 'stats'
+STATS_FIELDS = ('completed', 'category', 'dueDate')
+STATS_REMOVE_CHUNK_SIZE = 25  # zero counters removed per conditional UpdateItem
+WRITE_CONFLICT_RETRIES = 3
+
+# Search: an inverted index of title/description tokens with one posting
+# item per (token, todo) in the user's search partition, so prefix lookups
+# are range reads over just the matching postings
+SEARCH_USER_SUFFIX = '#search'
+SEARCH_MARKER_ID = 'search'
+SEARCH_TOKEN_PATTERN = re.compile(r'[^\W_]+')
+SEARCH_MIN_PREFIX = 2
+SEARCH_MAX_TOKEN_LENGTH = 64
+SEARCH_MAX_TOKENS_PER_TODO = int(os.environ.get('TODOS_SEARCH_MAX_TOKENS', '100'))
+SEARCH_TITLE_WEIGHT = 3
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+BATCH_GET_MAX_KEYS = 100  # DynamoDB BatchGetItem hard limit
+
+# NDJSON export: pages are encoded (and compressed) one at a time and the
+# body stops after the page that crosses this size, leaving room below the
+# 6 MB Lambda payload limit for one more 1 MB DynamoDB page and base64
+EXPORT_MAX_BYTES = int(os.environ.get('TODOS_EXPORT_MAX_BYTES', str(3 * 1024 * 1024)))
+
+# Cold storage: todos completed (and untouched) for ARCHIVE_AFTER_DAYS are
+# moved to gzipped NDJSON objects under <user_id>/ in this bucket by
+# admin_scan.py --transform archive; disabled without a bucket
+ARCHIVE_BUCKET = os.environ.get('TODOS_ARCHIVE_BUCKET', '')
+ARCHIVE_AFTER_DAYS = int(os.environ.get('TODOS_ARCHIVE_AFTER_DAYS', '90'))
+s3 = boto3.client('s3') if ARCHIVE_BUCKET else None
+
+# Write sharding for hot users: the todos of the listed users are spread
+# over SHARD_COUNT partitions (user_id#0 .. user_id#N-1, picked by a hash
+# of the todo id) and list reads query all of them concurrently. Changing
+# the shard count strands existing todos; reshard them with admin_scan.py.
+SHARDED_USERS = frozenset(user_id.strip() for user_id in os.environ.get('TODOS_SHARDED_USERS', '').split(',')
+                          if user_id.strip())
+# Newly sharded users whose todos admin_scan.py --transform reshard is still
+# moving out of their unsharded partition. Until it finishes, reads of these
+# users also look there, and a todo still found there is read and written in
+# place (the move copies it and only then deletes the original).
+RESHARDING_USERS = frozenset(user_id.strip() for user_id in os.environ.get('TODOS_RESHARDING_USERS', '').split(',')
+                             if user_id.strip()) & SHARDED_USERS
+SHARD_COUNT = int(os.environ.get('TODOS_SHARD_COUNT', '8'))
+SHARD_READ_WORKERS = int(os.environ.get('TODOS_SHARD_READ_WORKERS', '8'))
+# Range key each index orders by, ahead of id, for merging shard results
+INDEX_RANGE_KEYS = {
+    UPDATED_AT_INDEX: 'updated_at',
+    CATEGORY_INDEX: 'category',
+    DUE_DATE_INDEX: 'due_date',
+    OPEN_DUE_INDEX: 'open_due_date',
+    RANK_INDEX: 'rank'
+}
+
+# Per-request timing breakdown, written to the logs as one CloudWatch
+# Embedded Metric Format line per invocation
+REQUEST_METRICS_ENABLED = os.environ.get('TODOS_REQUEST_METRICS', 'true').lower() == 'true'
+METRICS_NAMESPACE = os.environ.get('TODOS_METRICS_NAMESPACE', 'TodoApp')
+METRIC_PHASES = ('Parse', 'DynamoDB', 'Format', 'Serialize', 'Compress')
+
+# Metrics of the invocation running on this thread (load_test.py drives
+# the handler from several threads)
+request_state = threading.local()
+cold_start = True
+
 def handler(event, context):
     """
     Main Lambda handler for todo operations
     """
+    metrics = start_request_metrics(event)
     try:
         # Get request details
         http_method = event['httpMethod']
         resource_path = event['resource']
-        path_parameters = event.get('pathParameters', {})
-        query_parameters = event.get('queryStringParameters', {})
+        path_parameters = event.get('pathParameters') or {}
+        query_parameters = event.get('queryStringParameters') or {}
         body = event.get('body', '')
         
         # Get user ID from Cognito claims
         user_id = get_user_id_from_event(event)
         
-        # Parse request body if present
+        # Parse request body if present (API Gateway base64-encodes bodies
+        # because binary media types are enabled for compressed responses)
         request_body = {}
         if body:
-            request_body = json.loads(body)
+            with span('Parse'):
+                if event.get('isBase64Encoded'):
+                    body = base64.b64decode(body).decode('utf-8')
+                request_body = json.loads(body)
         
         # Route to appropriate handler
         if resource_path == '/todos':
             if http_method == 'GET':
-                response = get_todos(user_id, query_parameters)
+                response = conditional_get(event, user_id,
+                                           lambda list_version: get_todos(user_id, query_parameters, list_version))
             elif http_method == 'POST':
-                response = create_todo(user_id, request_body)
+                response = idempotent_write(event, user_id, request_body,
+                                            lambda: create_todo(user_id, request_body))
+            else:
+                response = create_error_response(405, 'Method Not Allowed')
+        elif resource_path == '/todos/due':
+            if http_method == 'GET':
+                response = conditional_get(event, user_id,
+                                           lambda list_version: get_due_todos(user_id, query_parameters, list_version))
+            else:
+                response = create_error_response(405, 'Method Not Allowed')
+        elif resource_path == '/todos/stats':
+            if http_method == 'GET':
+                response = get_todo_stats(user_id, query_parameters)
+            else:
+                response = create_error_response(405, 'Method Not Allowed')
+        elif resource_path == '/todos/search':
+            if http_method == 'GET':
+                response = conditional_get(event, user_id,
+                                           lambda list_version: search_todos(user_id, query_parameters, list_version))
+            else:
+                response = create_error_response(405, 'Method Not Allowed')
+        elif resource_path == '/todos/export':
+            if http_method == 'GET':
+                response = export_todos(event, user_id, query_parameters)
+            else:
+                response = create_error_response(405, 'Method Not Allowed')
+        elif resource_path == '/todos/batch':
+            if http_method == 'POST':
+                response = idempotent_write(event, user_id, request_body,
+                                            lambda: batch_write_todos(user_id, request_body))
+            else:
+                response = create_error_response(405, 'Method Not Allowed')
+        elif resource_path == '/todos/ops':
+            if http_method == 'POST':
+                response = apply_todo_operations(user_id, request_body)
             else:
                 response = create_error_response(405, 'Method Not Allowed')
         elif resource_path == '/todos/{id}':
             todo_id = path_parameters.get('id')
             if http_method == 'GET':
-                response = get_todo(user_id, todo_id)
+                response = conditional_get(event, user_id,
+                                           lambda list_version: get_todo(user_id, todo_id, list_version, query_parameters))
             elif http_method == 'PUT':
                 response = update_todo(user_id, todo_id, request_body)
             elif http_method == 'DELETE':
                 response = delete_todo(user_id, todo_id)
             else:
                 response = create_error_response(405, 'Method Not Allowed')
+        elif resource_path == '/todos/{id}/occurrences':
+            if http_method == 'POST':
+                response = set_occurrence_completed(user_id, path_parameters.get('id'), request_body)
+            else:
+                response = create_error_response(405, 'Method Not Allowed')
+        elif resource_path == '/todos/{id}/move':
+            if http_method == 'POST':
+                response = move_todo(user_id, path_parameters.get('id'), request_body)
+            else:
+                response = create_error_response(405, 'Method Not Allowed')
         else:
             response = create_error_response(404, 'Not Found')
         
-        return response
+        with span('Compress'):
+            response = compress_response(event, response)
     
     except Exception as e:
         print(f"Error: {str(e)}")
-        return create_error_response(500, 'Internal Server Error')
+        response = create_error_response(500, 'Internal Server Error')
+    
+    emit_request_metrics(metrics, response, context)
+    return response
 
 def get_user_id_from_event(event):
     """
@@ -71,254 +340,3416 @@ def get_user_id_from_event(event):
         print(f"Error extracting user ID: {str(e)}")
         return 'anonymous'
 
-def get_todos(user_id, query_parameters):
+class RequestMetrics:
+    """
+    Phase timings and counters of one invocation
+
+    Phases are summed by span(); time not covered by any span (routing,
+    validation, cache lookups) only shows up in the total.
+    """
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.phases = dict.fromkeys(METRIC_PHASES, 0.0)
+        self.items_read = 0
+
+    def emf_record(self, response, request_id, cold):
+        """
+        Build the EMF log record; CloudWatch extracts the metrics from it
+        """
+        total_ms = (time.perf_counter() - self.started) * 1000
+        record = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Route']],
+                    'Metrics': [{'Name': f'{phase}Latency', 'Unit': 'Milliseconds'} for phase in METRIC_PHASES] + [
+                        {'Name': 'TotalLatency', 'Unit': 'Milliseconds'},
+                        {'Name': 'ItemCount', 'Unit': 'Count'},
+                        {'Name': 'PayloadBytes', 'Unit': 'Bytes'}
+                    ]
+                }]
+            },
+            'Route': self.route,
+            'StatusCode': response['statusCode'],
+            'RequestId': request_id,
+            'ColdStart': cold
+        }
+        for phase, elapsed_ms in self.phases.items():
+            record[f'{phase}Latency'] = round(elapsed_ms, 3)
+        record['TotalLatency'] = round(total_ms, 3)
+        record['ItemCount'] = self.items_read
+        record['PayloadBytes'] = len(response.get('body') or '')
+        return record
+
+def start_request_metrics(event):
     """
-    Get all todos for a user
+    Start collecting metrics for the invocation on this thread
     """
+    metrics = None
+    if REQUEST_METRICS_ENABLED:
+        metrics = RequestMetrics(f"{event.get('httpMethod')} {event.get('resource')}")
+    request_state.metrics = metrics
+    return metrics
+
+@contextmanager
+def span(phase):
+    """
+    Add the wall time of the enclosed block to `phase` of the current request
+    """
+    metrics = getattr(request_state, 'metrics', None)
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
     try:
-        # Query todos for the user
-        response = table.query(
-            KeyConditionExpression='user_id = :user_id',
-            ExpressionAttributeValues={
-                ':user_id': user_id
-            }
-        )
-        
-        todos = response.get('Items', [])
-        
-        # Convert backend data structure to frontend expected format
-        todos = [format_todo_for_frontend(todo) for todo in todos]
-        
-        # Convert Decimal types to regular numbers for JSON serialization
-        todos = convert_decimal_to_number(todos)
-        
-        return create_success_response({
-            'todos': todos,
-            'count': len(todos)
-        })
-    
-    except Exception as e:
-        print(f"Error getting todos: {str(e)}")
-        return create_error_response(500, 'Error retrieving todos')
+        yield
+    finally:
+        metrics.phases[phase] += (time.perf_counter() - started) * 1000
 
-def create_todo(user_id, request_body):
+def count_items_read(count):
     """
-    Create a new todo
+    Add items returned by DynamoDB to the current request's ItemCount
+    """
+    metrics = getattr(request_state, 'metrics', None)
+    if metrics is not None:
+        metrics.items_read += count
+
+def emit_request_metrics(metrics, response, context):
+    """
+    Print the request's EMF record; metrics problems never fail the request
     """
+    global cold_start
+    request_state.metrics = None
+    cold, cold_start = cold_start, False
+    if metrics is None:
+        return
     try:
-        # Validate required fields (frontend sends 'title', we store as 'task')
-        if 'title' not in request_body:
-            return create_error_response(400, 'Title is required')
-        
-        # Create new todo item with frontend structure mapped to backend
-        todo_id = request_body.get('id', str(uuid.uuid4()))
-        todo_item = {
-            'user_id': user_id,
-            'id': todo_id,
-            'task': request_body['title'],  # Map frontend 'title' to backend 'task'
-            'category': request_body.get('category', 'other'),
-            'priority': request_body.get('priority', 'medium'),
-            'completed': request_body.get('completed', False),
-            'created_at': request_body.get('createdAt', datetime.utcnow().isoformat()),
-            'updated_at': datetime.utcnow().isoformat()
-        }
-        
-        # Add optional fields
-        if 'description' in request_body:
-            todo_item['description'] = request_body['description']
-        if 'dueDate' in request_body:
-            todo_item['due_date'] = request_body['dueDate']
-        
-        # Save to DynamoDB
-        table.put_item(Item=todo_item)
-        
-        # Convert to frontend format and convert Decimal types for response
-        formatted_todo = format_todo_for_frontend(todo_item)
-        formatted_todo = convert_decimal_to_number(formatted_todo)
-        
-        return create_success_response({
-            'todo': formatted_todo,
-            'message': 'Todo created successfully'
-        }, 201)
-    
+        request_id = getattr(context, 'aws_request_id', None)
+        print(json.dumps(metrics.emf_record(response, request_id, cold), separators=(',', ':')))
     except Exception as e:
-        print(f"Error creating todo: {str(e)}")
-        return create_error_response(500, 'Error creating todo')
+        print(f"Error emitting request metrics: {str(e)}")
 
-def get_todo(user_id, todo_id):
+def get_request_header(event, name):
     """
-    Get a specific todo
+    Case-insensitive lookup of a request header
     """
-    try:
-        # Get todo from DynamoDB
-        response = table.get_item(
-            Key={
-                'user_id': user_id,
-                'id': todo_id
-            }
-        )
-        
-        if 'Item' not in response:
-            return create_error_response(404, 'Todo not found')
-        
-        todo = format_todo_for_frontend(response['Item'])
-        todo = convert_decimal_to_number(todo)
-        
-        return create_success_response({
-            'todo': todo
-        })
+    headers = event.get('headers') or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+def conditional_get(event, user_id, load_response):
+    """
+    Serve a GET with an ETag derived from the user's list version
+
+    A matching If-None-Match is answered with a bodyless 304 after a single
+    GetItem, without querying or serializing any todos. The version is read
+    before the data and writes bump it after writing, so an ETag is never
+    newer than the body it is sent with. `load_response` receives the
+    version so it can validate cached data without reading it again.
+    """
+    list_version = get_list_version(user_id)
+    etag = build_etag(list_version, event)
+    if etag_matches(get_request_header(event, 'If-None-Match'), etag):
+        return create_not_modified_response(etag)
     
-    except Exception as e:
-        print(f"Error getting todo: {str(e)}")
-        return create_error_response(500, 'Error retrieving todo')
+    response = load_response(list_version)
+    if response['statusCode'] == 200:
+        response['headers']['ETag'] = etag
+        response['headers']['Cache-Control'] = 'private, no-cache'
+    return response
 
-def update_todo(user_id, todo_id, request_body):
+def build_etag(list_version, event):
     """
-    Update an existing todo
+    Build an ETag from the list version and the request it answers
     """
-    try:
-        # Check if todo exists
-        response = table.get_item(
-            Key={
-                'user_id': user_id,
-                'id': todo_id
-            }
-        )
-        
-        if 'Item' not in response:
-            return create_error_response(404, 'Todo not found')
-        
-        # Prepare update expression
-        update_expression = "SET updated_at = :updated_at"
-        expression_attribute_values = {
-            ':updated_at': datetime.utcnow().isoformat()
+    request_key = json.dumps([
+        event.get('resource'),
+        event.get('pathParameters') or {},
+        event.get('queryStringParameters') or {}
+    ], sort_keys=True)
+    digest = hashlib.sha1(request_key.encode('utf-8')).hexdigest()[:16]
+    return f'"{list_version}-{digest}"'
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match header (possibly a list or weak tags) against an ETag
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return any((candidate[2:] if candidate.startswith('W/') else candidate) == etag
+               for candidate in candidates)
+
+def meta_key(user_id):
+    """
+    Key of the per-user bookkeeping item
+    """
+    return {
+        'user_id': user_id + META_USER_SUFFIX,
+        'id': META_ITEM_ID
+    }
+
+def get_list_version(user_id):
+    """
+    Read the user's list version (0 before the first write)
+    """
+    response = read_item(
+        Key=meta_key(user_id),
+        ProjectionExpression='list_version',
+        ConsistentRead=True
+    )
+    return int(response.get('Item', {}).get('list_version', 0))
+
+def list_version_update(user_id, expected=None):
+    """
+    Transaction entry bumping the user's list version
+
+    Every write carries it in its own transaction, so a changed list can
+    never keep its old ETag. With `expected` the bump only applies on top
+    of that version (see write_with_list_version).
+    """
+    update = {
+        'Key': meta_key(user_id),
+        'UpdateExpression': 'ADD list_version :one',
+        'ExpressionAttributeValues': {
+            ':one': 1
         }
-        
-        # Add fields to update (map frontend fields to backend)
-        if 'title' in request_body:
-            update_expression += ", task = :task"
-            expression_attribute_values[':task'] = request_body['title']
-        
-        if 'completed' in request_body:
-            update_expression += ", completed = :completed"
-            expression_attribute_values[':completed'] = request_body['completed']
-        
-        if 'category' in request_body:
-            update_expression += ", category = :category"
-            expression_attribute_values[':category'] = request_body['category']
-        
-        if 'priority' in request_body:
-            update_expression += ", priority = :priority"
-            expression_attribute_values[':priority'] = request_body['priority']
-        
-        if 'description' in request_body:
-            update_expression += ", description = :description"
-            expression_attribute_values[':description'] = request_body['description']
-        
-        if 'dueDate' in request_body:
-            update_expression += ", due_date = :due_date"
-            expression_attribute_values[':due_date'] = request_body['dueDate']
-        
-        # Update the item
-        update_params = {
-            'Key': {
-                'user_id': user_id,
-                'id': todo_id
-            },
-            'UpdateExpression': update_expression,
-            'ExpressionAttributeValues': expression_attribute_values,
-            'ReturnValues': 'ALL_NEW'
+    }
+    if expected == 0:
+        update['ConditionExpression'] = 'attribute_not_exists(list_version)'
+    elif expected is not None:
+        update['ConditionExpression'] = 'list_version = :expected'
+        update['ExpressionAttributeValues'][':expected'] = expected
+    return {'Update': update}
+
+def write_with_list_version(user_id, transact_items):
+    """
+    Run a single-todo write's transaction together with the list version bump
+
+    TransactWriteItems returns no attributes, so when this container holds
+    the user's list the bump is conditioned on the cached version: the new
+    version is then known to be the next one and is returned for
+    apply_write to patch the entry. If another write got in first only the
+    version check fails; the entry is dropped and the transaction runs
+    again without it. Returns None in that case and when nothing was
+    cached. Conditions of `transact_items` fail as usual.
+    """
+    cached_version = todo_list_cache.version(user_id)
+    if cached_version is not None:
+        try:
+            transact_write(transact_items + [list_version_update(user_id, cached_version)])
+            return cached_version + 1
+        except ClientError as e:
+            reasons = e.response.get('CancellationReasons', [])
+            if not (reasons and reasons[-1].get('Code') == 'ConditionalCheckFailed'
+                    and all(reason.get('Code') == 'None' for reason in reasons[:-1])):
+                raise
+        todo_list_cache.invalidate(user_id)
+    transact_write(transact_items + [list_version_update(user_id)])
+    return None
+
+class TodoListCache:
+    """
+    Bounded LRU of formatted todo lists kept across warm invocations
+
+    Entries are keyed by user_id and tagged with the list version they were
+    built for, so a write from any other container (which bumps the
+    version) makes them unusable. Entries also expire after a TTL. Least
+    recently used entries are evicted beyond `max_users` lists or
+    `max_todos` todos in total; a single list above `max_todos` is not
+    cached at all. A lock keeps it consistent when driven from several
+    threads (load_test.py).
+    """
+
+    def __init__(self, max_users, ttl_seconds, max_todos):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.max_todos = max_todos
+        self.entries = OrderedDict()  # user_id -> entry dict
+        self.todo_count = 0  # todos across all entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+
+    @property
+    def enabled(self):
+        return self.max_users > 0 and self.ttl_seconds > 0
+
+    def get(self, user_id, list_version):
+        """
+        Return the entry for `user_id` if it matches `list_version`
+        """
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and (entry['version'] != list_version or entry['expires'] < time.monotonic()):
+                self.invalidate(user_id)
+                entry = None
+            
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(user_id)
+            self.log('hit' if entry else 'miss', user_id)
+            return entry
+
+    def version(self, user_id):
+        """
+        List version of the user's live entry, or None (not counted as a hit)
+        """
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None or entry['expires'] < time.monotonic():
+                return None
+            return entry['version']
+
+    def put(self, user_id, list_version, todos):
+        """
+        Store a full formatted list (sorted by id, like the table)
+        """
+        entry = {
+            'version': list_version,
+            'expires': time.monotonic() + self.ttl_seconds,
+            'todos': todos,
+            'ids': [todo['id'] for todo in todos]
         }
-        
-        response = table.update_item(**update_params)
-        
-        updated_todo = format_todo_for_frontend(response['Attributes'])
-        updated_todo = convert_decimal_to_number(updated_todo)
-        
-        return create_success_response({
-            'todo': updated_todo,
-            'message': 'Todo updated successfully'
-        })
-    
-    except Exception as e:
-        print(f"Error updating todo: {str(e)}")
-        return create_error_response(500, 'Error updating todo')
+        if len(todos) > self.max_todos:
+            self.invalidate(user_id)
+            return entry
+        with self.lock:
+            self.invalidate(user_id)
+            self.entries[user_id] = entry
+            self.todo_count += len(todos)
+            self.evict()
+        return entry
 
-def delete_todo(user_id, todo_id):
+    def apply_write(self, user_id, new_version, todo=None, deleted_id=None):
+        """
+        Patch an entry after this container wrote one todo
+
+        The entry is only patched if it was built for the version just
+        before the write; otherwise (or when the new version is unknown)
+        some other write may be missing and the entry is dropped.
+        """
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return
+            if new_version is None or entry['version'] != new_version - 1:
+                self.invalidate(user_id)
+                return
+            
+            # Patch copies so responses already built from the entry keep
+            # seeing the list they were built from
+            todo_id = todo['id'] if todo is not None else deleted_id
+            ids = list(entry['ids'])
+            todos = list(entry['todos'])
+            position = bisect.bisect_left(ids, todo_id)
+            present = position < len(ids) and ids[position] == todo_id
+            if todo is None:
+                if present:
+                    del ids[position]
+                    del todos[position]
+            elif present:
+                todos[position] = todo
+            else:
+                ids.insert(position, todo_id)
+                todos.insert(position, todo)
+            self.entries[user_id] = dict(entry, ids=ids, todos=todos, version=new_version)
+            self.todo_count += len(todos) - len(entry['todos'])
+            self.evict()
+
+    def evict(self):
+        """
+        Drop least recently used entries until both caps are met
+        """
+        with self.lock:
+            while self.entries and (len(self.entries) > self.max_users or self.todo_count > self.max_todos):
+                _, entry = self.entries.popitem(last=False)
+                self.todo_count -= len(entry['todos'])
+
+    def invalidate(self, user_id):
+        with self.lock:
+            entry = self.entries.pop(user_id, None)
+            if entry is not None:
+                self.todo_count -= len(entry['todos'])
+
+    def log(self, result, user_id):
+        print(f"Todo list cache {result}: user={user_id} hits={self.hits} "
+              f"misses={self.misses} entries={len(self.entries)} todos={self.todo_count}")
+
+todo_list_cache = TodoListCache(LIST_CACHE_MAX_USERS, LIST_CACHE_TTL_SECONDS, LIST_CACHE_MAX_TODOS)
+
+class IdempotencyCache:
     """
-    Delete a todo
+    Bounded LRU of recorded Idempotency-Key results kept across warm invocations
+
+    A recorded result never changes, so entries only honour the record's
+    expiry; a retry that lands on the same container is answered without
+    reading DynamoDB. Pending claims are never cached.
     """
-    try:
-        # Check if todo exists
-        response = table.get_item(
-            Key={
-                'user_id': user_id,
-                'id': todo_id
-            }
-        )
-        
-        if 'Item' not in response:
-            return create_error_response(404, 'Todo not found')
-        
-        # Delete the item
-        table.delete_item(
-            Key={
-                'user_id': user_id,
-                'id': todo_id
-            }
-        )
-        
-        return create_success_response({
-            'message': 'Todo deleted successfully'
-        })
-    
-    except Exception as e:
-        print(f"Error deleting todo: {str(e)}")
-        return create_error_response(500, 'Error deleting todo')
 
-def format_todo_for_frontend(backend_todo):
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # (user_id, idempotency key) -> record
+        self.lock = threading.RLock()
+
+    def get(self, user_id, idempotency_key):
+        with self.lock:
+            record = self.entries.get((user_id, idempotency_key))
+            if record is not None and record['expires_at'] <= time.time():
+                del self.entries[(user_id, idempotency_key)]
+                record = None
+            if record is not None:
+                self.entries.move_to_end((user_id, idempotency_key))
+            return record
+
+    def put(self, user_id, idempotency_key, record):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[(user_id, idempotency_key)] = record
+            self.entries.move_to_end((user_id, idempotency_key))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+idempotency_cache = IdempotencyCache(IDEMPOTENCY_CACHE_SIZE)
+
+def idempotent_write(event, user_id, request_body, write):
     """
-    Convert backend todo structure to frontend expected format
+    Run a create or batch write at most once per Idempotency-Key
+
+    Without the header `write` just runs. Otherwise the key is claimed with
+    a pending record in the user's meta partition, the write runs and its
+    response is recorded for IDEMPOTENCY_TTL_HOURS; retries with the same
+    key get that response back verbatim. Reusing a key for a different
+    request is a 422 and a retry that overtakes the first attempt a 409.
+    Server errors are not recorded, so the client can simply retry.
+    """
+    idempotency_key = get_request_header(event, 'Idempotency-Key')
+    if idempotency_key is None:
+        return write()
+    if not idempotency_key or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        return create_error_response(400, f'Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters')
+
+    fingerprint = request_fingerprint(event['resource'], request_body)
+    record = idempotency_cache.get(user_id, idempotency_key)
+    if record is None:
+        record = claim_idempotency_key(user_id, idempotency_key, fingerprint)
+        if record is not None and record['state'] == 'done':
+            idempotency_cache.put(user_id, idempotency_key, record)
+    if record is not None:
+        return replay_idempotent_result(record, fingerprint)
+
+    response = write()
+    if response['statusCode'] >= 500:
+        release_idempotency_key(user_id, idempotency_key)
+    else:
+        record_idempotent_result(user_id, idempotency_key, fingerprint, response)
+    return response
+
+def idempotency_item_key(user_id, idempotency_key):
+    """
+    Key of the item recording one Idempotency-Key
     """
     return {
-        'id': backend_todo.get('id'),
-        'title': backend_todo.get('task', ''),  # Map backend 'task' to frontend 'title'
-        'category': backend_todo.get('category', 'other'),
-        'priority': backend_todo.get('priority', 'medium'),
-        'completed': backend_todo.get('completed', False),
-        'createdAt': backend_todo.get('created_at', ''),
-        'updatedAt': backend_todo.get('updated_at', ''),
-        'description': backend_todo.get('description', ''),
-        'dueDate': backend_todo.get('due_date', '')
+        'user_id': user_id + META_USER_SUFFIX,
+        'id': IDEMPOTENCY_ITEM_PREFIX + idempotency_key
     }
 
-def convert_decimal_to_number(obj):
+def request_fingerprint(resource_path, request_body):
     """
-    Convert DynamoDB Decimal types to regular numbers for JSON serialization
+    Hash identifying a write request, to catch a key reused for another one
     """
-    if isinstance(obj, list):
-        return [convert_decimal_to_number(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_decimal_to_number(value) for key, value in obj.items()}
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    else:
-        return obj
+    canonical = json.dumps([resource_path, request_body], sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
 
-def create_success_response(data, status_code=200):
+def claim_idempotency_key(user_id, idempotency_key, fingerprint):
     """
-    Create a successful HTTP response with CORS headers
+    Claim a key for this attempt
+
+    Returns None once claimed, or the record of the attempt holding it (with
+    the body of a recorded result decompressed).
     """
+    key = idempotency_item_key(user_id, idempotency_key)
+    now = int(time.time())
+    try:
+        with span('DynamoDB'):
+            table.put_item(
+                Item=dict(key, state='pending', fingerprint=fingerprint,
+                          expires_at=now + IDEMPOTENCY_LOCK_SECONDS),
+                ConditionExpression='attribute_not_exists(id) OR expires_at < :now',
+                ExpressionAttributeValues={
+                    ':now': now
+                }
+            )
+        return None
+    except ClientError as e:
+        if not is_conditional_check_failure(e):
+            raise
+
+    record = read_item(Key=key, ConsistentRead=True).get('Item')
+    if record is None:
+        # Released by a failed attempt since the claim was refused
+        return {'state': 'pending', 'fingerprint': fingerprint}
+    if record['state'] == 'done' and not isinstance(record['body'], str):
+        record['body'] = gzip.decompress(bytes(record['body'])).decode('utf-8')
+    return record
+
+def replay_idempotent_result(record, fingerprint):
+    """
+    Answer a retry from the record of the key's first attempt
+    """
+    if record['fingerprint'] != fingerprint:
+        return create_error_response(422, 'Idempotency-Key was already used for a different request')
+    if record['state'] != 'done':
+        return create_error_response(409, 'A request with this Idempotency-Key is still in progress')
+    headers = cors_headers()
+    headers['Idempotent-Replayed'] = 'true'
     return {
-        'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
-            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
-        },
-        'body': json.dumps(data)
+        'statusCode': int(record['status_code']),
+        'headers': headers,
+        'body': record['body']
+    }
+
+def record_idempotent_result(user_id, idempotency_key, fingerprint, response):
+    """
+    Replace the key's claim with the response it produced
+
+    Large bodies (a batch of created todos) are stored gzipped to stay well
+    under the DynamoDB item size limit. If the record cannot be written the
+    claim is released, so a retry runs the write again rather than failing.
+    """
+    body = response['body']
+    record = {
+        'state': 'done',
+        'fingerprint': fingerprint,
+        'status_code': response['statusCode'],
+        'body': body,
+        'expires_at': int(time.time()) + IDEMPOTENCY_TTL_HOURS * 3600
     }
+    stored_body = gzip.compress(body.encode('utf-8'), GZIP_LEVEL) if len(body) >= GZIP_MIN_BYTES else body
+    try:
+        with span('DynamoDB'):
+            table.put_item(Item={**idempotency_item_key(user_id, idempotency_key), **record, 'body': stored_body})
+    except ClientError as e:
+        print(f"Error recording idempotent result: {str(e)}")
+        release_idempotency_key(user_id, idempotency_key)
+        return
+    idempotency_cache.put(user_id, idempotency_key, record)
+
+def release_idempotency_key(user_id, idempotency_key):
+    """
+    Drop a pending claim so the client's retry runs the write again
+    """
+    try:
+        with span('DynamoDB'):
+            table.delete_item(
+                Key=idempotency_item_key(user_id, idempotency_key),
+                ConditionExpression='#state = :pending',
+                ExpressionAttributeNames={
+                    '#state': 'state'
+                },
+                ExpressionAttributeValues={
+                    ':pending': 'pending'
+                }
+            )
+    except ClientError as e:
+        if not is_conditional_check_failure(e):
+            print(f"Error releasing idempotency key: {str(e)}")
+
+def get_todos(user_id, query_parameters, list_version=None):
+    """
+    Get todos for a user
+
+    With a `limit` or `cursor` query parameter a single page is returned
+    together with `nextCursor`; without either every page of the user's
+    partition is read so existing clients keep receiving the full list.
+    With `since` only todos changed after that timestamp are returned,
+    along with the ids of todos deleted since then. `category`,
+    `priority`, `completed`, `dueBefore` and `sort` select a filtered view
+    (see get_filtered_todos), and `fields` trims each todo to the listed
+    fields. `includeArchived=true` adds archived todos to a full list, and
+    `from`/`to` expand recurring todos into their occurrences in that
+    window (see get_todos_in_window).
+
+    Full-list reads populate the warm-container cache, which then also
+    serves plain pages while `list_version` still matches. The returned
+    `watermark` is the time of the read less a safety margin (see
+    sync_watermark), so the next `since` sync overlaps this one slightly.
+    """
+    try:
+        query_parameters = query_parameters or {}
+        read_started = datetime.utcnow()
+
+        try:
+            limit = parse_page_limit(query_parameters.get('limit'))
+            start_key = decode_cursor(query_parameters.get('cursor'), user_id)
+            since = parse_sync_watermark(query_parameters.get('since'))
+            filters = parse_todo_filters(query_parameters)
+            fields = parse_fields(query_parameters.get('fields'))
+            window = parse_occurrence_window(query_parameters)
+        except ValueError as e:
+            return create_error_response(400, str(e))
+
+        paginated = limit is not None or start_key is not None
+        if paginated and limit is None:
+            limit = DEFAULT_PAGE_SIZE
+
+        if window is not None:
+            if paginated or since is not None or query_parameters.get('includeArchived'):
+                return create_error_response(400, 'from and to cannot be combined with limit, cursor, since or includeArchived')
+            return get_todos_in_window(user_id, filters, fields, window, list_version)
+
+        if query_parameters.get('includeArchived', '').lower() == 'true':
+            if paginated or since is not None:
+                return create_error_response(400, 'includeArchived cannot be combined with limit, cursor or since')
+            return get_todos_with_archive(user_id, filters, fields, list_version)
+
+        if filters:
+            if since is not None:
+                return create_error_response(400, 'since cannot be combined with filters or sort')
+            return get_filtered_todos(user_id, filters, limit, start_key, list_version, fields)
+
+        # Tombstones older than their TTL may already be gone, so a client
+        # that far behind has to start over from a full list
+        reset = since is not None and since < tombstone_horizon()
+
+        if todo_list_cache.enabled and (since is None or reset):
+            if list_version is None:
+                list_version = get_list_version(user_id)
+            entry = todo_list_cache.get(user_id, list_version)
+            # A projected read would not fill the cache, so it does not
+            # read the whole items to do so either
+            if entry is None and not paginated and fields is None:
+                entry = load_todo_list_into_cache(user_id, list_version)
+            if entry is not None:
+                response_body = page_from_cache(entry, start_key, limit, user_id)
+                response_body['todos'] = trim_todos(response_body['todos'], fields)
+                response_body['watermark'] = sync_watermark(read_started)
+                if since is not None:
+                    response_body['deleted'] = []
+                    response_body['reset'] = reset
+                return create_success_response(response_body)
+
+        if since is not None and not reset:
+            query_params = {
+                'IndexName': UPDATED_AT_INDEX,
+                'KeyConditionExpression': 'user_id = :user_id AND updated_at > :since',
+                'ExpressionAttributeValues': {
+                    ':user_id': user_id,
+                    ':since': since
+                }
+            }
+        else:
+            query_params = {
+                'KeyConditionExpression': 'user_id = :user_id',
+                'FilterExpression': 'attribute_not_exists(deleted)',
+                'ExpressionAttributeValues': {
+                    ':user_id': user_id
+                }
+            }
+        if start_key:
+            query_params['ExclusiveStartKey'] = start_key
+        # Tombstone detection needs deleted
+        query_params.update(projection_params(fields, ('deleted',)))
+
+        items, last_evaluated_key = query_todo_pages(user_id, query_params, limit)
+
+        # One pass over the items: map live todos straight to the frontend
+        # format (Decimals are converted by the JSON encoder) and collect
+        # tombstones
+        todos = []
+        deleted_ids = []
+        with span('Format'):
+            for item in items:
+                if item.get('deleted'):
+                    deleted_ids.append(item['id'])
+                else:
+                    todos.append(format_todo_for_frontend(item, fields))
+        
+        response_body = {
+            'todos': todos,
+            'count': len(todos),
+            'nextCursor': encode_cursor(last_evaluated_key),
+            'watermark': sync_watermark(read_started)
+        }
+        if since is not None:
+            response_body['deleted'] = deleted_ids
+            response_body['reset'] = reset
+        
+        return create_success_response(response_body)
+    
+    except Exception as e:
+        print(f"Error getting todos: {str(e)}")
+        return create_error_response(500, 'Error retrieving todos')
+
+def get_filtered_todos(user_id, filters, limit, start_key, list_version, fields=None):
+    """
+    Serve a filtered and/or sorted view of the user's todos
+
+    A cached full list is filtered in memory. Otherwise the query planner
+    reads only the matching index range. Sorts the chosen index cannot
+    deliver are done in memory, which needs the whole result, so they
+    cannot be paginated.
+    """
+    sort = filters.get('sort')
+    # An in-memory sort needs its field even if the response leaves it out,
+    # and a rank sort orders unranked todos by createdAt
+    read_fields = fields
+    if fields is not None and sort:
+        sort_fields = (sort.lstrip('-'), 'createdAt') if sort.lstrip('-') == 'rank' else (sort.lstrip('-'),)
+        missing = tuple(field for field in sort_fields if field not in fields)
+        if missing:
+            read_fields = fields + missing
+    query_params, native_sort = plan_todo_query(user_id, filters)
+    if limit is not None and not native_sort:
+        return create_error_response(400, f'sort={sort} cannot be combined with limit or cursor for this filter')
+
+    if todo_list_cache.enabled and limit is None:
+        if list_version is None:
+            list_version = get_list_version(user_id)
+        entry = todo_list_cache.get(user_id, list_version)
+        if entry is not None:
+            todos = [todo for todo in entry['todos'] if todo_matches_filters(todo, filters)]
+            todos = trim_todos(sort_todos(todos, sort), fields)
+            return create_success_response({'todos': todos, 'count': len(todos), 'nextCursor': None})
+
+    if start_key:
+        query_params['ExclusiveStartKey'] = start_key
+    query_params.update(projection_params(read_fields))
+    items, last_evaluated_key = query_todo_pages(user_id, query_params, limit)
+    with span('Format'):
+        todos = [format_todo_for_frontend(item, read_fields) for item in items]
+    if not native_sort:
+        todos = sort_todos(todos, sort)
+    if read_fields is not fields:
+        todos = trim_todos(todos, fields)
+
+    return create_success_response({
+        'todos': todos,
+        'count': len(todos),
+        'nextCursor': encode_cursor(last_evaluated_key)
+    })
+
+def get_due_todos(user_id, query_parameters, list_version=None):
+    """
+    Incomplete todos due before `before`, earliest first, for reminders and
+    overdue views
+
+    The same view as GET /todos?completed=false&dueBefore=...&sort=dueDate,
+    so it is read from the sparse open-due index when that is configured
+    and takes `limit`, `cursor` and `fields` like GET /todos.
+    """
+    try:
+        before = query_parameters.get('before')
+        try:
+            datetime.fromisoformat(before or '')
+        except ValueError:
+            return create_error_response(400, 'before must be an ISO 8601 date')
+        try:
+            limit = parse_page_limit(query_parameters.get('limit'))
+            start_key = decode_cursor(query_parameters.get('cursor'), user_id)
+            fields = parse_fields(query_parameters.get('fields'))
+        except ValueError as e:
+            return create_error_response(400, str(e))
+        if start_key and limit is None:
+            limit = DEFAULT_PAGE_SIZE
+        
+        return get_filtered_todos(user_id, {'completed': False, 'dueBefore': before, 'sort': 'dueDate'},
+                                  limit, start_key, list_version, fields)
+    
+    except Exception as e:
+        print(f"Error getting due todos: {str(e)}")
+        return create_error_response(500, 'Error retrieving due todos')
+
+def parse_fields(raw_fields):
+    """
+    Validate the `fields` query parameter into a tuple of frontend fields
+
+    `id` is always included; None means every field.
+    """
+    if not raw_fields:
+        return None
+    requested = [field.strip() for field in raw_fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in FRONTEND_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)} (known: {', '.join(FRONTEND_FIELDS)})")
+    return tuple(field for field in FRONTEND_FIELDS if field == 'id' or field in requested)
+
+def projection_params(fields, extra_attributes=()):
+    """
+    ProjectionExpression parameters reading only the attributes behind
+    `fields` (plus `extra_attributes`); empty when every field is wanted
+
+    Projection cuts the bytes returned by DynamoDB, not the read capacity,
+    which is still charged on the full item size.
+    """
+    if fields is None:
+        return {}
+    attributes = [FRONTEND_FIELDS[field][0] for field in fields] + list(extra_attributes)
+    # Items may be stored in either schema
+    attributes = list(dict.fromkeys(attributes + [COMPACT_NAMES[attribute] for attribute in attributes
+                                                  if attribute in COMPACT_NAMES]))
+    names = {f'#p{position}': attribute for position, attribute in enumerate(attributes)}
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names
+    }
+
+def trim_todos(todos, fields):
+    """
+    Reduce already formatted todos to `fields`
+    """
+    if fields is None:
+        return todos
+    return [{field: todo[field] for field in fields} for todo in todos]
+
+def parse_todo_filters(query_parameters):
+    """
+    Validate the filter and sort query parameters of GET /todos
+    """
+    filters = {}
+    for name in ('category', 'priority'):
+        if query_parameters.get(name):
+            filters[name] = query_parameters[name]
+    
+    completed = query_parameters.get('completed')
+    if completed:
+        if completed.lower() not in ('true', 'false'):
+            raise ValueError('completed must be true or false')
+        filters['completed'] = completed.lower() == 'true'
+    
+    due_before = query_parameters.get('dueBefore')
+    if due_before:
+        try:
+            datetime.fromisoformat(due_before)
+        except ValueError:
+            raise ValueError('dueBefore must be an ISO 8601 date')
+        filters['dueBefore'] = due_before
+    
+    sort = query_parameters.get('sort')
+    if sort:
+        if sort.lstrip('-') not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)} (prefix - for descending)")
+        filters['sort'] = sort
+    return filters
+
+def plan_todo_query(user_id, filters):
+    """
+    Pick the narrowest key condition for a filtered GET /todos
+
+    A category is served from the user_id+category index and a due date
+    bound from the user_id+due_date index (which only holds todos with a
+    due date), or the sparse open-due index when only incomplete todos
+    are wanted; anything else is a FilterExpression on the chosen range.
+    Otherwise sort=rank reads the rank index, which only holds ranked
+    todos; with it configured every new todo is ranked on creation.
+    Returns the query parameters and whether they already return items in
+    the requested sort order.
+    """
+    values = {':user_id': user_id}
+    conditions = []
+    index_order = None
+    open_only = False
+    
+    if 'category' in filters:
+        query_params = {
+            'IndexName': CATEGORY_INDEX,
+            'KeyConditionExpression': 'user_id = :user_id AND category = :category'
+        }
+        values[':category'] = filters['category']
+        if 'dueBefore' in filters:
+            conditions.append('due_date < :due_before')
+            values[':due_before'] = filters['dueBefore']
+    elif 'dueBefore' in filters and OPEN_DUE_INDEX and filters.get('completed') is False:
+        # Only incomplete todos are in this index, so completed needs no filter
+        query_params = {
+            'IndexName': OPEN_DUE_INDEX,
+            'KeyConditionExpression': 'user_id = :user_id AND open_due_date < :due_before'
+        }
+        values[':due_before'] = filters['dueBefore']
+        index_order = 'dueDate'
+        open_only = True
+    elif 'dueBefore' in filters:
+        query_params = {
+            'IndexName': DUE_DATE_INDEX,
+            'KeyConditionExpression': 'user_id = :user_id AND due_date < :due_before'
+        }
+        values[':due_before'] = filters['dueBefore']
+        index_order = 'dueDate'
+    elif RANK_INDEX and filters.get('sort', '').lstrip('-') == 'rank':
+        query_params = {
+            'IndexName': RANK_INDEX,
+            'KeyConditionExpression': 'user_id = :user_id'
+        }
+        conditions.append('attribute_not_exists(deleted)')
+        index_order = 'rank'
+    else:
+        query_params = {'KeyConditionExpression': 'user_id = :user_id'}
+        conditions.append('attribute_not_exists(deleted)')
+    
+    if 'priority' in filters:
+        # Either schema (see COMPACT_SCHEMA)
+        conditions.append('(priority = :priority OR p = :priority_code)')
+        values[':priority'] = filters['priority']
+        values[':priority_code'] = PRIORITY_CODES.get(filters['priority'], filters['priority'])
+    if 'completed' in filters and not open_only:
+        # Todos written without the attribute are shown as not completed
+        if filters['completed']:
+            conditions.append('completed = :completed')
+        else:
+            conditions.append('(attribute_not_exists(completed) OR completed = :completed)')
+        values[':completed'] = filters['completed']
+    
+    sort = filters.get('sort')
+    native_sort = sort is None or sort.lstrip('-') == index_order
+    if native_sort and sort and sort.startswith('-'):
+        query_params['ScanIndexForward'] = False
+    
+    if conditions:
+        query_params['FilterExpression'] = ' AND '.join(conditions)
+    query_params['ExpressionAttributeValues'] = values
+    return query_params, native_sort
+
+def todo_matches_filters(todo, filters):
+    """
+    Apply plan_todo_query's conditions to a formatted todo
+    """
+    if 'category' in filters and todo['category'] != filters['category']:
+        return False
+    if 'priority' in filters and todo['priority'] != filters['priority']:
+        return False
+    if 'completed' in filters and bool(todo['completed']) != filters['completed']:
+        return False
+    if 'dueBefore' in filters and not (todo['dueDate'] and todo['dueDate'] < filters['dueBefore']):
+        return False
+    return True
+
+def sort_todos(todos, sort):
+    """
+    Sort formatted todos by a `sort` parameter
+
+    Priority sorts high to low; todos without a due date sort last in
+    either direction, as do unranked todos (oldest first) for a rank sort.
+    """
+    if not sort:
+        return todos
+    field = sort.lstrip('-')
+    descending = sort.startswith('-')
+    if field == 'priority':
+        key = lambda todo: PRIORITY_RANK.get(todo['priority'], len(PRIORITY_RANK))
+    elif field == 'title':
+        key = lambda todo: (todo['title'] or '').lower()
+    else:
+        key = lambda todo: todo[field] or ''
+    
+    with span('Format'):
+        if field == 'rank':
+            ranked = sorted((todo for todo in todos if todo['rank']), key=key, reverse=descending)
+            return ranked + sorted((todo for todo in todos if not todo['rank']), key=lambda todo: todo['createdAt'])
+        if field != 'dueDate':
+            return sorted(todos, key=key, reverse=descending)
+        dated = sorted((todo for todo in todos if todo['dueDate']), key=key, reverse=descending)
+        return dated + [todo for todo in todos if not todo['dueDate']]
+
+def load_todo_list_into_cache(user_id, list_version):
+    """
+    Read and format the user's whole list and cache it for `list_version`
+    """
+    items, _ = query_todo_pages(user_id, {
+        'KeyConditionExpression': 'user_id = :user_id',
+        'FilterExpression': 'attribute_not_exists(deleted)',
+        'ExpressionAttributeValues': {
+            ':user_id': user_id
+        }
+    })
+    with span('Format'):
+        todos = [format_todo_for_frontend(item) for item in items]
+    return todo_list_cache.put(user_id, list_version, todos)
+
+def page_from_cache(entry, start_key, limit, user_id):
+    """
+    Build a GET /todos response body from a cached list
+
+    Cached lists are in table (id) order, so cursors stay interchangeable
+    with the ones produced by DynamoDB queries.
+    """
+    start = bisect.bisect_right(entry['ids'], start_key['id']) if start_key else 0
+    end = len(entry['todos']) if limit is None else min(start + limit, len(entry['todos']))
+    todos = entry['todos'][start:end]
+    
+    next_cursor = None
+    if end < len(entry['todos']):
+        next_cursor = encode_cursor({'user_id': user_id, 'id': entry['ids'][end - 1]})
+    
+    return {
+        'todos': todos,
+        'count': len(todos),
+        'nextCursor': next_cursor
+    }
+
+shard_read_pool = ThreadPoolExecutor(max_workers=SHARD_READ_WORKERS, thread_name_prefix='shard-read')
+
+def todo_partition(user_id, todo_id):
+    """
+    Partition key holding `todo_id` of `user_id`
+    """
+    if user_id not in SHARDED_USERS:
+        return user_id
+    return f"{user_id}#{zlib.crc32(todo_id.encode('utf-8')) % SHARD_COUNT}"
+
+def todo_partitions(user_id):
+    """
+    Every partition key that may hold todos of `user_id`
+    """
+    if user_id not in SHARDED_USERS:
+        return [user_id]
+    shards = [f'{user_id}#{shard}' for shard in range(SHARD_COUNT)]
+    return [user_id] + shards if user_id in RESHARDING_USERS else shards
+
+def todo_owner(partition):
+    """
+    User id behind a todo partition key (the inverse of todo_partition)
+    """
+    user_id, separator, shard = partition.rpartition('#')
+    if separator and shard.isdigit() and user_id in SHARDED_USERS:
+        return user_id
+    return partition
+
+def todo_key(user_id, todo_id):
+    """
+    Primary key of one todo
+    """
+    return {'user_id': todo_partition(user_id, todo_id), 'id': todo_id}
+
+def stored_key(item):
+    """
+    Primary key of a todo as it was read, in whichever partition holds it
+    """
+    return {'user_id': item['user_id'], 'id': item['id']}
+
+def read_todo(user_id, todo_id, **params):
+    """
+    read_item of one todo, looking in the user's unsharded partition first
+    while the user is being resharded (see RESHARDING_USERS)
+    """
+    if user_id in RESHARDING_USERS:
+        response = read_item(Key={'user_id': user_id, 'id': todo_id}, **params)
+        if 'Item' in response:
+            return response
+    return read_item(Key=todo_key(user_id, todo_id), **params)
+
+def read_todos(user_id, todo_ids, consistent=False):
+    """
+    read_items of up to 100 todos, with read_todo's fallback for users
+    being resharded
+    """
+    if user_id not in RESHARDING_USERS:
+        return read_items([todo_key(user_id, todo_id) for todo_id in todo_ids], consistent)
+    items = read_items([{'user_id': user_id, 'id': todo_id} for todo_id in todo_ids], consistent)
+    found = {item['id'] for item in items}
+    return items + read_items([todo_key(user_id, todo_id) for todo_id in todo_ids if todo_id not in found], consistent)
+
+def unmoved_todo_check(user_id, todo_id):
+    """
+    Transaction entry checking that `todo_id` is not a live todo still in
+    the unsharded partition of a user being resharded; None otherwise
+    """
+    if user_id not in RESHARDING_USERS:
+        return None
+    return {'ConditionCheck': {
+        'Key': {'user_id': user_id, 'id': todo_id},
+        'ConditionExpression': 'attribute_not_exists(id) OR attribute_exists(deleted)'
+    }}
+
+def query_todo_pages(user_id, query_params, limit=None):
+    """
+    query_pages over every partition holding the user's todos
+
+    `query_params` are written for an unsharded user (`:user_id`, and a
+    start key under the user's id). A sharded user's partitions are queried
+    concurrently, each for up to `limit` items, and merged in the order of
+    the queried key. The LastEvaluatedKey returned is the key of the last
+    merged item, again under the user's id, so it resumes every shard.
+    """
+    partitions = todo_partitions(user_id)
+    if len(partitions) == 1:
+        return query_pages(query_params, limit)
+    
+    sort_attributes = [INDEX_RANGE_KEYS[query_params['IndexName']]] if 'IndexName' in query_params else []
+    sort_attributes.append('id')
+    query_params = dict(query_params)
+    if 'ProjectionExpression' in query_params:
+        # The merge needs the sort attributes even if the response does not
+        names = dict(query_params['ExpressionAttributeNames'])
+        missing = [attribute for attribute in sort_attributes if attribute not in names.values()]
+        names.update({f'#s{position}': attribute for position, attribute in enumerate(missing)})
+        query_params['ExpressionAttributeNames'] = names
+        query_params['ProjectionExpression'] += ''.join(f', #s{position}' for position in range(len(missing)))
+    
+    def query_shard(partition):
+        shard_params = dict(query_params)
+        shard_params['ExpressionAttributeValues'] = dict(query_params['ExpressionAttributeValues'], **{':user_id': partition})
+        if 'ExclusiveStartKey' in query_params:
+            shard_params['ExclusiveStartKey'] = dict(query_params['ExclusiveStartKey'], user_id=partition)
+        return query_pages(shard_params, limit)
+    
+    # The pool's threads carry no request metrics, so the fan-out is timed
+    # and counted here as a whole
+    with span('DynamoDB'):
+        results = list(shard_read_pool.map(query_shard, partitions))
+    count_items_read(sum(len(items) for items, _ in results))
+    
+    if user_id in RESHARDING_USERS:
+        # A todo being moved briefly exists twice; the original (in the
+        # first, unsharded partition) wins
+        unmoved = {item['id'] for item in results[0][0]}
+        results = results[:1] + [([item for item in shard_items if item['id'] not in unmoved], last_evaluated_key)
+                                 for shard_items, last_evaluated_key in results[1:]]
+    items = sorted((item for shard_items, _ in results for item in shard_items),
+                   key=lambda item: tuple(item.get(attribute, '') for attribute in sort_attributes),
+                   reverse=query_params.get('ScanIndexForward') is False)
+    # A shard only stops early once it has `limit` items of its own
+    more = any(last_evaluated_key for _, last_evaluated_key in results)
+    if limit is not None and len(items) > limit:
+        items = items[:limit]
+        more = True
+    
+    last_evaluated_key = None
+    if more:
+        last_evaluated_key = {attribute: items[-1][attribute] for attribute in sort_attributes}
+        last_evaluated_key['user_id'] = user_id
+    return items, last_evaluated_key
+
+def iter_todo_pages(user_id, query_params):
+    """
+    iter_query_pages over the user's partitions, one after another
+
+    For reads that do not need a merged order. Every yielded page comes
+    with the key to resume after it, or None after the last one: the page's
+    LastEvaluatedKey (which names its partition), or just the next
+    partition ({'user_id': partition}) once a partition is exhausted. A
+    start key skips the partitions before its own.
+    """
+    partitions = todo_partitions(user_id)
+    start_key = query_params.get('ExclusiveStartKey')
+    if start_key and start_key['user_id'] in partitions:
+        partitions = partitions[partitions.index(start_key['user_id']):]
+    for position, partition in enumerate(partitions):
+        partition_params = dict(query_params)
+        partition_params['ExpressionAttributeValues'] = dict(query_params['ExpressionAttributeValues'], **{':user_id': partition})
+        partition_params.pop('ExclusiveStartKey', None)
+        if start_key and start_key['user_id'] == partition and 'id' in start_key:
+            partition_params['ExclusiveStartKey'] = start_key
+        next_partition = {'user_id': partitions[position + 1]} if position + 1 < len(partitions) else None
+        for items, last_evaluated_key in iter_query_pages(partition_params):
+            yield items, last_evaluated_key or next_partition
+
+def query_pages(query_params, limit=None):
+    """
+    Run a query, following LastEvaluatedKey until `limit` items have been
+    collected or the key range is exhausted.
+
+    Returns the items and the LastEvaluatedKey to resume from (None once
+    the range is exhausted). Without a limit every page is read.
+    """
+    query_params = dict(query_params)
+    items = []
+    last_evaluated_key = None
+    while True:
+        if limit is not None:
+            query_params['Limit'] = limit - len(items)
+
+        response = run_query(query_params)
+        items.extend(response.get('Items', []))
+        count_items_read(len(response.get('Items', [])))
+
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        if not last_evaluated_key or (limit is not None and len(items) >= limit):
+            return items, last_evaluated_key
+        query_params['ExclusiveStartKey'] = last_evaluated_key
+
+def iter_query_pages(query_params):
+    """
+    Lazily run a query page by page
+
+    Yields each page's items with the LastEvaluatedKey that resumes after
+    it (None on the last page); only one page is held at a time.
+    """
+    query_params = dict(query_params)
+    while True:
+        response = run_query(query_params)
+        items = response.get('Items', [])
+        count_items_read(len(items))
+        last_evaluated_key = response.get('LastEvaluatedKey')
+        yield items, last_evaluated_key
+        if not last_evaluated_key:
+            return
+        query_params['ExclusiveStartKey'] = last_evaluated_key
+
+def run_query(query_params):
+    """
+    Run one Query page through the configured data access layer
+
+    Parameters and results use plain Python values in both modes.
+    """
+    if dynamodb_client is None:
+        with span('DynamoDB'):
+            return table.query(**query_params)
+    
+    params = dict(query_params, TableName=table_name)
+    params['ExpressionAttributeValues'] = to_wire_item(query_params['ExpressionAttributeValues'])
+    if 'ExclusiveStartKey' in query_params:
+        params['ExclusiveStartKey'] = to_wire_item(query_params['ExclusiveStartKey'])
+    
+    with span('DynamoDB'):
+        response = dynamodb_client.query(**params)
+    result = {'Items': [from_wire_item(item) for item in response.get('Items', [])]}
+    if 'LastEvaluatedKey' in response:
+        result['LastEvaluatedKey'] = from_wire_item(response['LastEvaluatedKey'])
+    return result
+
+def read_item(**params):
+    """
+    Run a GetItem through the configured data access layer
+    """
+    if dynamodb_client is None:
+        with span('DynamoDB'):
+            response = table.get_item(**params)
+        count_items_read(1 if 'Item' in response else 0)
+        return response
+    
+    with span('DynamoDB'):
+        response = dynamodb_client.get_item(TableName=table_name, **dict(params, Key=to_wire_item(params['Key'])))
+    if 'Item' not in response:
+        return {}
+    count_items_read(1)
+    return {'Item': from_wire_item(response['Item'])}
+
+def from_wire_item(wire_item):
+    """
+    Decode a DynamoDB wire-format item ({"S": ...}, {"N": ...}, ...)
+
+    Numbers become int or float directly instead of Decimal.
+    """
+    return {name: from_wire(value) for name, value in wire_item.items()}
+
+def from_wire(wire_value):
+    """
+    Decode a single DynamoDB wire-format attribute value
+    """
+    if 'S' in wire_value:
+        return wire_value['S']
+    if 'BOOL' in wire_value:
+        return wire_value['BOOL']
+    if 'N' in wire_value:
+        return wire_number(wire_value['N'])
+    if 'NULL' in wire_value:
+        return None
+    if 'M' in wire_value:
+        return from_wire_item(wire_value['M'])
+    if 'L' in wire_value:
+        return [from_wire(value) for value in wire_value['L']]
+    if 'SS' in wire_value:
+        return set(wire_value['SS'])
+    if 'NS' in wire_value:
+        return {wire_number(value) for value in wire_value['NS']}
+    if 'B' in wire_value:
+        return wire_value['B']
+    if 'BS' in wire_value:
+        return set(wire_value['BS'])
+    raise ValueError(f'Unsupported DynamoDB attribute value: {wire_value}')
+
+def wire_number(text):
+    """
+    Decode a DynamoDB number string to int when integral, else float
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+def to_wire_item(item):
+    """
+    Encode a plain item or key into the DynamoDB wire format
+    """
+    return {name: to_wire(value) for name, value in item.items()}
+
+def to_wire(value):
+    """
+    Encode a single value into the DynamoDB wire format
+    """
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float, Decimal)):
+        return {'N': str(value)}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, dict):
+        return {'M': to_wire_item(value)}
+    if isinstance(value, (list, tuple)):
+        return {'L': [to_wire(inner) for inner in value]}
+    if isinstance(value, (set, frozenset)) and all(isinstance(inner, str) for inner in value):
+        return {'SS': sorted(value)}
+    if isinstance(value, (set, frozenset)):
+        return {'NS': [str(inner) for inner in value]}
+    if isinstance(value, bytes):
+        return {'B': value}
+    raise ValueError(f'Unsupported value for DynamoDB: {value!r}')
+
+def parse_sync_watermark(raw_since):
+    """
+    Normalize the `since` query parameter to the stored updated_at format
+
+    Stored timestamps are naive UTC ISO strings, so offsets (including the
+    `Z` suffix browsers send) are converted to UTC before comparison.
+    """
+    if raw_since is None or raw_since == '':
+        return None
+    try:
+        since = datetime.fromisoformat(raw_since)
+    except (TypeError, ValueError):
+        raise ValueError('since must be an ISO 8601 timestamp')
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    return since.isoformat()
+
+def sync_watermark(read_started):
+    """
+    Watermark for the next `since` sync after a read started at `read_started`
+
+    The newest updated_at seen is not safe: a write that commits after the
+    read may carry an earlier timestamp (it stamped it before committing,
+    or on a skewed clock) and would be skipped for good. Going back a
+    margin before the read re-sends a few todos instead; clients replace
+    todos by id, so the overlap is harmless.
+    """
+    return (read_started - timedelta(seconds=SYNC_WATERMARK_MARGIN_SECONDS)).isoformat()
+
+def tombstone_horizon():
+    """
+    Oldest watermark for which every delete is still recorded as a tombstone
+    """
+    return (datetime.utcnow() - timedelta(days=TOMBSTONE_TTL_DAYS)).isoformat()
+
+def parse_page_limit(raw_limit):
+    """
+    Validate the `limit` query parameter, returning None when it is absent
+    """
+    if raw_limit is None or raw_limit == '':
+        return None
+    try:
+        limit = int(raw_limit)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit
+
+def encode_cursor(last_evaluated_key):
+    """
+    Encode a DynamoDB LastEvaluatedKey as an opaque URL-safe cursor
+    """
+    if not last_evaluated_key:
+        return None
+    payload = json.dumps(last_evaluated_key, separators=(',', ':'), default=json_default)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, user_id):
+    """
+    Decode a cursor produced by encode_cursor into an ExclusiveStartKey
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        start_key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')), parse_float=Decimal)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError('Invalid cursor')
+    # A cursor is only valid inside the caller's own partitions
+    if not isinstance(start_key, dict) or start_key.get('user_id') not in [user_id] + todo_partitions(user_id):
+        raise ValueError('Invalid cursor')
+    return start_key
+
+def create_todo(user_id, request_body):
+    """
+    Create a new todo
+    """
+    try:
+        # Validate required fields (frontend sends 'title', we store as 'task')
+        if 'title' not in request_body:
+            return create_error_response(400, 'Title is required')
+        error = todo_fields_error(request_body)
+        if error:
+            return create_error_response(400, error)
+        
+        todo_item = build_todo_item(user_id, request_body)
+        assign_append_ranks(user_id, [todo_item])
+        
+        # Save to DynamoDB together with the stats counters and the list
+        # version; a client supplied id may not overwrite a live todo (it
+        # would count twice)
+        try:
+            list_version = write_with_list_version(user_id, [
+                {'Put': {
+                    'Item': todo_item,
+                    'ConditionExpression': 'attribute_not_exists(id) OR attribute_exists(deleted)'
+                }},
+                unmoved_todo_check(user_id, todo_item['id']) if 'id' in request_body else None,
+                stats_update(user_id, todo_stats_contribution(todo_item))
+            ])
+        except ClientError as e:
+            if is_conditional_check_failure(e):
+                return create_error_response(409, 'Todo already exists')
+            raise
+        update_search_postings(user_id, None, todo_item)
+        
+        # Convert to frontend format for the response
+        formatted_todo = format_todo_for_frontend(todo_item)
+        todo_list_cache.apply_write(user_id, list_version, todo=formatted_todo)
+        
+        return create_success_response({
+            'todo': formatted_todo,
+            'message': 'Todo created successfully'
+        }, 201)
+    
+    except Exception as e:
+        print(f"Error creating todo: {str(e)}")
+        return create_error_response(500, 'Error creating todo')
+
+def build_todo_item(user_id, request_body):
+    """
+    Build a backend todo item from a frontend create request
+    """
+    # Create new todo item with frontend structure mapped to backend
+    todo_id = request_body.get('id', str(uuid.uuid4()))
+    todo_item = {
+        'user_id': todo_partition(user_id, todo_id),
+        'id': todo_id,
+        'task': request_body['title'],  # Map frontend 'title' to backend 'task'
+        'category': request_body.get('category', 'other'),
+        'priority': request_body.get('priority', 'medium'),
+        'completed': request_body.get('completed', False),
+        'created_at': request_body.get('createdAt', datetime.utcnow().isoformat()),
+        'updated_at': datetime.utcnow().isoformat()
+    }
+    
+    # Add optional fields
+    if 'description' in request_body:
+        todo_item['description'] = request_body['description']
+    if request_body.get('dueDate'):
+        todo_item['due_date'] = request_body['dueDate']
+    if open_due_date(todo_item):
+        todo_item['open_due_date'] = open_due_date(todo_item)
+    if request_body.get('recurrence'):
+        todo_item['recurrence'] = request_body['recurrence']
+    
+    return compact_item(todo_item) if COMPACT_SCHEMA else todo_item
+
+def build_tombstone_item(user_id, todo_id, partition=None):
+    """
+    Build the deleted marker that replaces a todo until its TTL expires
+
+    `partition` is the one holding the todo, if it was read from elsewhere
+    than todo_partition assigns (see RESHARDING_USERS).
+    """
+    now = datetime.utcnow()
+    return {
+        'user_id': partition or todo_partition(user_id, todo_id),
+        'id': todo_id,
+        'deleted': True,
+        'updated_at': now.isoformat(),
+        'expires_at': int((now + timedelta(days=TOMBSTONE_TTL_DAYS)).replace(tzinfo=timezone.utc).timestamp())
+    }
+
+def batch_write_todos(user_id, request_body):
+    """
+    Create and delete many todos in one request
+
+    Expects {"operations": [{"type": "create", "todo": {...}},
+    {"type": "delete", "id": "..."}]} and returns one result per operation,
+    in request order.
+    """
+    try:
+        operations = request_body.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return create_error_response(400, 'operations must be a non-empty list')
+        if len(operations) > BATCH_MAX_OPERATIONS:
+            return create_error_response(400, f'At most {BATCH_MAX_OPERATIONS} operations are allowed')
+        
+        results = [None] * len(operations)
+        pending = []  # (result index, write request)
+        seen_ids = set()
+        
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                results[index] = {'index': index, 'status': 400, 'error': 'Operation must be an object'}
+                continue
+            
+            operation_type = operation.get('type')
+            if operation_type == 'create':
+                todo_data = operation.get('todo')
+                if not isinstance(todo_data, dict) or 'title' not in todo_data:
+                    results[index] = {'index': index, 'type': 'create', 'status': 400, 'error': 'Title is required'}
+                    continue
+                error = todo_fields_error(todo_data)
+                if error:
+                    results[index] = {'index': index, 'type': 'create', 'status': 400, 'error': error}
+                    continue
+                todo_item = build_todo_item(user_id, todo_data)
+                todo_id = todo_item['id']
+                write_request = {'PutRequest': {'Item': todo_item}}
+            elif operation_type == 'delete':
+                todo_id = operation.get('id')
+                if not todo_id:
+                    results[index] = {'index': index, 'type': 'delete', 'status': 400, 'error': 'id is required'}
+                    continue
+                # Deletes are written as tombstones, like delete_todo
+                write_request = {'PutRequest': {'Item': build_tombstone_item(user_id, todo_id)}}
+            else:
+                results[index] = {'index': index, 'status': 400, 'error': 'type must be create or delete'}
+                continue
+            
+            # BatchWriteItem rejects a request that touches the same key twice
+            if todo_id in seen_ids:
+                results[index] = {'index': index, 'type': operation_type, 'id': todo_id,
+                                  'status': 409, 'error': 'Duplicate id in batch'}
+                continue
+            seen_ids.add(todo_id)
+            pending.append((index, write_request))
+        
+        # BatchWriteItem cannot carry conditions, so the targeted ids are
+        # read first: like POST /todos and DELETE /todos/{id}, a create may
+        # not overwrite a live todo and a delete needs one to exist
+        checked_ids = [write_request['PutRequest']['Item']['id']
+                       for index, write_request in pending
+                       if operations[index]['type'] == 'delete' or 'id' in operations[index]['todo']]
+        live_items = {}
+        for start in range(0, len(checked_ids), BATCH_GET_MAX_KEYS):
+            for item in read_todos(user_id, checked_ids[start:start + BATCH_GET_MAX_KEYS], consistent=True):
+                if not item.get('deleted'):
+                    live_items[item['id']] = item
+        
+        writable = []
+        for index, write_request in pending:
+            todo_item = write_request['PutRequest']['Item']
+            if todo_item.get('deleted') and todo_item['id'] not in live_items:
+                results[index] = {'index': index, 'type': 'delete', 'id': todo_item['id'],
+                                  'status': 404, 'error': 'Todo not found'}
+            elif not todo_item.get('deleted') and todo_item['id'] in live_items:
+                results[index] = {'index': index, 'type': 'create', 'id': todo_item['id'],
+                                  'status': 409, 'error': 'Todo already exists'}
+            else:
+                if todo_item.get('deleted'):
+                    todo_item.update(stored_key(live_items[todo_item['id']]))
+                writable.append((index, write_request))
+        pending = writable
+        
+        assign_append_ranks(user_id, [write_request['PutRequest']['Item'] for _, write_request in pending
+                                      if not write_request['PutRequest']['Item'].get('deleted')])
+        
+        for start in range(0, len(pending), BATCH_WRITE_CHUNK_SIZE):
+            chunk = pending[start:start + BATCH_WRITE_CHUNK_SIZE]
+            unprocessed = write_batch_chunk([write_request for _, write_request in chunk])
+            
+            for index, write_request in chunk:
+                todo_item = write_request['PutRequest']['Item']
+                if todo_item.get('deleted'):
+                    result = {'index': index, 'type': 'delete', 'id': todo_item['id']}
+                    todo_item = None
+                else:
+                    result = {'index': index, 'type': 'create', 'id': todo_item['id']}
+                
+                if batch_request_key(write_request) in unprocessed:
+                    result.update({'status': 503, 'error': 'Write was throttled, retry later'})
+                elif todo_item is not None:
+                    result.update({'status': 201, 'todo': format_todo_for_frontend(todo_item)})
+                else:
+                    result['status'] = 200
+                results[index] = result
+        
+        # Postings of created todos are added and those of deleted ones
+        # dropped
+        write_search_postings([posting
+                               for index, write_request in pending
+                               if results[index]['status'] < 400
+                               for posting in search_posting_writes(
+                                   user_id,
+                                   live_items.get(write_request['PutRequest']['Item']['id']),
+                                   write_request['PutRequest']['Item'])])
+        
+        failed = sum(1 for result in results if result['status'] >= 400)
+        if failed < len(results):
+            # BatchWriteItem cannot carry the counter updates, so the stats
+            # are recounted on their next read; flagging them and bumping the
+            # list version share one round trip
+            transact_write([stats_stale_update(user_id), list_version_update(user_id)])
+            todo_list_cache.invalidate(user_id)
+        return create_success_response({
+            'results': results,
+            'succeeded': len(results) - failed,
+            'failed': failed
+        })
+    
+    except Exception as e:
+        print(f"Error in batch write: {str(e)}")
+        return create_error_response(500, 'Error processing batch')
+
+def write_batch_chunk(write_requests):
+    """
+    Send up to 25 write requests with BatchWriteItem, retrying
+    UnprocessedItems with jittered exponential backoff.
+
+    Returns the keys (see batch_request_key) of requests that were still
+    unprocessed after the final retry.
+    """
+    remaining = write_requests
+    
+    for attempt in range(BATCH_MAX_RETRIES + 1):
+        if attempt:
+            sleep_before_retry(attempt)
+        
+        with span('DynamoDB'):
+            response = dynamodb.batch_write_item(RequestItems={table_name: remaining})
+        remaining = response.get('UnprocessedItems', {}).get(table_name, [])
+        if not remaining:
+            return set()
+    
+    return {batch_request_key(write_request) for write_request in remaining}
+
+def sleep_before_retry(attempt):
+    """
+    Jittered exponential backoff before retrying unprocessed batch items
+
+    Full jitter keeps concurrent retries from re-colliding.
+    """
+    delay = min(BATCH_BACKOFF_MAX_SECONDS, BATCH_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    time.sleep(random.uniform(0, delay))
+
+def read_items(keys, consistent=False):
+    """
+    Fetch up to 100 items by key with BatchGetItem through the configured
+    data access layer, retrying unprocessed keys. Order is not preserved.
+    """
+    items = []
+    pending = list(keys)
+    request = {'ConsistentRead': True} if consistent else {}
+    for attempt in range(BATCH_MAX_RETRIES + 1):
+        if not pending:
+            break
+        if attempt:
+            sleep_before_retry(attempt)
+        
+        if dynamodb_client is None:
+            with span('DynamoDB'):
+                response = dynamodb.batch_get_item(RequestItems={table_name: dict(request, Keys=pending)})
+            found = response.get('Responses', {}).get(table_name, [])
+            pending = response.get('UnprocessedKeys', {}).get(table_name, {}).get('Keys', [])
+        else:
+            with span('DynamoDB'):
+                response = dynamodb_client.batch_get_item(
+                    RequestItems={table_name: dict(request, Keys=[to_wire_item(key) for key in pending])})
+            found = [from_wire_item(item) for item in response.get('Responses', {}).get(table_name, [])]
+            pending = [from_wire_item(key)
+                       for key in response.get('UnprocessedKeys', {}).get(table_name, {}).get('Keys', [])]
+        items.extend(found)
+        count_items_read(len(found))
+    
+    if pending:
+        print(f"BatchGetItem left {len(pending)} keys unprocessed")
+    return items
+
+def batch_request_key(write_request):
+    """
+    Identify a BatchWriteItem request by the todo id it targets
+    """
+    if 'PutRequest' in write_request:
+        return write_request['PutRequest']['Item']['id']
+    return write_request['DeleteRequest']['Key']['id']
+
+def apply_todo_operations(user_id, request_body):
+    """
+    Create, update and delete todos in all-or-nothing groups
+
+    Expects {"operations": [{"type": "create", "todo": {...}},
+    {"type": "update", "id": "...", "todo": {...}}, {"type": "delete",
+    "id": "..."}]}; updates take the same fields as PUT /todos/{id}.
+    Operations are split, in order, into groups of up to OPS_GROUP_SIZE and
+    each group runs as one TransactWriteItems with its combined stats
+    deltas, so either all of a group is applied or none of it. Returns one
+    result per operation, in request order; operations that were fine but
+    sat in a failed group report 424.
+    """
+    try:
+        operations = request_body.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return create_error_response(400, 'operations must be a non-empty list')
+        if len(operations) > BATCH_MAX_OPERATIONS:
+            return create_error_response(400, f'At most {BATCH_MAX_OPERATIONS} operations are allowed')
+        
+        results = [None] * len(operations)
+        # A transaction may not touch the same todo twice, and splitting
+        # them over groups would make the outcome depend on group size
+        seen_ids = set()
+        prepared = []  # (index, type, todo id, payload)
+        for index, operation in enumerate(operations):
+            operation_type, todo_id, payload, error = parse_todo_operation(user_id, operation)
+            if error is None and todo_id in seen_ids:
+                error = (409, 'Duplicate id in operations')
+            seen_ids.add(todo_id)
+            if error is not None:
+                results[index] = {'index': index, 'type': operation_type, 'id': todo_id,
+                                  'status': error[0], 'error': error[1]}
+            prepared.append((index, operation_type, todo_id, payload))
+        assign_append_ranks(user_id, [payload for _, operation_type, _, payload in prepared
+                                      if operation_type == 'create' and payload is not None])
+        
+        for group, start in enumerate(range(0, len(prepared), OPS_GROUP_SIZE)):
+            run_todo_operation_group(user_id, prepared[start:start + OPS_GROUP_SIZE], group, results)
+        
+        failed = sum(1 for result in results if result['status'] >= 400)
+        if failed < len(results):
+            todo_list_cache.invalidate(user_id)
+        return create_success_response({
+            'results': results,
+            'succeeded': len(results) - failed,
+            'failed': failed
+        })
+    
+    except Exception as e:
+        print(f"Error applying operations: {str(e)}")
+        return create_error_response(500, 'Error applying operations')
+
+def parse_todo_operation(user_id, operation):
+    """
+    Validate one /todos/ops operation
+
+    Returns (type, todo id, payload, error); the payload is the item to
+    put for a create and the changes for an update, and error is None or
+    a (status, message) pair.
+    """
+    if not isinstance(operation, dict):
+        return None, None, None, (400, 'Operation must be an object')
+    operation_type = operation.get('type')
+    if operation_type not in ('create', 'update', 'delete'):
+        return operation_type, None, None, (400, 'type must be create, update or delete')
+    
+    if operation_type == 'create':
+        todo_data = operation.get('todo')
+        if not isinstance(todo_data, dict) or 'title' not in todo_data:
+            return operation_type, None, None, (400, 'Title is required')
+        error = todo_fields_error(todo_data)
+        if error:
+            return operation_type, None, None, (400, error)
+        todo_item = build_todo_item(user_id, todo_data)
+        return operation_type, todo_item['id'], todo_item, None
+    
+    todo_id = operation.get('id')
+    if not todo_id:
+        return operation_type, None, None, (400, 'id is required')
+    if operation_type == 'delete':
+        return operation_type, todo_id, None, None
+    todo_data = operation.get('todo')
+    if not isinstance(todo_data, dict):
+        return operation_type, todo_id, None, (400, 'todo must be an object')
+    error = todo_fields_error(todo_data)
+    if error:
+        return operation_type, todo_id, None, (400, error)
+    return operation_type, todo_id, build_todo_changes(todo_data), None
+
+def run_todo_operation_group(user_id, group_operations, group, results):
+    """
+    Run one group of parsed operations as a single transaction, filling in
+    their entries of `results`
+
+    Updated and deleted todos are read first (for the stats deltas and the
+    unchanged-since-read conditions); if one changes before the commit the
+    group is re-read and retried, like update_todo_with_stats.
+    """
+    def fail_group(status, error):
+        for index, operation_type, todo_id, _ in group_operations:
+            if results[index] is None:
+                results[index] = {'index': index, 'type': operation_type, 'id': todo_id, 'status': status, 'error': error}
+            results[index]['group'] = group
+    
+    if any(results[index] is not None for index, _, _, _ in group_operations):
+        return fail_group(424, 'Not applied: another operation in the group failed')
+    
+    read_ids = [todo_id for _, operation_type, todo_id, _ in group_operations if operation_type != 'create']
+    for attempt in range(WRITE_CONFLICT_RETRIES):
+        current = {}
+        for start in range(0, len(read_ids), BATCH_GET_MAX_KEYS):
+            current.update((item['id'], item) for item in read_todos(user_id, read_ids[start:start + BATCH_GET_MAX_KEYS],
+                                                                     consistent=True))
+        
+        transact_items = []
+        outcomes = []  # (index, type, old item, new item), aligned with transact_items
+        deltas = {}
+        for index, operation_type, todo_id, payload in group_operations:
+            old = current.get(todo_id)
+            if operation_type == 'create':
+                old, new = None, payload
+                transact_items.append({'Put': {
+                    'Item': new,
+                    'ConditionExpression': 'attribute_not_exists(id) OR attribute_exists(deleted)'
+                }})
+            elif old is None or old.get('deleted'):
+                results[index] = {'index': index, 'type': operation_type, 'id': todo_id,
+                                  'status': 404, 'error': 'Todo not found'}
+                continue
+            else:
+                condition, condition_values = unchanged_since_read_condition(old)
+                if operation_type == 'update':
+                    new = apply_changes(old, payload)
+                    update_expression, expression_attribute_values = build_update_expression(payload, old)
+                    expression_attribute_values.update(condition_values)
+                    transact_items.append({'Update': {
+                        'Key': stored_key(old),
+                        'UpdateExpression': update_expression,
+                        'ConditionExpression': condition,
+                        'ExpressionAttributeValues': expression_attribute_values
+                    }})
+                else:
+                    new = None
+                    put = {'Item': build_tombstone_item(user_id, todo_id, old['user_id']), 'ConditionExpression': condition}
+                    if condition_values:
+                        put['ExpressionAttributeValues'] = condition_values
+                    transact_items.append({'Put': put})
+            outcomes.append((index, operation_type, old, new))
+            for name, delta in stats_deltas(old, new).items():
+                deltas[name] = deltas.get(name, 0) + delta
+        
+        if len(outcomes) < len(group_operations):
+            return fail_group(424, 'Not applied: another operation in the group failed')
+        
+        try:
+            transact_write(transact_items + [stats_update(user_id, deltas), list_version_update(user_id)])
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons', [])
+            conflicting_creates = [outcomes[position] for position, reason in enumerate(reasons[:len(outcomes)])
+                                   if reason.get('Code') == 'ConditionalCheckFailed'
+                                   and outcomes[position][1] == 'create']
+            if conflicting_creates:
+                for index, operation_type, _, new in conflicting_creates:
+                    results[index] = {'index': index, 'type': operation_type, 'id': new['id'],
+                                      'status': 409, 'error': 'Todo already exists'}
+                return fail_group(424, 'Not applied: another operation in the group failed')
+            # An update or delete lost a race (or another transaction held
+            # one of the items): read again and retry
+            if any(reason.get('Code') not in ('None', 'ConditionalCheckFailed', 'TransactionConflict')
+                   for reason in reasons):
+                raise
+            continue
+        
+        remove_zero_counters(user_id, decremented_due_counters(deltas))
+        for index, operation_type, old, new in outcomes:
+            update_search_postings(user_id, old, new)
+            result = {'index': index, 'type': operation_type, 'id': (new or old)['id'], 'group': group,
+                      'status': 201 if operation_type == 'create' else 200}
+            result['todo'] = format_todo_for_frontend(new if new is not None else old)
+            results[index] = result
+        return
+    
+    fail_group(409, 'Todos were modified concurrently, retry the operations')
+
+def search_todos(user_id, query_parameters, list_version=None):
+    """
+    Search the user's todo titles and descriptions
+
+    Every term of `q` must prefix-match a token of the todo. Results are
+    ranked by how well they match: whole-token matches count more than
+    prefix matches and title tokens more than description tokens. A warm
+    cached list is searched in memory; otherwise only the postings of the
+    matching tokens are read.
+    """
+    try:
+        query_parameters = query_parameters or {}
+        try:
+            terms = parse_search_terms(query_parameters.get('q'))
+            limit = parse_page_limit(query_parameters.get('limit')) or SEARCH_DEFAULT_LIMIT
+            limit = min(limit, SEARCH_MAX_LIMIT)
+        except ValueError as e:
+            return create_error_response(400, str(e))
+        
+        if todo_list_cache.enabled:
+            if list_version is None:
+                list_version = get_list_version(user_id)
+            entry = todo_list_cache.get(user_id, list_version)
+            if entry is not None:
+                ranked = []
+                for todo in entry['todos']:
+                    score = search_score(search_tokens(todo['title'], todo['description']), terms)
+                    if score is not None:
+                        ranked.append((score, todo))
+                return search_response(ranked, limit)
+        
+        ensure_search_index(user_id)
+        return search_response(search_postings(user_id, terms, limit), limit)
+    
+    except Exception as e:
+        print(f"Error searching todos: {str(e)}")
+        return create_error_response(500, 'Error searching todos')
+
+def parse_search_terms(raw_query):
+    """
+    Split the `q` parameter into distinct lowercase search terms
+    """
+    terms = [term for term in dict.fromkeys(SEARCH_TOKEN_PATTERN.findall((raw_query or '').lower()))
+             if len(term) >= SEARCH_MIN_PREFIX]
+    if not terms:
+        raise ValueError(f'q must contain a word of at least {SEARCH_MIN_PREFIX} characters')
+    return [term[:SEARCH_MAX_TOKEN_LENGTH] for term in terms]
+
+def search_tokens(title, description):
+    """
+    Weighted tokens of a todo: {token: weight}, title words weighing more
+    """
+    tokens = {}
+    for text, weight in ((title, SEARCH_TITLE_WEIGHT), (description, 1)):
+        if not isinstance(text, str):
+            continue
+        for token in SEARCH_TOKEN_PATTERN.findall(text.lower()):
+            token = token[:SEARCH_MAX_TOKEN_LENGTH]
+            if token in tokens or len(tokens) < SEARCH_MAX_TOKENS_PER_TODO:
+                tokens[token] = tokens.get(token, 0) + weight
+    return tokens
+
+def search_score(tokens, terms):
+    """
+    Rank a todo's tokens against the search terms (None if a term misses)
+    """
+    score = 0
+    for term in terms:
+        best = 0
+        for token, weight in tokens.items():
+            if token.startswith(term):
+                best = max(best, weight if len(token) == len(term) else weight / 2)
+        if not best:
+            return None
+        score += best
+    return score
+
+def search_response(ranked, limit):
+    """
+    Build the search response from (score, formatted todo) pairs
+    """
+    # Best match first, most recently updated first among equals
+    ranked.sort(key=lambda result: (result[0], result[1]['updatedAt'] or ''), reverse=True)
+    todos = [todo for _, todo in ranked[:limit]]
+    return create_success_response({
+        'todos': todos,
+        'count': len(todos)
+    })
+
+def search_partition(user_id):
+    """
+    Partition key of the user's search postings
+    """
+    return user_id + SEARCH_USER_SUFFIX
+
+def search_posting_writes(user_id, old_item, new_item):
+    """
+    BatchWriteItem requests that move a todo's postings from `old_item`'s
+    tokens to `new_item`'s (either may be None)
+    """
+    def tokens_of(item):
+        if not item or item.get('deleted'):
+            return {}
+        item = expand_item(item)
+        return search_tokens(item.get('task'), item.get('description'))
+    
+    old_tokens = tokens_of(old_item)
+    new_tokens = tokens_of(new_item)
+    todo_id = (new_item or old_item)['id']
+    writes = []
+    for token, weight in new_tokens.items():
+        if old_tokens.get(token) != weight:
+            writes.append({'PutRequest': {'Item': {
+                'user_id': search_partition(user_id),
+                'id': f'{token}#{todo_id}',
+                'weight': weight
+            }}})
+    for token in old_tokens:
+        if token not in new_tokens:
+            writes.append({'DeleteRequest': {'Key': {
+                'user_id': search_partition(user_id),
+                'id': f'{token}#{todo_id}'
+            }}})
+    return writes
+
+def update_search_postings(user_id, old_item, new_item):
+    """
+    Keep the search index in step with a single-todo write
+    """
+    write_search_postings(search_posting_writes(user_id, old_item, new_item))
+
+def write_search_postings(write_requests):
+    """
+    Write posting changes in BatchWriteItem chunks
+
+    The index is best effort: failures are logged rather than failing the
+    todo write, and searches verify every hit against the todo itself.
+    """
+    try:
+        for start in range(0, len(write_requests), BATCH_WRITE_CHUNK_SIZE):
+            unprocessed = write_batch_chunk(write_requests[start:start + BATCH_WRITE_CHUNK_SIZE])
+            if unprocessed:
+                print(f"Search index writes left unprocessed: {len(unprocessed)}")
+    except Exception as e:
+        print(f"Error updating search index: {str(e)}")
+
+def ensure_search_index(user_id):
+    """
+    Index the todos of users whose todos predate the search index
+    """
+    marker_key = {'user_id': user_id + META_USER_SUFFIX, 'id': SEARCH_MARKER_ID}
+    if 'Item' in read_item(Key=marker_key):
+        return
+    
+    items, _ = query_todo_pages(user_id, {
+        'KeyConditionExpression': 'user_id = :user_id',
+        'FilterExpression': 'attribute_not_exists(deleted)',
+        'ExpressionAttributeValues': {
+            ':user_id': user_id
+        }
+    })
+    write_search_postings([posting for item in items for posting in search_posting_writes(user_id, None, item)])
+    with span('DynamoDB'):
+        table.put_item(Item=dict(marker_key, indexed_at=datetime.utcnow().isoformat()))
+    print(f"Built search index: user={user_id} todos={len(items)}")
+
+def search_postings(user_id, terms, limit):
+    """
+    Look the terms up in the posting partition and verify the best hits
+
+    Each term is one range read over the postings whose token starts with
+    it. Candidates are fetched in rank order and re-scored from the stored
+    todo; postings of deleted or since-edited todos are removed on the way.
+    Returns (score, formatted todo) pairs.
+    """
+    candidates = None
+    posting_ids = {}  # todo_id -> posting ids seen
+    for term in terms:
+        postings, _ = query_pages({
+            'KeyConditionExpression': 'user_id = :user_id AND begins_with(id, :term)',
+            'ExpressionAttributeValues': {
+                ':user_id': search_partition(user_id),
+                ':term': term
+            }
+        })
+        term_scores = {}
+        for posting in postings:
+            token, _, todo_id = posting['id'].partition('#')
+            weight = int(posting.get('weight', 1))
+            score = weight if token == term else weight / 2
+            term_scores[todo_id] = max(term_scores.get(todo_id, 0), score)
+            posting_ids.setdefault(todo_id, []).append(posting['id'])
+        
+        if candidates is None:
+            candidates = term_scores
+        else:
+            candidates = {todo_id: score + term_scores[todo_id]
+                          for todo_id, score in candidates.items() if todo_id in term_scores}
+        if not candidates:
+            return []
+    
+    ranked = []
+    stale = []
+    ordered = sorted(candidates, key=candidates.get, reverse=True)
+    for start in range(0, len(ordered), BATCH_GET_MAX_KEYS):
+        todo_ids = ordered[start:start + BATCH_GET_MAX_KEYS]
+        items = {item['id']: item for item in read_todos(user_id, todo_ids)}
+        for todo_id in todo_ids:
+            item = items.get(todo_id)
+            if item is None or item.get('deleted'):
+                tokens = {}
+            else:
+                item = expand_item(item)
+                tokens = search_tokens(item.get('task'), item.get('description'))
+            stale.extend(posting_id for posting_id in posting_ids[todo_id]
+                         if posting_id.partition('#')[0] not in tokens)
+            score = search_score(tokens, terms)
+            if score is not None:
+                ranked.append((score, format_todo_for_frontend(item)))
+        if len(ranked) >= limit:
+            break
+    
+    if stale:
+        write_search_postings([{'DeleteRequest': {'Key': {'user_id': search_partition(user_id), 'id': posting_id}}}
+                               for posting_id in dict.fromkeys(stale)])
+    return ranked
+
+def export_todos(event, user_id, query_parameters):
+    """
+    Export the user's todos as NDJSON, one todo per line
+
+    Pages are read lazily and each is encoded, and compressed when asked
+    for, before the next is read, so memory stays bounded by
+    EXPORT_MAX_BYTES rather than by the number of todos. A REST API proxy
+    integration cannot stream, so a longer export ends after the page that
+    crosses the limit and returns X-Next-Cursor; passing it as `cursor`
+    continues the export.
+
+    With Accept-Encoding: gzip the body is sent with Content-Encoding;
+    `gzip=true` instead returns an application/gzip file.
+    """
+    try:
+        query_parameters = query_parameters or {}
+        try:
+            start_key = decode_cursor(query_parameters.get('cursor'), user_id)
+        except ValueError as e:
+            return create_error_response(400, str(e))
+        
+        as_file = query_parameters.get('gzip', '').lower() == 'true'
+        compress = as_file or accepts_gzip(get_request_header(event, 'Accept-Encoding'))
+        # wbits=31 writes the gzip header and trailer
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+        
+        query_params = {
+            'KeyConditionExpression': 'user_id = :user_id',
+            'FilterExpression': 'attribute_not_exists(deleted)',
+            'ExpressionAttributeValues': {
+                ':user_id': user_id
+            }
+        }
+        if start_key:
+            query_params['ExclusiveStartKey'] = start_key
+        
+        chunks = []
+        body_bytes = 0
+        exported = 0
+        next_cursor = None
+        for items, last_evaluated_key in iter_todo_pages(user_id, query_params):
+            with span('Serialize'):
+                chunk = ''.join(json.dumps(format_todo_for_frontend(item), default=json_default) + '\n'
+                                for item in items).encode('utf-8')
+            if compressor is not None:
+                with span('Compress'):
+                    chunk = compressor.compress(chunk)
+            chunks.append(chunk)
+            body_bytes += len(chunk)
+            exported += len(items)
+            if last_evaluated_key and body_bytes >= EXPORT_MAX_BYTES:
+                next_cursor = encode_cursor(last_evaluated_key)
+                break
+        if compressor is not None:
+            with span('Compress'):
+                chunks.append(compressor.flush())
+        body = b''.join(chunks)
+        
+        headers = cors_headers()
+        headers['Content-Type'] = 'application/x-ndjson'
+        headers['Vary'] = 'Accept-Encoding'
+        headers['X-Exported-Count'] = str(exported)
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        if as_file:
+            headers['Content-Type'] = 'application/gzip'
+            headers['Content-Disposition'] = 'attachment; filename="todos.ndjson.gz"'
+        elif compress:
+            headers['Content-Encoding'] = 'gzip'
+        
+        if compress:
+            return {
+                'statusCode': 200,
+                'headers': headers,
+                'body': base64.b64encode(body).decode('ascii'),
+                'isBase64Encoded': True
+            }
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': body.decode('utf-8')
+        }
+    
+    except Exception as e:
+        print(f"Error exporting todos: {str(e)}")
+        return create_error_response(500, 'Error exporting todos')
+
+def get_todos_with_archive(user_id, filters, fields, list_version):
+    """
+    Serve the full (optionally filtered and sorted) list plus the user's
+    archived todos, which are flagged with `archived: true`
+
+    The archive is only read for these requests. A todo that is live again
+    (an archive run whose tombstone lost to an edit) is served from the
+    table, never from its stale archived copy.
+    """
+    todos = read_full_todo_list(user_id, list_version)
+    live_ids = {todo['id'] for todo in todos}
+    archived = [todo for todo_id, todo in load_archived_todos(user_id).items() if todo_id not in live_ids]
+    todos = [todo for todo in todos + archived if todo_matches_filters(todo, filters)]
+    todos = sort_todos(todos, filters.get('sort'))
+    with span('Format'):
+        todos = [dict(trimmed, archived=True) if todo.get('archived') else trimmed
+                 for todo, trimmed in zip(todos, trim_todos(todos, fields))]
+    return create_success_response({
+        'todos': todos,
+        'count': len(todos),
+        'archivedCount': len(archived),
+        'nextCursor': None
+    })
+
+def read_full_todo_list(user_id, list_version):
+    """
+    All of the user's live todos in frontend format, from the list cache
+    when it is enabled
+    """
+    if todo_list_cache.enabled:
+        if list_version is None:
+            list_version = get_list_version(user_id)
+        entry = todo_list_cache.get(user_id, list_version) or load_todo_list_into_cache(user_id, list_version)
+        return entry['todos']
+    
+    items, _ = query_todo_pages(user_id, {
+        'KeyConditionExpression': 'user_id = :user_id',
+        'FilterExpression': 'attribute_not_exists(deleted)',
+        'ExpressionAttributeValues': {
+            ':user_id': user_id
+        }
+    })
+    with span('Format'):
+        return [format_todo_for_frontend(item) for item in items]
+
+def get_todos_in_window(user_id, filters, fields, window, list_version):
+    """
+    Serve the full list with every recurring todo replaced by its
+    occurrences in the window
+
+    Occurrences are computed from the series' RRULE on each request; the
+    completed ones are read with one range query of the user's recurrence
+    partition. An occurrence carries the series' fields with its own
+    dueDate, completion and id (seriesId#occurrence) plus `seriesId` and
+    `occurrence`. Other todos pass through unchanged, and filters and sort
+    apply to the expanded list. A series with more than
+    RECURRENCE_MAX_OCCURRENCES occurrences in the window is cut off there
+    and `truncated` is set.
+    """
+    start, end = window
+    completed = completed_occurrences(user_id, start, end)
+    todos = []
+    truncated = False
+    with span('Format'):
+        for todo in read_full_todo_list(user_id, list_version):
+            occurrences = todo_occurrences(todo, start, end) if todo['recurrence'] else None
+            if occurrences is None:
+                todos.append(todo)
+                continue
+            if len(occurrences) > RECURRENCE_MAX_OCCURRENCES:
+                occurrences = occurrences[:RECURRENCE_MAX_OCCURRENCES]
+                truncated = True
+            todos.extend(occurrence_todo(todo, occurrence, (occurrence, todo['id']) in completed)
+                         for occurrence in occurrences)
+    
+    todos = sort_todos([todo for todo in todos if todo_matches_filters(todo, filters)], filters.get('sort'))
+    if fields is not None:
+        todos = [dict({field: todo[field] for field in fields},
+                      **{key: todo[key] for key in ('seriesId', 'occurrence') if key in todo})
+                 for todo in todos]
+    return create_success_response({
+        'todos': todos,
+        'count': len(todos),
+        'truncated': truncated,
+        'nextCursor': None
+    })
+
+def parse_occurrence_window(query_parameters):
+    """
+    Validate the `from` and `to` query parameters into the (start, end)
+    datetimes of an occurrence window, end exclusive; None without them
+
+    A date without a time as `to` includes that whole day.
+    """
+    raw_from, raw_to = query_parameters.get('from'), query_parameters.get('to')
+    if not raw_from and not raw_to:
+        return None
+    if not raw_from or not raw_to:
+        raise ValueError('from and to must be given together')
+    try:
+        start = parse_occurrence_datetime(raw_from)
+        end = parse_occurrence_datetime(raw_to)
+    except ValueError:
+        raise ValueError('from and to must be ISO 8601 dates')
+    end += timedelta(days=1) if len(raw_to) == 10 else timedelta(microseconds=1)
+    if end <= start:
+        raise ValueError('to must not be before from')
+    return start, end
+
+def parse_occurrence_datetime(value):
+    """
+    Parse an ISO 8601 date or time into a naive UTC datetime, the form
+    recurrence rules are expanded in
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def todo_fields_error(request_body):
+    """
+    Why the fields of a create or update request are invalid, or None
+
+    category and dueDate are index keys, which DynamoDB rejects when empty
+    or not a string: a category must be a non-empty string, while an empty
+    or null dueDate means none (and clears it on update).
+    """
+    category = request_body.get('category', 'other')
+    if not isinstance(category, str) or not category:
+        return 'category must be a non-empty string'
+    due_date = request_body.get('dueDate')
+    if due_date is not None and not isinstance(due_date, str):
+        return 'dueDate must be a date string or null'
+    return recurrence_error(request_body)
+
+def recurrence_error(request_body):
+    """
+    Why the `recurrence` of a create or update request is invalid, or None
+
+    An empty value clears the recurrence.
+    """
+    rule = request_body.get('recurrence')
+    if not rule:
+        return None
+    message = 'recurrence must be an RRULE of daily or coarser frequency, e.g. FREQ=WEEKLY;BYDAY=MO'
+    if not isinstance(rule, str) or SUB_DAILY_FREQUENCY.search(rule):
+        return message
+    try:
+        parsed = rrulestr(rule, dtstart=EPOCH)
+    except (ValueError, TypeError):
+        return message
+    return None if isinstance(parsed, rrule) else message
+
+@lru_cache(maxsize=RECURRENCE_CACHE_SIZE)
+def parse_recurrence(rule, anchor):
+    """
+    The rrule for a series, starting at `anchor` (its due date, or its
+    creation time without one)
+
+    Rules are kept per container with dateutil's occurrence cache on, so
+    expanding a series again reuses the occurrences already computed.
+    """
+    return rrulestr(rule, dtstart=parse_occurrence_datetime(anchor), cache=True)
+
+def todo_occurrences(todo, start, end):
+    """
+    Occurrences of a recurring formatted todo in [start, end), formatted
+    like its anchor; at most one more than RECURRENCE_MAX_OCCURRENCES. None
+    if the rule or anchor cannot be parsed, so the todo is shown as is.
+    """
+    anchor = todo['dueDate'] or todo['createdAt']
+    try:
+        rule = parse_recurrence(todo['recurrence'], anchor)
+    except (ValueError, TypeError):
+        return None
+    occurrences = []
+    for occurrence in rule.xafter(start, count=RECURRENCE_MAX_OCCURRENCES + 1, inc=True):
+        if occurrence >= end:
+            break
+        occurrences.append(occurrence.date().isoformat() if len(anchor) == 10 else occurrence.isoformat())
+    return occurrences
+
+def occurrence_todo(todo, occurrence, completed):
+    """
+    One occurrence of a recurring formatted todo
+    """
+    return dict(todo, id=f"{todo['id']}#{occurrence}", dueDate=occurrence, completed=completed,
+                seriesId=todo['id'], occurrence=occurrence)
+
+def completed_occurrences(user_id, start, end):
+    """
+    (occurrence, series id) pairs completed in the window (possibly a
+    little more: the read is rounded out to whole days)
+    """
+    items, _ = query_pages({
+        'KeyConditionExpression': 'user_id = :user_id AND id BETWEEN :start AND :end',
+        'ExpressionAttributeValues': {
+            ':user_id': user_id + RECURRENCE_USER_SUFFIX,
+            ':start': start.date().isoformat(),
+            ':end': (end.date() + timedelta(days=1)).isoformat()
+        }
+    })
+    return {(item['occurrence'], item['series_id']) for item in items}
+
+def set_occurrence_completed(user_id, todo_id, request_body):
+    """
+    Mark one occurrence of a recurring todo completed, or not
+
+    Expects {"occurrence": "...", "completed": true} with the occurrence as
+    GET /todos?from=&to= lists it. Completing writes an exception item to
+    the user's recurrence partition and un-completing deletes it, so only
+    completed occurrences take space. The series and its stats are left
+    alone.
+    """
+    try:
+        occurrence = request_body.get('occurrence')
+        completed = request_body.get('completed', True)
+        if not isinstance(occurrence, str) or not occurrence:
+            return create_error_response(400, 'occurrence is required')
+        if not isinstance(completed, bool):
+            return create_error_response(400, 'completed must be true or false')
+        
+        item = read_todo(user_id, todo_id, ConsistentRead=True).get('Item')
+        if item is None or item.get('deleted'):
+            return create_error_response(404, 'Todo not found')
+        todo = format_todo_for_frontend(item)
+        if not todo['recurrence']:
+            return create_error_response(400, 'Todo is not recurring')
+        try:
+            occurrence_at = parse_occurrence_datetime(occurrence)
+        except ValueError:
+            return create_error_response(400, 'occurrence must be an ISO 8601 date')
+        if todo_occurrences(todo, occurrence_at, occurrence_at + timedelta(microseconds=1)) != [occurrence]:
+            return create_error_response(400, 'Not an occurrence of this todo')
+        
+        key = {'user_id': user_id + RECURRENCE_USER_SUFFIX, 'id': f'{occurrence}#{todo_id}'}
+        if completed:
+            write = {'Put': {'Item': dict(key, series_id=todo_id, occurrence=occurrence, completed=True,
+                                          updated_at=datetime.utcnow().isoformat())}}
+        else:
+            write = {'Delete': {'Key': key}}
+        # Windowed reads (and their ETags) depend on the exceptions too; the
+        # cached list itself is unchanged
+        list_version = write_with_list_version(user_id, [write])
+        todo_list_cache.apply_write(user_id, list_version, todo=todo)
+        
+        return create_success_response({'todo': occurrence_todo(todo, occurrence, completed)})
+    
+    except Exception as e:
+        print(f"Error updating occurrence: {str(e)}")
+        return create_error_response(500, 'Error updating occurrence')
+
+def archive_prefix(user_id):
+    """
+    Key prefix of the user's archive objects
+    """
+    return f'{user_id}/'
+
+def load_archived_todos(user_id):
+    """
+    Read every archive object of the user into formatted todos by id
+
+    Object names start with the archive time, so when a todo was archived
+    more than once the latest copy wins.
+    """
+    if s3 is None:
+        return {}
+    keys = []
+    params = {'Bucket': ARCHIVE_BUCKET, 'Prefix': archive_prefix(user_id)}
+    while True:
+        response = s3.list_objects_v2(**params)
+        keys.extend(entry['Key'] for entry in response.get('Contents', []))
+        if not response.get('IsTruncated'):
+            break
+        params['ContinuationToken'] = response['NextContinuationToken']
+    
+    todos = {}
+    for key in sorted(keys):
+        body = s3.get_object(Bucket=ARCHIVE_BUCKET, Key=key)['Body'].read()
+        with span('Format'):
+            for line in gzip.decompress(body).splitlines():
+                todo = format_todo_for_frontend(json.loads(line))
+                todo['archived'] = True
+                todos[todo['id']] = todo
+    return todos
+
+def archive_completed_todos(user_id, older_than_days=ARCHIVE_AFTER_DAYS):
+    """
+    Move the user's todos completed and unchanged for more than
+    `older_than_days` days into a new archive object
+
+    The object is written first. Each todo is then replaced by a tombstone
+    (so delta sync clients drop it and TTL removes it) in a transaction
+    with its stats deltas, conditioned on the todo being unchanged. A todo
+    edited in between stays live and its archived copy is ignored, so an
+    interrupted run can simply be repeated. Returns the number archived.
+    """
+    if s3 is None:
+        raise RuntimeError('TODOS_ARCHIVE_BUCKET is not configured')
+    cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).isoformat()
+    items, _ = query_todo_pages(user_id, {
+        'IndexName': UPDATED_AT_INDEX,
+        'KeyConditionExpression': 'user_id = :user_id AND updated_at < :cutoff',
+        'FilterExpression': 'attribute_not_exists(deleted) AND completed = :completed',
+        'ExpressionAttributeValues': {
+            ':user_id': user_id,
+            ':cutoff': cutoff,
+            ':completed': True
+        }
+    })
+    if not items:
+        return 0
+    
+    now = datetime.utcnow()
+    body = ''.join(json.dumps(item, default=json_default) + '\n' for item in items).encode('utf-8')
+    s3.put_object(
+        Bucket=ARCHIVE_BUCKET,
+        Key=f"{archive_prefix(user_id)}{now.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.ndjson.gz",
+        Body=gzip.compress(body, compresslevel=9),
+        ContentType='application/x-ndjson',
+        ContentEncoding='gzip'
+    )
+    
+    archived = 0
+    for item in items:
+        condition, condition_values = unchanged_since_read_condition(item)
+        put = {'Item': dict(build_tombstone_item(user_id, item['id'], item['user_id']), archived=True),
+               'ConditionExpression': condition}
+        if condition_values:
+            put['ExpressionAttributeValues'] = condition_values
+        try:
+            transact_write([
+                {'Put': put},
+                stats_update(user_id, stats_deltas(item, None)),
+                list_version_update(user_id)
+            ])
+        except ClientError as e:
+            if is_conditional_check_failure(e):
+                continue
+            raise
+        update_search_postings(user_id, item, None)
+        archived += 1
+    
+    if archived:
+        todo_list_cache.invalidate(user_id)
+    print(f"Archived todos: user={user_id} archived={archived} skipped={len(items) - archived}")
+    return archived
+
+def get_todo(user_id, todo_id, list_version=None, query_parameters=None):
+    """
+    Get a specific todo
+    """
+    try:
+        try:
+            fields = parse_fields((query_parameters or {}).get('fields'))
+        except ValueError as e:
+            return create_error_response(400, str(e))
+        
+        # A cached list for the current version is complete, so it answers
+        # both hits and 404s without touching DynamoDB
+        if todo_list_cache.enabled and list_version is not None:
+            entry = todo_list_cache.get(user_id, list_version)
+            if entry is not None:
+                position = bisect.bisect_left(entry['ids'], todo_id)
+                if position < len(entry['ids']) and entry['ids'][position] == todo_id:
+                    return create_success_response({
+                        'todo': trim_todos([entry['todos'][position]], fields)[0]
+                    })
+                return create_error_response(404, 'Todo not found')
+        
+        # Get todo from DynamoDB
+        response = read_todo(
+            user_id, todo_id,
+            **projection_params(fields, ('deleted',))
+        )
+        
+        if 'Item' not in response or response['Item'].get('deleted'):
+            return create_error_response(404, 'Todo not found')
+        
+        todo = format_todo_for_frontend(response['Item'], fields)
+        
+        return create_success_response({
+            'todo': todo
+        })
+    
+    except Exception as e:
+        print(f"Error getting todo: {str(e)}")
+        return create_error_response(500, 'Error retrieving todo')
+
+def update_todo(user_id, todo_id, request_body):
+    """
+    Update an existing todo
+    """
+    try:
+        error = todo_fields_error(request_body)
+        if error:
+            return create_error_response(400, error)
+        return update_todo_with_stats(user_id, todo_id, build_todo_changes(request_body))
+    
+    except Exception as e:
+        print(f"Error updating todo: {str(e)}")
+        return create_error_response(500, 'Error updating todo')
+
+def update_todo_with_stats(user_id, todo_id, changes):
+    """
+    Apply an update, the matching stats deltas and the list version bump
+    in one transaction
+
+    The todo is read first to compute the deltas (there are none unless a
+    counted field changes); the write is conditioned on its updated_at so a
+    concurrent change causes a re-read, not drift.
+    """
+    for attempt in range(WRITE_CONFLICT_RETRIES):
+        current = read_todo(user_id, todo_id, ConsistentRead=True).get('Item')
+        if current is None or current.get('deleted'):
+            return create_error_response(404, 'Todo not found')
+        
+        updated = apply_changes(current, changes)
+        update_expression, expression_attribute_values = build_update_expression(changes, current)
+        condition, condition_values = unchanged_since_read_condition(current)
+        expression_attribute_values.update(condition_values)
+        deltas = stats_deltas(current, updated)
+        try:
+            list_version = write_with_list_version(user_id, [
+                {'Update': {
+                    'Key': stored_key(current),
+                    'UpdateExpression': update_expression,
+                    'ConditionExpression': condition,
+                    'ExpressionAttributeValues': expression_attribute_values
+                }},
+                stats_update(user_id, deltas)
+            ])
+        except ClientError as e:
+            if is_conditional_check_failure(e):
+                continue
+            raise
+        remove_zero_counters(user_id, decremented_due_counters(deltas))
+        return todo_updated_response(user_id, current, updated, list_version)
+    
+    return create_error_response(409, 'Todo was modified concurrently, retry the update')
+
+def build_todo_changes(request_body):
+    """
+    Map the fields of a frontend update request to stored attributes
+    """
+    changes = {'updated_at': datetime.utcnow().isoformat()}
+    for field, attribute in UPDATABLE_FIELDS.items():
+        if field in request_body:
+            changes[attribute] = request_body[field]
+    return changes
+
+def build_update_expression(changes, current=None):
+    """
+    Build an update expression and its values from build_todo_changes output
+
+    Changed attributes are written in the configured schema and their copy
+    in the other one is removed; an empty due_date is removed. Given the
+    `current` item, its attributes still in the other schema are migrated
+    in the same write, and a change to completed or due_date also sets or
+    removes open_due_date.
+    """
+    if current is not None and any(name in current for name in (COMPACT_NAMES if COMPACT_SCHEMA else FULL_NAMES)):
+        expanded = expand_item(current)
+        changes = dict({attribute: expanded[attribute] for attribute in COMPACT_NAMES if attribute in expanded},
+                       **changes)
+    stored_changes = compact_item(changes) if COMPACT_SCHEMA else changes
+    # An empty due date is removed rather than set: it is an index key
+    removals = [] if stored_changes.get('due_date', True) else ['due_date']
+    stored_changes = {attribute: value for attribute, value in stored_changes.items() if attribute not in removals}
+    if current is not None and ('completed' in changes or 'due_date' in changes):
+        open_due = open_due_date(dict(expand_item(current), **changes))
+        if open_due:
+            stored_changes = dict(stored_changes, open_due_date=open_due)
+        else:
+            removals.append('open_due_date')
+    
+    assignments = []
+    expression_attribute_values = {}
+    for attribute, value in stored_changes.items():
+        assignments.append(f'{attribute} = :{attribute}')
+        expression_attribute_values[f':{attribute}'] = value
+    update_expression = 'SET ' + ', '.join(assignments)
+    
+    removals += [attribute if COMPACT_SCHEMA else COMPACT_NAMES[attribute]
+                 for attribute in changes if attribute in COMPACT_NAMES]
+    if removals:
+        update_expression += ' REMOVE ' + ', '.join(removals)
+    return update_expression, expression_attribute_values
+
+def apply_changes(item, changes):
+    """
+    The stored form of `item` after build_todo_changes output is applied
+    """
+    updated = dict(expand_item(item), **changes)
+    if not updated.get('due_date', True):
+        del updated['due_date']
+    if 'completed' in changes or 'due_date' in changes:
+        updated.pop('open_due_date', None)
+        if open_due_date(updated):
+            updated['open_due_date'] = open_due_date(updated)
+    return compact_item(updated) if COMPACT_SCHEMA else updated
+
+def open_due_date(item):
+    """
+    The open_due_date an item should carry: its due date while it is not
+    completed, else None
+    """
+    if item.get('completed') or not item.get('due_date'):
+        return None
+    return item['due_date']
+
+def unchanged_since_read_condition(current):
+    """
+    Condition that the todo is still live and as `current` was read
+
+    Every write sets updated_at, so it serves as the item's version.
+    """
+    if 'updated_at' not in current:
+        return 'attribute_exists(id) AND attribute_not_exists(deleted) AND attribute_not_exists(updated_at)', {}
+    return ('attribute_not_exists(deleted) AND updated_at = :expected_updated_at',
+            {':expected_updated_at': current['updated_at']})
+
+def todo_updated_response(user_id, old_todo, stored_todo, list_version):
+    """
+    Refresh the list cache and search postings and answer a successful PUT
+
+    `list_version` is what write_with_list_version returned for the write.
+    """
+    update_search_postings(user_id, old_todo, stored_todo)
+    
+    updated_todo = format_todo_for_frontend(stored_todo)
+    todo_list_cache.apply_write(user_id, list_version, todo=updated_todo)
+    
+    return create_success_response({
+        'todo': updated_todo,
+        'message': 'Todo updated successfully'
+    })
+
+def move_todo(user_id, todo_id, request_body):
+    """
+    Move a todo in the manual (rank) order
+
+    Expects {"afterId": "...", "beforeId": "..."}, the todos that end up
+    directly above and below it. Either may be left out: the other
+    neighbour is then looked up in the rank index (without the index the
+    todo goes to the very top or bottom of that side). Only the moved todo
+    is written, with a rank key between its new neighbours'. If a
+    neighbour is unranked, or the two are not in rank order (todos
+    appended at the same moment can share a key), the list is ranked
+    afresh first.
+    """
+    try:
+        after_id = request_body.get('afterId')
+        before_id = request_body.get('beforeId')
+        if not after_id and not before_id:
+            return create_error_response(400, 'afterId or beforeId is required')
+        if todo_id in (after_id, before_id) or after_id == before_id:
+            return create_error_response(400, 'afterId and beforeId must be two other todos')
+        
+        todo_ids = [todo_id] + [neighbour_id for neighbour_id in (after_id, before_id) if neighbour_id]
+        for attempt in range(2):
+            current = {item['id']: item
+                       for item in read_todos(user_id, todo_ids, consistent=True)
+                       if not item.get('deleted')}
+            if any(read_id not in current for read_id in todo_ids):
+                return create_error_response(404, 'Todo not found')
+            lower = current[after_id].get('rank') if after_id else None
+            upper = current[before_id].get('rank') if before_id else None
+            if ((not after_id or lower) and (not before_id or upper)
+                    and (lower is None or upper is None or lower < upper)):
+                if not before_id:
+                    upper = adjacent_rank(user_id, lower, todo_id, following=True)
+                elif not after_id:
+                    lower = adjacent_rank(user_id, upper, todo_id, following=False)
+                break
+            if attempt:
+                return create_error_response(409, 'Todos were reordered concurrently, retry the move')
+            rebalance_ranks(user_id, force=True)
+        
+        changes = {'rank': key_between(lower, upper), 'updated_at': datetime.utcnow().isoformat()}
+        try:
+            list_version = write_with_list_version(user_id, [
+                {'Update': {
+                    'Key': stored_key(current[todo_id]),
+                    'UpdateExpression': 'SET #rank = :rank, updated_at = :updated_at',
+                    'ConditionExpression': 'attribute_exists(id) AND attribute_not_exists(deleted)',
+                    'ExpressionAttributeNames': {'#rank': 'rank'},
+                    'ExpressionAttributeValues': {':rank': changes['rank'], ':updated_at': changes['updated_at']}
+                }}
+            ])
+        except ClientError as e:
+            if is_conditional_check_failure(e):
+                return create_error_response(404, 'Todo not found')
+            raise
+        
+        return todo_updated_response(user_id, current[todo_id], apply_changes(current[todo_id], changes), list_version)
+    
+    except Exception as e:
+        print(f"Error moving todo: {str(e)}")
+        return create_error_response(500, 'Error moving todo')
+
+def adjacent_rank(user_id, rank, todo_id, following):
+    """
+    The rank key right after (or before) `rank` in the rank index, skipping
+    todo `todo_id`; None at the end of the list or without the index
+    """
+    if not RANK_INDEX:
+        return None
+    items, _ = query_todo_pages(user_id, {
+        'IndexName': RANK_INDEX,
+        'KeyConditionExpression': f"user_id = :user_id AND #rank {'>' if following else '<'} :rank",
+        'ExpressionAttributeValues': {':user_id': user_id, ':rank': rank},
+        'ExpressionAttributeNames': {'#rank': 'rank', '#id': 'id'},
+        'ProjectionExpression': '#rank, #id',
+        'ScanIndexForward': following
+    }, limit=2)
+    return next((item['rank'] for item in items if item['id'] != todo_id), None)
+
+def assign_append_ranks(user_id, todo_items):
+    """
+    Rank new todo items, in order, after the user's last ranked todo
+
+    Finding the last todo takes a one-item query of the rank index; without
+    the index the items are left unranked.
+    """
+    if not RANK_INDEX or not todo_items:
+        return
+    last, _ = query_todo_pages(user_id, {
+        'IndexName': RANK_INDEX,
+        'KeyConditionExpression': 'user_id = :user_id',
+        'ExpressionAttributeValues': {':user_id': user_id},
+        'ExpressionAttributeNames': {'#rank': 'rank'},
+        'ProjectionExpression': '#rank',
+        'ScanIndexForward': False
+    }, limit=1)
+    rank = last[0]['rank'] if last else None
+    for todo_item in todo_items:
+        rank = key_between(rank, None)
+        todo_item['rank'] = rank
+
+def rebalance_ranks(user_id, force=False):
+    """
+    Rewrite the user's rank keys as short, evenly spaced ones in the
+    current order (ranked todos first, then unranked ones oldest first)
+
+    Does nothing unless forced, a key is longer than RANK_REBALANCE_LENGTH
+    or, with the rank index, a todo is unranked (the index leaves it out).
+    Each rewrite is conditioned on the key that was read, so a concurrent
+    move is not overwritten, and sets updated_at so delta sync clients
+    pick the new keys up. Returns the number of todos rewritten.
+    """
+    items, _ = query_todo_pages(user_id, {
+        'KeyConditionExpression': 'user_id = :user_id',
+        'FilterExpression': 'attribute_not_exists(deleted)',
+        'ExpressionAttributeValues': {
+            ':user_id': user_id
+        }
+    })
+    if not force and not any(len(item.get('rank', '')) > RANK_REBALANCE_LENGTH or (RANK_INDEX and 'rank' not in item)
+                             for item in items):
+        return 0
+    
+    partitions = {item['id']: item['user_id'] for item in items}
+    rewritten = 0
+    rank = None
+    updated_at = datetime.utcnow().isoformat()
+    for todo in sort_todos([format_todo_for_frontend(item) for item in items], 'rank'):
+        rank = key_between(rank, None)
+        if todo['rank'] == rank:
+            continue
+        values = {':rank': rank, ':updated_at': updated_at}
+        if todo['rank']:
+            condition = '#rank = :old_rank'
+            values[':old_rank'] = todo['rank']
+        else:
+            condition = 'attribute_exists(id) AND attribute_not_exists(#rank)'
+        try:
+            transact_write([
+                {'Update': {
+                    'Key': {'user_id': partitions[todo['id']], 'id': todo['id']},
+                    'UpdateExpression': 'SET #rank = :rank, updated_at = :updated_at',
+                    'ConditionExpression': condition + ' AND attribute_not_exists(deleted)',
+                    'ExpressionAttributeNames': {'#rank': 'rank'},
+                    'ExpressionAttributeValues': values
+                }},
+                list_version_update(user_id)
+            ])
+        except ClientError as e:
+            if is_conditional_check_failure(e):
+                continue
+            raise
+        rewritten += 1
+    
+    if rewritten:
+        todo_list_cache.invalidate(user_id)
+    return rewritten
+
+def key_between(lower, upper):
+    """
+    A rank key sorting strictly between `lower` and `upper` (None for an
+    open end)
+
+    Keys are fractional indexes: a variable-length integer part whose first
+    character encodes its length ('a' is 2 characters, 'b' 3, ...; 'Z',
+    'Y', ... for negative integers), then a fraction without trailing
+    zeros. Appending increments the integer part, so appended keys stay
+    short; only inserting between neighbours extends the fraction.
+    """
+    if lower is not None and upper is not None and lower >= upper:
+        raise ValueError(f'Rank {lower!r} does not sort before {upper!r}')
+    if lower is None:
+        if upper is None:
+            return 'a' + RANK_DIGITS[0]
+        integer = rank_integer_part(upper)
+        if integer == 'A' + RANK_DIGITS[0] * 26:
+            return integer + rank_midpoint('', upper[len(integer):])
+        if integer < upper:
+            return integer
+        decremented = decrement_rank_integer(integer)
+        if decremented is None:
+            raise ValueError('Cannot rank before the smallest key')
+        return decremented
+    
+    integer = rank_integer_part(lower)
+    fraction = lower[len(integer):]
+    if upper is not None and integer == rank_integer_part(upper):
+        return integer + rank_midpoint(fraction, upper[len(integer):])
+    incremented = increment_rank_integer(integer)
+    if incremented is not None and (upper is None or incremented < upper):
+        return incremented
+    return integer + rank_midpoint(fraction, None)
+
+def rank_integer_part(key):
+    """
+    The integer part of a rank key (see key_between)
+    """
+    head = key[0]
+    if 'a' <= head <= 'z':
+        return key[:ord(head) - ord('a') + 2]
+    if 'A' <= head <= 'Z':
+        return key[:ord('Z') - ord(head) + 2]
+    raise ValueError(f'Invalid rank key {key!r}')
+
+def rank_midpoint(lower, upper):
+    """
+    A fraction between two fractions ('' for zero, None for one)
+    """
+    if upper is not None:
+        common = 0
+        while (lower[common] if common < len(lower) else RANK_DIGITS[0]) == upper[common]:
+            common += 1
+        if common:
+            return upper[:common] + rank_midpoint(lower[common:], upper[common:])
+    lower_digit = RANK_DIGITS.index(lower[0]) if lower else 0
+    upper_digit = RANK_DIGITS.index(upper[0]) if upper is not None else len(RANK_DIGITS)
+    if upper_digit - lower_digit > 1:
+        return RANK_DIGITS[(lower_digit + upper_digit + 1) // 2]
+    if upper is not None and len(upper) > 1:
+        return upper[0]
+    return RANK_DIGITS[lower_digit] + rank_midpoint(lower[1:], None)
+
+def increment_rank_integer(integer):
+    """
+    The next integer part, or None past the largest
+    """
+    head, digits = integer[0], list(integer[1:])
+    for position in reversed(range(len(digits))):
+        digit = RANK_DIGITS.index(digits[position]) + 1
+        if digit < len(RANK_DIGITS):
+            digits[position] = RANK_DIGITS[digit]
+            return head + ''.join(digits)
+        digits[position] = RANK_DIGITS[0]
+    # Every digit carried: move to the next length
+    if head == 'Z':
+        return 'a' + RANK_DIGITS[0]
+    if head == 'z':
+        return None
+    head = chr(ord(head) + 1)
+    if head > 'a':
+        digits.append(RANK_DIGITS[0])
+    else:
+        digits.pop()
+    return head + ''.join(digits)
+
+def decrement_rank_integer(integer):
+    """
+    The previous integer part, or None below the smallest
+    """
+    head, digits = integer[0], list(integer[1:])
+    for position in reversed(range(len(digits))):
+        digit = RANK_DIGITS.index(digits[position]) - 1
+        if digit >= 0:
+            digits[position] = RANK_DIGITS[digit]
+            return head + ''.join(digits)
+        digits[position] = RANK_DIGITS[-1]
+    if head == 'a':
+        return 'Z' + RANK_DIGITS[-1]
+    if head == 'A':
+        return None
+    head = chr(ord(head) - 1)
+    if head < 'Z':
+        digits.append(RANK_DIGITS[-1])
+    else:
+        digits.pop()
+    return head + ''.join(digits)
+
+def delete_todo(user_id, todo_id):
+    """
+    Delete a todo
+
+    The item is replaced by a tombstone so delta sync clients learn about
+    the delete; DynamoDB TTL removes the tombstone later. The todo is read
+    first so its counters can be subtracted in the same transaction.
+    """
+    try:
+        for attempt in range(WRITE_CONFLICT_RETRIES):
+            current = read_todo(user_id, todo_id, ConsistentRead=True).get('Item')
+            if current is None or current.get('deleted'):
+                return create_error_response(404, 'Todo not found')
+            
+            condition, condition_values = unchanged_since_read_condition(current)
+            put = {'Item': build_tombstone_item(user_id, todo_id, current['user_id']), 'ConditionExpression': condition}
+            if condition_values:
+                put['ExpressionAttributeValues'] = condition_values
+            deltas = stats_deltas(current, None)
+            try:
+                list_version = write_with_list_version(user_id, [
+                    {'Put': put},
+                    stats_update(user_id, deltas)
+                ])
+            except ClientError as e:
+                if is_conditional_check_failure(e):
+                    continue
+                raise
+            break
+        else:
+            return create_error_response(409, 'Todo was modified concurrently, retry the delete')
+        
+        remove_zero_counters(user_id, decremented_due_counters(deltas))
+        todo_list_cache.apply_write(user_id, list_version, deleted_id=todo_id)
+        update_search_postings(user_id, current, None)
+        
+        deleted_todo = format_todo_for_frontend(current)
+        
+        return create_success_response({
+            'todo': deleted_todo,
+            'message': 'Todo deleted successfully'
+        })
+    
+    except Exception as e:
+        print(f"Error deleting todo: {str(e)}")
+        return create_error_response(500, 'Error deleting todo')
+
+def transact_write(transact_items):
+    """
+    Run TransactWriteItems against the todos table
+
+    Takes Put/Update/Delete/ConditionCheck entries with plain Python values
+    (None entries are skipped) and encodes them for the low-level client,
+    which the resource API does not wrap.
+    """
+    wire_items = []
+    for transact_item in transact_items:
+        if transact_item is None:
+            continue
+        (action, params), = transact_item.items()
+        params = dict(params, TableName=table_name)
+        for field in ('Item', 'Key', 'ExpressionAttributeValues'):
+            if field in params:
+                params[field] = to_wire_item(params[field])
+        wire_items.append({action: params})
+    
+    client = dynamodb_client or dynamodb.meta.client
+    with span('DynamoDB'):
+        return client.transact_write_items(TransactItems=wire_items)
+
+def is_conditional_check_failure(error):
+    """
+    Check whether a ClientError was raised by a failed ConditionExpression,
+    on its own or as the reason a transaction was cancelled
+    """
+    code = error.response.get('Error', {}).get('Code')
+    if code == 'TransactionCanceledException':
+        return any(reason.get('Code') == 'ConditionalCheckFailed'
+                   for reason in error.response.get('CancellationReasons', []))
+    return code == 'ConditionalCheckFailedException'
+
+def stats_key(user_id):
+    """
+    Key of the per-user stats counters item
+    """
+    return {
+        'user_id': user_id + META_USER_SUFFIX,
+        'id': STATS_ITEM_ID
+    }
+
+def todo_stats_contribution(item):
+    """
+    Counters a stored todo adds to its owner's stats item
+
+    Open todos are counted per due date rather than as "overdue", which
+    depends on the day the stats are read (see summarize_todo_stats).
+    """
+    if not item or item.get('deleted'):
+        return {}
+    counters = {'total': 1, f"category:{item.get('category', 'other')}": 1}
+    if item.get('completed'):
+        counters['completed'] = 1
+    elif item.get('due_date'):
+        counters[f"open_due:{item['due_date']}"] = 1
+    return counters
+
+def stats_deltas(old_item, new_item):
+    """
+    Counter changes caused by replacing `old_item` with `new_item`
+    """
+    deltas = dict(todo_stats_contribution(new_item))
+    for name, count in todo_stats_contribution(old_item).items():
+        deltas[name] = deltas.get(name, 0) - count
+    return {name: delta for name, delta in deltas.items() if delta}
+
+def stats_update(user_id, deltas):
+    """
+    Transaction entry applying `deltas` to the stats item with ADD
+
+    Every change also bumps `revision`, which lets repair_todo_stats detect
+    writes that raced with its recount. Returns None when nothing changes.
+    """
+    if not deltas:
+        return None
+    names = {}
+    values = {':one': 1}
+    actions = ['revision :one']
+    for position, (name, delta) in enumerate(sorted(deltas.items())):
+        names[f'#c{position}'] = name
+        values[f':c{position}'] = delta
+        actions.append(f'#c{position} :c{position}')
+    return {'Update': {
+        'Key': stats_key(user_id),
+        'UpdateExpression': 'ADD ' + ', '.join(actions),
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values
+    }}
+
+def decremented_due_counters(deltas):
+    """
+    Per-due-date counters that `deltas` lowered, and may have brought to zero
+    """
+    return [name for name, delta in deltas.items() if delta < 0 and name.startswith('open_due:')]
+
+def remove_zero_counters(user_id, names):
+    """
+    Remove the named counters from the stats item if they are zero
+
+    ADD leaves a counter at zero rather than removing it, so without this
+    the item would keep one attribute for every due date the user ever set
+    and grow towards the item size limit. Each chunk is conditioned on its
+    counters still being zero, so an increment that races the removal is
+    not lost (the zeros are then left for a later write or stats read).
+    Best effort: failures are logged, not raised.
+    """
+    for start in range(0, len(names), STATS_REMOVE_CHUNK_SIZE):
+        chunk = names[start:start + STATS_REMOVE_CHUNK_SIZE]
+        attribute_names = {f'#c{position}': name for position, name in enumerate(chunk)}
+        try:
+            with span('DynamoDB'):
+                table.update_item(
+                    Key=stats_key(user_id),
+                    UpdateExpression='REMOVE ' + ', '.join(attribute_names),
+                    ConditionExpression=' AND '.join(f'{placeholder} = :zero' for placeholder in attribute_names),
+                    ExpressionAttributeNames=attribute_names,
+                    ExpressionAttributeValues={
+                        ':zero': 0
+                    }
+                )
+        except ClientError as e:
+            if not is_conditional_check_failure(e):
+                print(f"Error removing zero stats counters: {str(e)}")
+
+def stats_stale_update(user_id):
+    """
+    Transaction entry flagging the stats item for a recount after writes
+    that bypassed the counters
+    """
+    return {'Update': {
+        'Key': stats_key(user_id),
+        'UpdateExpression': 'SET stale = :stale ADD revision :one',
+        'ExpressionAttributeValues': {
+            ':stale': True,
+            ':one': 1
+        }
+    }}
+
+def get_todo_stats(user_id, query_parameters):
+    """
+    Get the user's todo counters
+
+    Normally a single GetItem of the stats item. A missing or stale item
+    (users from before the counters existed, or after a batch write) is
+    rebuilt first, as is any item when `repair=true` is passed.
+    """
+    try:
+        stats_item = read_item(Key=stats_key(user_id), ConsistentRead=True).get('Item')
+        repair = (query_parameters or {}).get('repair', '').lower() == 'true'
+        if stats_item is None or stats_item.get('stale') or repair:
+            stats_item = repair_todo_stats(user_id)
+        else:
+            # Catches zeros whose removal lost a race with another write
+            remove_zero_counters(user_id, [name for name, count in stats_item.items()
+                                           if name.startswith(('open_due:', 'category:')) and count == 0])
+        
+        return create_success_response({
+            'stats': summarize_todo_stats(stats_item)
+        })
+    
+    except Exception as e:
+        print(f"Error getting todo stats: {str(e)}")
+        return create_error_response(500, 'Error retrieving todo stats')
+
+def repair_todo_stats(user_id):
+    """
+    Recount the user's stats item from a full query of their todos
+
+    The new counters are only written if `revision` did not move while
+    counting; otherwise a write raced the recount and it starts over.
+    Returns the counters that were written. If writes keep racing it for
+    WRITE_CONFLICT_RETRIES attempts the stored item is left as it was (a
+    stale one is recounted on its next read) and the last, unsaved count
+    is returned and logged.
+    """
+    for attempt in range(WRITE_CONFLICT_RETRIES):
+        current = read_item(Key=stats_key(user_id), ConsistentRead=True).get('Item') or {}
+        revision = current.get('revision')
+        items, _ = query_todo_pages(user_id, {
+            'KeyConditionExpression': 'user_id = :user_id',
+            'FilterExpression': 'attribute_not_exists(deleted)',
+            'ExpressionAttributeValues': {
+                ':user_id': user_id
+            },
+            'ConsistentRead': True
+        })
+        
+        stats_item = dict(stats_key(user_id), revision=int(revision or 0) + 1)
+        for item in items:
+            for name, count in todo_stats_contribution(item).items():
+                stats_item[name] = stats_item.get(name, 0) + count
+        
+        if revision is None:
+            condition = {'ConditionExpression': 'attribute_not_exists(revision)'}
+        else:
+            condition = {
+                'ConditionExpression': 'revision = :revision',
+                'ExpressionAttributeValues': {':revision': revision}
+            }
+        try:
+            with span('DynamoDB'):
+                table.put_item(Item=stats_item, **condition)
+        except ClientError as e:
+            if is_conditional_check_failure(e):
+                continue
+            raise
+        print(f"Repaired todo stats: user={user_id} todos={len(items)}")
+        return stats_item
+    
+    print(f"Error repairing todo stats: user={user_id} writes raced all {WRITE_CONFLICT_RETRIES} recounts; "
+          f"serving an unsaved count")
+    return stats_item
+
+def summarize_todo_stats(stats_item):
+    """
+    Turn a stats item into the GET /todos/stats response body
+    """
+    today = datetime.utcnow().date().isoformat()
+    total = int(stats_item.get('total', 0))
+    completed = int(stats_item.get('completed', 0))
+    overdue = 0
+    by_category = {}
+    for name, count in stats_item.items():
+        if name.startswith('open_due:') and name[len('open_due:'):] < today:
+            overdue += int(count)
+        elif name.startswith('category:') and count:
+            by_category[name[len('category:'):]] = int(count)
+    return {
+        'total': total,
+        'completed': completed,
+        'active': total - completed,
+        'overdue': overdue,
+        'byCategory': by_category
+    }
+
+def format_todo_for_frontend(backend_todo, fields=None):
+    """
+    Convert backend todo structure to frontend expected format
+
+    Values are passed through as stored; DynamoDB Decimals are converted by
+    json_default while the response is serialized, so no second copy of
+    the result set is built. `fields` (see parse_fields) limits the output
+    to those fields. Items in the compact schema are expanded first.
+    """
+    if not COMPACT_NAMES_SET.isdisjoint(backend_todo):
+        backend_todo = expand_item(backend_todo)
+    get = backend_todo.get
+    if fields is not None:
+        return {field: get(*FRONTEND_FIELDS[field]) for field in fields}
+    return {
+        'id': get('id'),
+        'title': get('task', ''),  # Map backend 'task' to frontend 'title'
+        'category': get('category', 'other'),
+        'priority': get('priority', 'medium'),
+        'completed': get('completed', False),
+        'createdAt': get('created_at', ''),
+        'updatedAt': get('updated_at', ''),
+        'description': get('description', ''),
+        'dueDate': get('due_date', ''),
+        'rank': get('rank', ''),
+        'recurrence': get('recurrence', '')
+    }
+
+def compact_item(item):
+    """
+    Rewrite an item, or a set of changes to one, in the compact schema
+    """
+    compact = {}
+    for attribute, value in item.items():
+        if attribute == 'created_at':
+            value = encode_timestamp(value)
+        elif attribute == 'priority':
+            value = PRIORITY_CODES.get(value, value)
+        compact[COMPACT_NAMES.get(attribute, attribute)] = value
+    return compact
+
+def expand_item(item):
+    """
+    Rewrite an item in the full schema
+
+    Items written before a rewrite finished may hold both names of an
+    attribute; the compact one is the newer.
+    """
+    if COMPACT_NAMES_SET.isdisjoint(item):
+        return item
+    expanded = dict(item)
+    for compact, attribute in FULL_NAMES.items():
+        if compact in expanded:
+            value = expanded.pop(compact)
+            if attribute == 'created_at':
+                value = decode_timestamp(value)
+            elif attribute == 'priority':
+                value = PRIORITY_NAMES.get(value, value)
+            expanded[attribute] = value
+    return expanded
+
+def encode_timestamp(value):
+    """
+    Naive ISO timestamp -> integer microseconds since the epoch
+
+    Anything that would not decode to the identical string (offsets,
+    client-specific formats) is stored unchanged.
+    """
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+    if parsed.tzinfo is not None or parsed.isoformat() != value:
+        return value
+    return (parsed - EPOCH) // timedelta(microseconds=1)
+
+def decode_timestamp(value):
+    """
+    Inverse of encode_timestamp
+    """
+    if isinstance(value, str):
+        return value
+    return (EPOCH + timedelta(microseconds=int(value))).isoformat()
+
+def json_default(value):
+    """
+    Serialize DynamoDB types that json does not handle natively
+
+    Integral Decimals become ints and the rest floats; sets (DynamoDB
+    SS/NS) become sorted lists.
+    """
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def cors_headers():
+    """
+    Headers shared by every response
+    """
+    return {
+        'Content-Type': 'application/json',
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match,Idempotency-Key',
+        'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS',
+        'Access-Control-Expose-Headers': 'ETag,X-Next-Cursor,X-Exported-Count,Idempotent-Replayed'
+    }
+
+def create_success_response(data, status_code=200):
+    """
+    Create a successful HTTP response with CORS headers
+    """
+    with span('Serialize'):
+        body = json.dumps(data, default=json_default)
+    return {
+        'statusCode': status_code,
+        'headers': cors_headers(),
+        'body': body
+    }
+
+def create_not_modified_response(etag):
+    """
+    Create a bodyless 304 response for a matching If-None-Match
+    """
+    headers = cors_headers()
+    headers['ETag'] = etag
+    headers['Cache-Control'] = 'private, no-cache'
+    return {
+        'statusCode': 304,
+        'headers': headers,
+        'body': ''
+    }
+
+def accepts_gzip(accept_encoding):
+    """
+    Check whether an Accept-Encoding header allows gzip
+    """
+    if not accept_encoding:
+        return False
+    for coding in accept_encoding.split(','):
+        name, _, params = coding.strip().partition(';')
+        if name.strip().lower() not in ('gzip', '*'):
+            continue
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+def compress_response(event, response):
+    """
+    Gzip a response body above GZIP_MIN_BYTES if the client accepts it
+
+    The compressed body is returned base64-encoded with isBase64Encoded so
+    API Gateway sends it to the client as binary.
+    """
+    body = response.get('body')
+    if not body or response.get('isBase64Encoded'):
+        return response
+    
+    raw_body = body.encode('utf-8')
+    if len(raw_body) < GZIP_MIN_BYTES:
+        return response
+    
+    headers = response['headers']
+    headers['Vary'] = 'Accept-Encoding'
+    if not accepts_gzip(get_request_header(event, 'Accept-Encoding')):
+        return response
+    
+    compressed = gzip.compress(raw_body, compresslevel=GZIP_LEVEL, mtime=0)
+    response['body'] = base64.b64encode(compressed).decode('ascii')
+    response['isBase64Encoded'] = True
+    headers['Content-Encoding'] = 'gzip'
+    # A compressed representation is only weakly equal to the identity one
+    if 'ETag' in headers and not headers['ETag'].startswith('W/'):
+        headers['ETag'] = 'W/' + headers['ETag']
+    return response
 
 def create_error_response(status_code, message):
     """
@@ -326,12 +3757,7 @@ def create_error_response(status_code, message):
     """
     return {
         'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
-            'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
-        },
+        'headers': cors_headers(),
         'body': json.dumps({
             'error': message,
             'statusCode': status_code
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Local load harness for the todo handler (index.py)
+
+Replays synthetic API Gateway proxy events against handler() backed by the
+in-memory table from local_dynamodb.py, at a configurable concurrency, and
+reports p50/p95/p99 latency and throughput per route. boto3 must be
+importable, for example via the copy vendored with the AI extractor:
+
+    cd terraform/lambda
+    PYTHONPATH=gemini_extractor python load_test.py --users 50 --todos-per-user 500 \\
+        --requests 20000 --concurrency 8 --latency-ms 5
+
+Worker threads share one module instance of the handler, i.e. they behave
+like concurrent requests against a single warm container.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# index.py reads its configuration at import time
+os.environ.setdefault('DYNAMODB_TABLE', 'load-test-todos')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+os.environ.setdefault('TODOS_RANK_INDEX', 'user-rank-index')
+os.environ.setdefault('TODOS_OPEN_DUE_INDEX', 'user-open-due-index')
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MIX = 'list=25,filter=5,due=5,stats=5,search=5,get=15,create=15,retry=5,update=10,delete=5,batch=5,ops=5,move=5,revalidate=5'
+
+CATEGORIES = ['work', 'personal', 'health', 'learning', 'shopping', 'other']
+
+# Secondary indexes declared for the todos table in main.tf
+TABLE_INDEXES = {
+    'user-updated-at-index': ('user_id', 'updated_at'),
+    'user-category-index': ('user_id', 'category'),
+    'user-due-date-index': ('user_id', 'due_date'),
+    'user-rank-index': ('user_id', 'rank'),
+    'user-open-due-index': ('user_id', 'open_due_date'),
+}
+
+
+def make_event(method, resource, user_id, todo_id=None, body=None, query=None, headers=None):
+    """Build an API Gateway proxy event as the Cognito-authorized API sends it"""
+    return {
+        'httpMethod': method,
+        'resource': resource,
+        'path': resource.replace('{id}', todo_id or ''),
+        'pathParameters': {'id': todo_id} if todo_id else None,
+        'queryStringParameters': query,
+        'headers': dict({'Accept-Encoding': 'gzip, deflate, br'}, **(headers or {})),
+        'body': json.dumps(body) if body is not None else None,
+        'isBase64Encoded': False,
+        'requestContext': {
+            'authorizer': {
+                'claims': {'sub': user_id}
+            }
+        },
+    }
+
+
+def make_todo(rng):
+    """Random create payload in the frontend format"""
+    todo = {
+        'title': f'Load test task {rng.randrange(1_000_000)}',
+        'category': rng.choice(CATEGORIES),
+        'priority': rng.choice(['low', 'medium', 'high']),
+    }
+    if rng.random() < 0.5:
+        todo['description'] = 'Generated by load_test.py ' * rng.randint(1, 8)
+    if rng.random() < 0.3:
+        todo['dueDate'] = f'2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}'
+        if rng.random() < 0.2:
+            todo['recurrence'] = rng.choice(['FREQ=WEEKLY;BYDAY=MO', 'FREQ=DAILY', 'FREQ=MONTHLY;BYMONTHDAY=1'])
+    return todo
+
+
+class Workload:
+    """Synthetic users and the todo ids the harness knows about per user"""
+
+    def __init__(self, users, seed):
+        self.users = [f'load-user-{i:04d}' for i in range(users)]
+        self.ids = {user_id: [] for user_id in self.users}
+        self.etags = {}
+        self.last_creates = {}
+        self.lock = threading.Lock()
+        self.seed = seed
+
+    def seed_todos(self, handler_module, per_user):
+        """Create the initial todos through POST /todos/batch"""
+        rng = random.Random(self.seed)
+        for user_id in self.users:
+            for start in range(0, per_user, handler_module.BATCH_MAX_OPERATIONS):
+                count = min(handler_module.BATCH_MAX_OPERATIONS, per_user - start)
+                operations = [{'type': 'create', 'todo': dict(make_todo(rng), id=str(uuid.uuid4()))}
+                              for _ in range(count)]
+                handler_module.handler(make_event('POST', '/todos/batch', user_id,
+                                                  body={'operations': operations}), None)
+                self.ids[user_id].extend(operation['todo']['id'] for operation in operations)
+
+    def known_id(self, rng, user_id):
+        with self.lock:
+            ids = self.ids[user_id]
+            return rng.choice(ids) if ids else str(uuid.uuid4())
+
+    def take_id(self, rng, user_id):
+        with self.lock:
+            ids = self.ids[user_id]
+            if not ids:
+                return str(uuid.uuid4())
+            return ids.pop(rng.randrange(len(ids)))
+
+    def add_ids(self, user_id, todo_ids):
+        with self.lock:
+            self.ids[user_id].extend(todo_ids)
+
+    # Route builders: return (event, callback run with the response) ------
+
+    def list_todos(self, rng, user_id):
+        return make_event('GET', '/todos', user_id), None
+
+    def filter_todos(self, rng, user_id):
+        query = rng.choice([{'category': rng.choice(CATEGORIES)}, {'completed': 'false', 'sort': 'priority'},
+                            {'dueBefore': '2025-07-01', 'sort': 'dueDate'}, {'priority': 'high', 'limit': '20'},
+                            {'sort': 'rank', 'limit': '50'}, {'from': '2025-06-01', 'to': '2025-06-30'}])
+        return make_event('GET', '/todos', user_id, query=query), None
+
+    def revalidate(self, rng, user_id):
+        """GET /todos with the ETag from this user's last full fetch"""
+        etag = self.etags.get(user_id)
+        headers = {'If-None-Match': etag} if etag else None
+
+        def remember(response):
+            if response['statusCode'] == 200 and 'ETag' in response['headers']:
+                self.etags[user_id] = response['headers']['ETag']
+        return make_event('GET', '/todos', user_id, headers=headers), remember
+
+    def due(self, rng, user_id):
+        return make_event('GET', '/todos/due', user_id, query={'before': f'2025-{rng.randint(1, 12):02d}-01'}), None
+
+    def stats(self, rng, user_id):
+        return make_event('GET', '/todos/stats', user_id), None
+
+    def search(self, rng, user_id):
+        query = rng.choice(['load', 'task 12', 'generated test', 'renamed'])
+        return make_event('GET', '/todos/search', user_id, query={'q': query}), None
+
+    def get_todo(self, rng, user_id):
+        return make_event('GET', '/todos/{id}', user_id, todo_id=self.known_id(rng, user_id)), None
+
+    def create(self, rng, user_id):
+        todo = dict(make_todo(rng), id=str(uuid.uuid4()))
+        event = make_event('POST', '/todos', user_id, body=todo, headers={'Idempotency-Key': str(uuid.uuid4())})
+        self.last_creates[user_id] = event
+        return event, lambda response: self.add_ids(user_id, [todo['id']])
+
+    def retry(self, rng, user_id):
+        """Resend this user's last POST /todos, as a client whose response was lost"""
+        event = self.last_creates.get(user_id)
+        if event is None:
+            return self.create(rng, user_id)
+        return event, None
+
+    def update(self, rng, user_id):
+        body = rng.choice([{'completed': True}, {'completed': False}, {'title': 'Renamed by load test'},
+                           {'priority': rng.choice(['low', 'medium', 'high'])}])
+        return make_event('PUT', '/todos/{id}', user_id, todo_id=self.known_id(rng, user_id), body=body), None
+
+    def delete(self, rng, user_id):
+        return make_event('DELETE', '/todos/{id}', user_id, todo_id=self.take_id(rng, user_id)), None
+
+    def batch(self, rng, user_id):
+        todos = [dict(make_todo(rng), id=str(uuid.uuid4())) for _ in range(rng.randint(5, 50))]
+        operations = [{'type': 'create', 'todo': todo} for todo in todos]
+        return (make_event('POST', '/todos/batch', user_id, body={'operations': operations}),
+                lambda response: self.add_ids(user_id, [todo['id'] for todo in todos]))
+
+    def ops(self, rng, user_id):
+        """POST /todos/ops completing a few todos and deleting others"""
+        deleted = [self.take_id(rng, user_id) for _ in range(rng.randint(0, 3))]
+        completed = {self.known_id(rng, user_id) for _ in range(rng.randint(1, 12))} - set(deleted)
+        operations = ([{'type': 'update', 'id': todo_id, 'todo': {'completed': True}} for todo_id in completed] +
+                      [{'type': 'delete', 'id': todo_id} for todo_id in deleted])
+        return make_event('POST', '/todos/ops', user_id, body={'operations': operations}), None
+
+    def move(self, rng, user_id):
+        """POST /todos/{id}/move placing a todo directly above or below another"""
+        todo_id = self.known_id(rng, user_id)
+        neighbour_id = self.known_id(rng, user_id)
+        body = rng.choice([{'beforeId': neighbour_id}, {'afterId': neighbour_id}])
+        return make_event('POST', '/todos/{id}/move', user_id, todo_id=todo_id, body=body), None
+
+
+def parse_mix(mix):
+    """Parse 'route=weight,...' into a list of (route, weight)"""
+    routes = []
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        routes.append((name.strip(), float(weight or 1)))
+    return routes
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run(handler_module, workload, mix, total_requests, concurrency, seed):
+    """Replay `total_requests` events on `concurrency` threads"""
+    routes = parse_mix(mix)
+    names = [name for name, _ in routes]
+    weights = [weight for _, weight in routes]
+    results = {name: {'latencies': [], 'errors': 0, 'statuses': {}} for name in names}
+    results_lock = threading.Lock()
+
+    def worker(worker_index, count):
+        rng = random.Random(seed * 1000 + worker_index)
+        local = {name: ([], {}) for name in names}
+        for _ in range(count):
+            route = rng.choices(names, weights)[0]
+            user_id = rng.choice(workload.users)
+            event, callback = getattr(workload, ROUTES[route])(rng, user_id)
+            start = time.perf_counter()
+            response = handler_module.handler(event, None)
+            elapsed = (time.perf_counter() - start) * 1000
+            latencies, statuses = local[route]
+            latencies.append(elapsed)
+            statuses[response['statusCode']] = statuses.get(response['statusCode'], 0) + 1
+            if callback and response['statusCode'] < 300:
+                callback(response)
+        with results_lock:
+            for route, (latencies, statuses) in local.items():
+                results[route]['latencies'].extend(latencies)
+                for status, hits in statuses.items():
+                    results[route]['statuses'][status] = results[route]['statuses'].get(status, 0) + hits
+                    if status >= 500:
+                        results[route]['errors'] += hits
+
+    per_worker = [total_requests // concurrency + (1 if i < total_requests % concurrency else 0)
+                  for i in range(concurrency)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker, i, count) for i, count in enumerate(per_worker)]:
+            future.result()
+    wall_seconds = time.perf_counter() - started
+    return results, wall_seconds
+
+
+ROUTES = {
+    'list': 'list_todos',
+    'filter': 'filter_todos',
+    'stats': 'stats',
+    'search': 'search',
+    'revalidate': 'revalidate',
+    'get': 'get_todo',
+    'create': 'create',
+    'retry': 'retry',
+    'update': 'update',
+    'delete': 'delete',
+    'batch': 'batch',
+    'ops': 'ops',
+    'due': 'due',
+    'move': 'move',
+}
+
+
+def report(results, wall_seconds):
+    print(f"{'route':>11} {'requests':>9} {'5xx':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'req/s':>9}  statuses")
+    all_latencies = []
+    for route, result in results.items():
+        latencies = sorted(result['latencies'])
+        all_latencies.extend(latencies)
+        statuses = ' '.join(f'{status}:{hits}' for status, hits in sorted(result['statuses'].items()))
+        print(f'{route:>11} {len(latencies):>9} {result["errors"]:>5} {percentile(latencies, 0.50):>8.2f} '
+              f'{percentile(latencies, 0.95):>8.2f} {percentile(latencies, 0.99):>8.2f} '
+              f'{len(latencies) / wall_seconds:>9.1f}  {statuses}')
+    all_latencies.sort()
+    print(f'{"total":>11} {len(all_latencies):>9} {sum(r["errors"] for r in results.values()):>5} '
+          f'{percentile(all_latencies, 0.50):>8.2f} {percentile(all_latencies, 0.95):>8.2f} '
+          f'{percentile(all_latencies, 0.99):>8.2f} {len(all_latencies) / wall_seconds:>9.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--todos-per-user', type=int, default=200, help='todos seeded per user before the run')
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'route weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='simulated DynamoDB round trip per request')
+    parser.add_argument('--data-access', choices=['resource', 'client'], default='resource')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--quiet', action='store_true', help="silence the handler's print() logging")
+    args = parser.parse_args()
+
+    unknown = [name for name, _ in parse_mix(args.mix) if name not in ROUTES]
+    if unknown:
+        parser.error(f'unknown routes in --mix: {", ".join(unknown)} (known: {", ".join(ROUTES)})')
+
+    os.environ['TODOS_DATA_ACCESS'] = args.data_access
+    import index
+    from local_dynamodb import LocalTable, install
+
+    table = LocalTable(name=os.environ['DYNAMODB_TABLE'], indexes=TABLE_INDEXES)
+    install(index, table)
+
+    workload = Workload(args.users, args.seed)
+    if args.quiet:
+        index.print = lambda *a, **k: None
+    workload.seed_todos(index, args.todos_per_user)
+
+    # Measure only the replay, not the seeding
+    table.latency_ms = args.latency_ms
+    table.operation_counts.clear()
+    results, wall_seconds = run(index, workload, args.mix, args.requests, args.concurrency, args.seed)
+
+    report(results, wall_seconds)
+    operations = ' '.join(f'{name}:{count}' for name, count in sorted(table.operation_counts.items()))
+    print(f'\nwall time {wall_seconds:.2f}s; DynamoDB operations {operations}')
+
+
+if __name__ == '__main__':
+    main()
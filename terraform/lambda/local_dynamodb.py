@@ -0,0 +1,868 @@
+"""
+In-memory stand-in for the DynamoDB table used by the todo handler (index.py)
+
+Implements the subset of the boto3 API the handler relies on, so handler()
+can be exercised locally without AWS:
+
+- LocalTable mirrors boto3's Table resource: query (table and secondary
+  indexes, Limit, ExclusiveStartKey, ScanIndexForward and the 1 MB page
+  cap), get_item, put_item, update_item (SET/REMOVE/ADD/DELETE), delete_item
+  and scan with Segment/TotalSegments, with condition, filter and
+  projection expressions. latency_ms and throttle_rate simulate round
+  trips and throttling.
+- LocalDynamoDB mirrors boto3.resource('dynamodb') (Table, batch_write_item,
+  batch_get_item, meta.client).
+- LocalDynamoDBClient mirrors the low-level client's wire format, including
+  all-or-nothing transact_write_items.
+
+Failures raise botocore ClientError with DynamoDB's error codes, so the
+handler's error handling runs unchanged. Usage:
+
+    table = LocalTable(indexes={'user-updated-at-index': ('user_id', 'updated_at')})
+    install(index, table)
+"""
+
+import copy
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+PAGE_SIZE_BYTES = 1024 * 1024
+
+# Set while a transaction applies its writes, so they are counted (and
+# delayed) once as TransactWriteItems rather than as single-item calls
+transaction_state = threading.local()
+
+
+def client_error(code, message, operation='LocalDynamoDB'):
+    """Build a ClientError shaped like the ones botocore raises"""
+    return ClientError({'Error': {'Code': code, 'Message': message}}, operation)
+
+
+def item_size(item):
+    """Approximate DynamoDB item size: attribute names plus values"""
+    return len(json.dumps(item, default=str))
+
+
+# ---------------------------------------------------------------------------
+# Expression parsing
+# ---------------------------------------------------------------------------
+
+TOKEN_PATTERN = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+)|
+        (?P<value>:[A-Za-z0-9_]+)|
+        (?P<name>\#[A-Za-z0-9_]+|[A-Za-z_][A-Za-z0-9_]*)|
+        (?P<op><>|<=|>=|=|<|>|\(|\)|,|\.|\[|\]|\+|-)
+    )""", re.VERBOSE)
+
+KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'IN', 'SET', 'REMOVE', 'ADD', 'DELETE'}
+
+
+def tokenize(expression):
+    tokens = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if not match or match.end() == position:
+            raise client_error('ValidationException', f'Invalid expression near: {expression[position:]}')
+        position = match.end()
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == 'name' and text.upper() in KEYWORDS:
+            tokens.append(('keyword', text.upper()))
+        else:
+            tokens.append((kind, text))
+    return tokens
+
+
+class Parser:
+    """Recursive-descent parser shared by condition and update expressions"""
+
+    def __init__(self, expression, names, values):
+        self.tokens = tokenize(expression)
+        self.position = 0
+        self.names = names or {}
+        self.values = values or {}
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, text=None):
+        token = self.peek()
+        if (kind and token[0] != kind) or (text and token[1] != text):
+            raise client_error('ValidationException', f'Unexpected token {token[1]!r}')
+        self.position += 1
+        return token
+
+    def at_end(self):
+        return self.position >= len(self.tokens)
+
+    # Paths and operands -----------------------------------------------------
+
+    def resolve_name(self, text):
+        if text.startswith('#'):
+            if text not in self.names:
+                raise client_error('ValidationException', f'Unresolved attribute name {text}')
+            return self.names[text]
+        return text
+
+    def path(self):
+        parts = [self.resolve_name(self.take('name')[1])]
+        while self.peek()[1] in ('.', '['):
+            if self.take()[1] == '.':
+                parts.append(self.resolve_name(self.take('name')[1]))
+            else:
+                parts.append(int(self.take('number')[1]))
+                self.take('op', ']')
+        return tuple(parts)
+
+    def operand(self):
+        kind, text = self.peek()
+        if kind == 'value':
+            self.take()
+            if text not in self.values:
+                raise client_error('ValidationException', f'Unresolved attribute value {text}')
+            value = self.values[text]
+            return lambda item: value
+        if kind == 'name' and self.peek(1)[1] == '(':
+            return self.function()
+        path = self.path()
+        return lambda item: get_path(item, path)
+
+    # Conditions ------------------------------------------------------------
+
+    def condition(self):
+        left = self.conjunction()
+        while self.peek() == ('keyword', 'OR'):
+            self.take()
+            right = self.conjunction()
+            left = (lambda a, b: lambda item: a(item) or b(item))(left, right)
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.peek() == ('keyword', 'AND'):
+            self.take()
+            right = self.negation()
+            left = (lambda a, b: lambda item: a(item) and b(item))(left, right)
+        return left
+
+    def negation(self):
+        if self.peek() == ('keyword', 'NOT'):
+            self.take()
+            inner = self.negation()
+            return lambda item: not inner(item)
+        return self.comparison()
+
+    def comparison(self):
+        if self.peek()[1] == '(':
+            self.take()
+            inner = self.condition()
+            self.take('op', ')')
+            return inner
+        left = self.operand()
+        kind, text = self.peek()
+        if kind == 'op' and text in ('=', '<>', '<', '<=', '>', '>='):
+            self.take()
+            right = self.operand()
+            return lambda item: compare(text, left(item), right(item))
+        if (kind, text) == ('keyword', 'BETWEEN'):
+            self.take()
+            low = self.operand()
+            self.take('keyword', 'AND')
+            high = self.operand()
+            return lambda item: compare('>=', left(item), low(item)) and compare('<=', left(item), high(item))
+        if (kind, text) == ('keyword', 'IN'):
+            self.take()
+            self.take('op', '(')
+            candidates = [self.operand()]
+            while self.peek()[1] == ',':
+                self.take()
+                candidates.append(self.operand())
+            self.take('op', ')')
+            return lambda item: any(compare('=', left(item), candidate(item)) for candidate in candidates)
+        # A bare function call such as attribute_exists(x)
+        return lambda item: bool(left(item))
+
+    def function(self):
+        name = self.take('name')[1]
+        self.take('op', '(')
+        if name in ('attribute_exists', 'attribute_not_exists'):
+            path = self.path()
+            self.take('op', ')')
+            if name == 'attribute_exists':
+                return lambda item: get_path(item, path) is not MISSING
+            return lambda item: get_path(item, path) is MISSING
+        arguments = [self.operand()]
+        while self.peek()[1] == ',':
+            self.take()
+            arguments.append(self.operand())
+        self.take('op', ')')
+        if name == 'begins_with':
+            return lambda item: (isinstance(arguments[0](item), str)
+                                 and arguments[0](item).startswith(arguments[1](item)))
+        if name == 'contains':
+            def contains(item):
+                haystack, needle = arguments[0](item), arguments[1](item)
+                if haystack is MISSING or needle is MISSING:
+                    return False
+                return needle in haystack
+            return contains
+        if name == 'size':
+            def size(item):
+                value = arguments[0](item)
+                return MISSING if value is MISSING else Decimal(len(value))
+            return size
+        if name == 'if_not_exists':
+            def if_not_exists(item):
+                value = arguments[0](item)
+                return arguments[1](item) if value is MISSING else value
+            return if_not_exists
+        if name == 'list_append':
+            return lambda item: list(arguments[0](item)) + list(arguments[1](item))
+        raise client_error('ValidationException', f'Unsupported function {name}')
+
+    # Key conditions --------------------------------------------------------
+
+    def comparison_for_key(self):
+        """Parse `attr op :v`, `attr BETWEEN :a AND :b` or begins_with(attr, :v)"""
+        if self.peek()[1] == '(':
+            self.take()
+            result = self.comparison_for_key()
+            self.take('op', ')')
+            return result
+        if self.peek() == ('name', 'begins_with'):
+            self.take()
+            self.take('op', '(')
+            attribute = self.path()[0]
+            self.take('op', ',')
+            prefix = self.operand()({})
+            self.take('op', ')')
+            return attribute, lambda value: isinstance(value, str) and value.startswith(prefix), ('begins_with', prefix)
+        attribute = self.path()[0]
+        kind, text = self.take()
+        if text == 'BETWEEN':
+            low = self.operand()({})
+            self.take('keyword', 'AND')
+            high = self.operand()({})
+            return attribute, lambda value: compare('>=', value, low) and compare('<=', value, high), ('between', low)
+        value = self.operand()({})
+        return attribute, lambda candidate: compare(text, candidate, value), (text, value)
+
+    # Update expressions ----------------------------------------------------
+
+    def set_value(self):
+        left = self.operand()
+        if self.peek()[1] in ('+', '-'):
+            operator = self.take()[1]
+            right = self.operand()
+            if operator == '+':
+                return lambda item: left(item) + right(item)
+            return lambda item: left(item) - right(item)
+        return left
+
+    def update_actions(self):
+        actions = []
+        while not self.at_end():
+            clause = self.take('keyword')[1]
+            while True:
+                if clause == 'SET':
+                    path = self.path()
+                    self.take('op', '=')
+                    actions.append(('SET', path, self.set_value()))
+                elif clause == 'REMOVE':
+                    actions.append(('REMOVE', self.path(), None))
+                elif clause in ('ADD', 'DELETE'):
+                    path = self.path()
+                    actions.append((clause, path, self.operand()))
+                if self.peek()[1] != ',':
+                    break
+                self.take()
+        return actions
+
+
+class Missing:
+    def __repr__(self):
+        return 'MISSING'
+
+
+MISSING = Missing()
+
+
+def get_path(item, path):
+    value = item
+    for part in path:
+        try:
+            value = value[part]
+        except (KeyError, IndexError, TypeError):
+            return MISSING
+    return value
+
+
+def set_path(item, path, value):
+    target = item
+    for part in path[:-1]:
+        target = target[part]
+    target[path[-1]] = value
+
+
+def remove_path(item, path):
+    target = get_path(item, path[:-1]) if len(path) > 1 else item
+    if target is not MISSING:
+        try:
+            del target[path[-1]]
+        except (KeyError, IndexError):
+            pass
+
+
+def compare(operator, left, right):
+    if left is MISSING or right is MISSING:
+        return operator == '<>' and not (left is MISSING and right is MISSING)
+    if isinstance(left, (int, float, Decimal)) and not isinstance(left, bool):
+        left = Decimal(str(left))
+    if isinstance(right, (int, float, Decimal)) and not isinstance(right, bool):
+        right = Decimal(str(right))
+    if operator == '=':
+        return left == right
+    if operator == '<>':
+        return left != right
+    try:
+        if operator == '<':
+            return left < right
+        if operator == '<=':
+            return left <= right
+        if operator == '>':
+            return left > right
+        return left >= right
+    except TypeError:
+        return False
+
+
+def compile_condition(expression, names, values):
+    parser = Parser(expression, names, values)
+    condition = parser.condition()
+    if not parser.at_end():
+        raise client_error('ValidationException', f'Trailing tokens in {expression!r}')
+    return condition
+
+
+def parse_key_condition(expression, names, values):
+    """Split a key condition into the hash key value and a range predicate"""
+    parser = Parser(expression, names, values)
+    conditions = [parser.comparison_for_key()]
+    while parser.peek() == ('keyword', 'AND'):
+        parser.take()
+        conditions.append(parser.comparison_for_key())
+    return conditions
+
+
+def apply_projection(item, projection, names):
+    if not projection:
+        return item
+    projected = {}
+    for raw in projection.split(','):
+        parser = Parser(raw, names, {})
+        path = parser.path()
+        value = get_path(item, path)
+        if value is not MISSING:
+            projected[path[0]] = copy.deepcopy(item[path[0]]) if len(path) > 1 else value
+    return projected
+
+
+def sort_value(value):
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return (0, Decimal(str(value)), '')
+    return (1, Decimal(0), str(value))
+
+
+def attribute_type(value):
+    """DynamoDB type descriptor of a Python value as boto3 would serialize it"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'BOOL'
+    if isinstance(value, (int, Decimal)):
+        return 'N'
+    if isinstance(value, str):
+        return 'S'
+    if isinstance(value, (bytes, bytearray)):
+        return 'B'
+    if isinstance(value, (set, frozenset)):
+        return 'SS'
+    return 'L' if isinstance(value, (list, tuple)) else 'M'
+
+
+def normalize(value):
+    """Mirror boto3's type rules: floats are rejected, ints become Decimal"""
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, float):
+        raise TypeError('Float types are not supported. Use Decimal types instead.')
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, dict):
+        return {key: normalize(inner) for key, inner in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(inner) for inner in value]
+    if isinstance(value, set):
+        return {normalize(inner) for inner in value}
+    return value
+
+
+# ---------------------------------------------------------------------------
+# Table and resource
+# ---------------------------------------------------------------------------
+
+class LocalTable:
+    """Thread-safe in-memory table mirroring boto3's Table resource"""
+
+    def __init__(self, name='todos-table', hash_key='user_id', range_key='id', indexes=None, key_types=None,
+                 latency_ms=0, throttle_rate=0.0, throttle_operations=None, seed=None):
+        self.name = name
+        self.table_name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        # index name -> (hash key, range key); LSIs share the table hash key
+        self.indexes = dict(indexes or {})
+        # Key attribute -> declared type ('S', 'N' or 'B'); 'S' if not listed
+        self.key_types = dict(key_types or {})
+        # Simulated network round trip added to every request
+        self.latency_ms = latency_ms
+        # Fraction of requests (of the named operations, or all) rejected
+        # with ProvisionedThroughputExceededException
+        self.throttle_rate = throttle_rate
+        self.throttle_operations = throttle_operations
+        self.random = random.Random(seed)
+        self.items = {}
+        self.sizes = {}
+        self.partitions = {}  # hash key value -> set of item keys
+        self.lock = threading.RLock()
+        self.operation_counts = {}
+
+    # Helpers ---------------------------------------------------------------
+
+    def count(self, operation):
+        if getattr(transaction_state, 'active', False):
+            return
+        with self.lock:
+            self.operation_counts[operation] = self.operation_counts.get(operation, 0) + 1
+            throttled = (self.throttle_rate and operation in (self.throttle_operations or (operation,))
+                         and self.random.random() < self.throttle_rate)
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if throttled:
+            raise client_error('ProvisionedThroughputExceededException',
+                               'The level of configured provisioned throughput for the table was exceeded',
+                               operation)
+
+    def store(self, key, item):
+        self.items[key] = item
+        self.sizes[key] = item_size(item)
+        self.partitions.setdefault(key[0], set()).add(key)
+
+    def discard(self, key):
+        if self.items.pop(key, None) is not None:
+            del self.sizes[key]
+            self.partitions[key[0]].discard(key)
+
+    def key_of(self, item):
+        try:
+            return (item[self.hash_key], item[self.range_key])
+        except KeyError:
+            raise client_error('ValidationException', 'The provided key element does not match the schema')
+
+    def check_key_attributes(self, item):
+        """
+        Reject an item whose table or index key attributes DynamoDB would
+        refuse: of another type than declared, or an empty string or binary
+        (an item without an index's key attributes is left out of that index)
+        """
+        indexes = [(None, (self.hash_key, self.range_key))] + list(self.indexes.items())
+        for index_name, attributes in indexes:
+            for attribute in attributes:
+                if index_name is not None and attribute not in item:
+                    continue
+                value = item.get(attribute)
+                expected = self.key_types.get(attribute, 'S')
+                actual = attribute_type(value)
+                where = f' IndexName: {index_name}, IndexKey: {attribute}' if index_name else f' Key: {attribute}'
+                if actual != expected:
+                    raise client_error('ValidationException', 'One or more parameter values were invalid: Type '
+                                       f'mismatch for key {attribute} expected: {expected} actual: {actual}.{where}')
+                if actual in ('S', 'B') and not value:
+                    raise client_error('ValidationException', 'One or more parameter values are not valid. The '
+                                       'AttributeValue for a key attribute cannot contain an empty string value.'
+                                       + where)
+
+    def check_condition(self, existing, expression, names, values):
+        if expression is None:
+            return
+        condition = compile_condition(expression, names, values)
+        if not condition(existing or {}):
+            raise client_error('ConditionalCheckFailedException', 'The conditional request failed')
+
+    @staticmethod
+    def old_or_new(return_values, old, new, updated_names=()):
+        if return_values == 'ALL_OLD' and old is not None:
+            return {'Attributes': copy.deepcopy(old)}
+        if return_values == 'ALL_NEW' and new is not None:
+            return {'Attributes': copy.deepcopy(new)}
+        if return_values == 'UPDATED_OLD' and old is not None:
+            return {'Attributes': {name: copy.deepcopy(old[name]) for name in updated_names if name in old}}
+        if return_values == 'UPDATED_NEW' and new is not None:
+            return {'Attributes': {name: copy.deepcopy(new[name]) for name in updated_names if name in new}}
+        return {}
+
+    # Single-item operations ------------------------------------------------
+
+    def get_item(self, Key, ProjectionExpression=None, ExpressionAttributeNames=None, ConsistentRead=False):
+        self.count('GetItem')
+        with self.lock:
+            item = self.items.get(self.key_of(Key))
+            if item is None:
+                return {}
+            return {'Item': apply_projection(copy.deepcopy(item), ProjectionExpression, ExpressionAttributeNames)}
+
+    def put_item(self, Item, ConditionExpression=None, ExpressionAttributeNames=None,
+                 ExpressionAttributeValues=None, ReturnValues='NONE'):
+        Item = normalize(Item)
+        self.count('PutItem')
+        with self.lock:
+            key = self.key_of(Item)
+            self.check_key_attributes(Item)
+            existing = self.items.get(key)
+            self.check_condition(existing, ConditionExpression, ExpressionAttributeNames,
+                                 normalize(ExpressionAttributeValues))
+            self.store(key, copy.deepcopy(Item))
+            return self.old_or_new(ReturnValues, existing, None)
+
+    def update_item(self, Key, UpdateExpression=None, ConditionExpression=None,
+                    ExpressionAttributeNames=None, ExpressionAttributeValues=None, ReturnValues='NONE'):
+        values = normalize(ExpressionAttributeValues)
+        self.count('UpdateItem')
+        with self.lock:
+            key = self.key_of(Key)
+            existing = self.items.get(key)
+            self.check_condition(existing, ConditionExpression, ExpressionAttributeNames, values)
+            updated = copy.deepcopy(existing) if existing else dict(normalize(Key))
+            actions = Parser(UpdateExpression or '', ExpressionAttributeNames, values).update_actions()
+            # Every right-hand side sees the item as it was before the update
+            snapshot = copy.deepcopy(updated)
+            for action, path, value in actions:
+                if action == 'SET':
+                    set_path(updated, path, value(snapshot))
+                elif action == 'REMOVE':
+                    remove_path(updated, path)
+                elif action == 'ADD':
+                    current = get_path(updated, path)
+                    increment = value(snapshot)
+                    if isinstance(increment, set):
+                        set_path(updated, path, (set() if current is MISSING else set(current)) | increment)
+                    else:
+                        set_path(updated, path, (Decimal(0) if current is MISSING else current) + increment)
+                elif action == 'DELETE':
+                    current = get_path(updated, path)
+                    if current is not MISSING:
+                        remaining = set(current) - value(snapshot)
+                        if remaining:
+                            set_path(updated, path, remaining)
+                        else:
+                            remove_path(updated, path)
+            self.check_key_attributes(updated)
+            self.store(key, updated)
+            updated_names = [path[0] for _, path, _ in actions]
+            return self.old_or_new(ReturnValues, existing, updated, updated_names)
+
+    def delete_item(self, Key, ConditionExpression=None, ExpressionAttributeNames=None,
+                    ExpressionAttributeValues=None, ReturnValues='NONE'):
+        self.count('DeleteItem')
+        with self.lock:
+            key = self.key_of(Key)
+            existing = self.items.get(key)
+            self.check_condition(existing, ConditionExpression, ExpressionAttributeNames,
+                                 normalize(ExpressionAttributeValues))
+            self.discard(key)
+            return self.old_or_new(ReturnValues, existing, None)
+
+    # Multi-item operations -------------------------------------------------
+
+    def page(self, candidates, sort_keys, Limit, ExclusiveStartKey, FilterExpression, names, values,
+             ProjectionExpression, Select=None):
+        """Apply start key, Limit, the 1 MB cap and filters to sorted candidates"""
+        if ExclusiveStartKey:
+            start = tuple(sort_value(ExclusiveStartKey.get(attribute)) for attribute in sort_keys)
+            candidates = [item for item in candidates
+                          if tuple(sort_value(item.get(attribute)) for attribute in sort_keys) > start]
+        filter_condition = compile_condition(FilterExpression, names, values) if FilterExpression else None
+        evaluated = []
+        scanned_bytes = 0
+        for item in candidates:
+            if Limit is not None and len(evaluated) >= Limit:
+                break
+            if scanned_bytes >= PAGE_SIZE_BYTES:
+                break
+            evaluated.append(item)
+            scanned_bytes += self.sizes[self.key_of(item)]
+        matched = [item for item in evaluated if filter_condition is None or filter_condition(item)]
+        response = {
+            'Count': len(matched),
+            'ScannedCount': len(evaluated),
+        }
+        if Select != 'COUNT':
+            response['Items'] = [apply_projection(copy.deepcopy(item), ProjectionExpression, names)
+                                 for item in matched]
+        if evaluated and len(evaluated) < len(candidates):
+            last = evaluated[-1]
+            response['LastEvaluatedKey'] = {attribute: last[attribute] for attribute in dict.fromkeys(sort_keys)
+                                            if attribute in last}
+        return response
+
+    def query(self, KeyConditionExpression, ExpressionAttributeValues=None, ExpressionAttributeNames=None,
+              IndexName=None, FilterExpression=None, Limit=None, ExclusiveStartKey=None,
+              ScanIndexForward=True, ProjectionExpression=None, Select=None, ConsistentRead=False):
+        values = normalize(ExpressionAttributeValues)
+        self.count('Query')
+        with self.lock:
+            if IndexName:
+                if IndexName not in self.indexes:
+                    raise client_error('ValidationException', f'The table does not have the specified index: {IndexName}')
+                hash_key, range_key = self.indexes[IndexName]
+            else:
+                hash_key, range_key = self.hash_key, self.range_key
+            conditions = parse_key_condition(KeyConditionExpression, ExpressionAttributeNames, values)
+            hash_value = None
+            range_predicate = None
+            for attribute, predicate, detail in conditions:
+                if attribute == hash_key and detail[0] == '=':
+                    hash_value = detail[1]
+                elif attribute == range_key:
+                    range_predicate = predicate
+                else:
+                    raise client_error('ValidationException', f'Query key condition not supported on {attribute}')
+            if hash_value is None:
+                raise client_error('ValidationException', 'Query condition missed key schema element')
+            if hash_key == self.hash_key:
+                pool = [self.items[key] for key in self.partitions.get(hash_value, ())]
+            else:
+                pool = self.items.values()
+            candidates = [item for item in pool
+                          if item.get(hash_key) == hash_value and (range_key is None or range_key in item)
+                          and (range_predicate is None or range_predicate(item.get(range_key)))]
+            # Index items are ordered by the index key, then the table key
+            sort_keys = [attribute for attribute in (range_key, self.range_key) if attribute]
+            candidates.sort(key=lambda item: tuple(sort_value(item.get(attribute)) for attribute in sort_keys),
+                            reverse=not ScanIndexForward)
+            if not ScanIndexForward and ExclusiveStartKey:
+                start = tuple(sort_value(ExclusiveStartKey.get(attribute)) for attribute in sort_keys)
+                candidates = [item for item in candidates
+                              if tuple(sort_value(item.get(attribute)) for attribute in sort_keys) < start]
+                ExclusiveStartKey = None
+            response = self.page(candidates, sort_keys, Limit, ExclusiveStartKey, FilterExpression,
+                                 ExpressionAttributeNames, values, ProjectionExpression, Select)
+            if 'LastEvaluatedKey' in response:
+                response['LastEvaluatedKey'][hash_key] = hash_value
+                response['LastEvaluatedKey'][self.hash_key] = hash_value
+            return response
+
+    def scan(self, FilterExpression=None, ExpressionAttributeValues=None, ExpressionAttributeNames=None,
+             Limit=None, ExclusiveStartKey=None, Segment=None, TotalSegments=None,
+             ProjectionExpression=None, Select=None, IndexName=None, ConsistentRead=False):
+        values = normalize(ExpressionAttributeValues)
+        self.count('Scan')
+        with self.lock:
+            candidates = list(self.items.values())
+            if TotalSegments:
+                # Items are assigned to segments by a stable hash of the partition key
+                candidates = [item for item in candidates
+                              if zlib.crc32(str(item[self.hash_key]).encode('utf-8')) % TotalSegments == Segment]
+            sort_keys = [self.hash_key, self.range_key]
+            candidates.sort(key=lambda item: tuple(sort_value(item.get(attribute)) for attribute in sort_keys))
+            return self.page(candidates, sort_keys, Limit, ExclusiveStartKey, FilterExpression,
+                             ExpressionAttributeNames, values, ProjectionExpression, Select)
+
+
+class LocalDynamoDB:
+    """Stand-in for boto3.resource('dynamodb') holding LocalTables"""
+
+    def __init__(self, *tables):
+        self.tables = {table.name: table for table in tables}
+        # boto3 exposes the resource's low-level client as .meta.client
+        self.meta = type('ResourceMeta', (), {'client': LocalDynamoDBClient(*tables)})()
+
+    def Table(self, name):
+        return self.tables[name]
+
+    def batch_write_item(self, RequestItems):
+        for name, requests in RequestItems.items():
+            if len(requests) > 25:
+                raise client_error('ValidationException', 'Too many items requested for the BatchWriteItem call')
+            table = self.tables[name]
+            keys = [table.key_of(request.get('PutRequest', {}).get('Item') or request['DeleteRequest']['Key'])
+                    for request in requests]
+            if len(set(keys)) != len(keys):
+                raise client_error('ValidationException', 'Provided list of item keys contains duplicates')
+            for request in requests:
+                if 'PutRequest' in request:
+                    table.check_key_attributes(normalize(request['PutRequest']['Item']))
+            for request in requests:
+                if 'PutRequest' in request:
+                    table.put_item(Item=request['PutRequest']['Item'])
+                else:
+                    table.delete_item(Key=request['DeleteRequest']['Key'])
+        return {'UnprocessedItems': {}}
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        for name, request in RequestItems.items():
+            if len(request['Keys']) > 100:
+                raise client_error('ValidationException', 'Too many items requested for the BatchGetItem call')
+            table = self.tables[name]
+            found = [table.get_item(Key=key, ProjectionExpression=request.get('ProjectionExpression'),
+                                    ExpressionAttributeNames=request.get('ExpressionAttributeNames'))
+                     for key in request['Keys']]
+            responses[name] = [response['Item'] for response in found if 'Item' in response]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+
+class LocalDynamoDBClient:
+    """Stand-in for boto3.client('dynamodb'), speaking the wire format"""
+
+    def __init__(self, *tables):
+        self.tables = {table.name: table for table in tables}
+        self.serializer = TypeSerializer()
+        self.deserializer = TypeDeserializer()
+
+    def to_python(self, wire_item):
+        return {name: self.deserializer.deserialize(value) for name, value in wire_item.items()}
+
+    def to_wire(self, item):
+        return {name: self.serializer.serialize(value) for name, value in item.items()}
+
+    def wrap(self, response):
+        wrapped = dict(response)
+        if 'Items' in response:
+            wrapped['Items'] = [self.to_wire(item) for item in response['Items']]
+        for field in ('Item', 'Attributes', 'LastEvaluatedKey'):
+            if field in response:
+                wrapped[field] = self.to_wire(response[field])
+        return wrapped
+
+    def call(self, operation, TableName, **params):
+        for field in ('Key', 'Item', 'ExpressionAttributeValues', 'ExclusiveStartKey'):
+            if field in params:
+                params[field] = self.to_python(params[field])
+        return self.wrap(getattr(self.tables[TableName], operation)(**params))
+
+    def query(self, **params):
+        return self.call('query', **params)
+
+    def scan(self, **params):
+        return self.call('scan', **params)
+
+    def get_item(self, **params):
+        return self.call('get_item', **params)
+
+    def put_item(self, **params):
+        return self.call('put_item', **params)
+
+    def update_item(self, **params):
+        return self.call('update_item', **params)
+
+    def delete_item(self, **params):
+        return self.call('delete_item', **params)
+
+    def batch_get_item(self, RequestItems):
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.tables[name]
+            keys = [self.to_python(key) for key in request['Keys']]
+            responses[name] = [self.to_wire(item) for item in
+                               LocalDynamoDB(table).batch_get_item({name: dict(request, Keys=keys)})['Responses'][name]]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def transact_write_items(self, TransactItems, ClientRequestToken=None):
+        """Check every condition first, then apply all writes under the table locks"""
+        if len(TransactItems) > 100:
+            raise client_error('ValidationException', 'Member must have length less than or equal to 100')
+        actions = []
+        for transact_item in TransactItems:
+            (action, params), = transact_item.items()
+            params = dict(params)
+            table = self.tables[params.pop('TableName')]
+            for field in ('Key', 'Item', 'ExpressionAttributeValues'):
+                if field in params:
+                    params[field] = self.to_python(params[field])
+            actions.append((action, table, params))
+
+        keys = [(table.name, table.key_of(params.get('Item') or params['Key'])) for _, table, params in actions]
+        if len(set(keys)) != len(keys):
+            raise client_error('ValidationException',
+                               'Transaction request cannot include multiple operations on one item')
+
+        tables = list({table.name: table for _, table, _ in actions}.values())
+        for table in tables:
+            table.count('TransactWriteItems')
+        for table in tables:
+            table.lock.acquire()
+        try:
+            reasons = []
+            for action, table, params in actions:
+                existing = table.items.get(table.key_of(params.get('Item') or params['Key']))
+                try:
+                    table.check_condition(existing, params.get('ConditionExpression'),
+                                          params.get('ExpressionAttributeNames'),
+                                          normalize(params.get('ExpressionAttributeValues')))
+                    reasons.append({'Code': 'None'})
+                except ClientError:
+                    reasons.append({'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'})
+            if any(reason['Code'] != 'None' for reason in reasons):
+                error = client_error('TransactionCanceledException',
+                                     'Transaction cancelled, please refer cancellation reasons for specific reasons',
+                                     'TransactWriteItems')
+                error.response['CancellationReasons'] = reasons
+                raise error
+
+            transaction_state.active = True
+            originals = [(table, key, table.items.get(key)) for (_, key), (_, table, _) in zip(keys, actions)]
+            try:
+                for action, table, params in actions:
+                    params.pop('ConditionExpression', None)
+                    if action == 'Put':
+                        table.put_item(**params)
+                    elif action == 'Update':
+                        table.update_item(**params)
+                    elif action == 'Delete':
+                        table.delete_item(**params)
+            except ClientError:
+                # DynamoDB validates every write before applying any, so an
+                # invalid one (such as an empty index key) leaves no trace
+                for table, key, original in originals:
+                    if original is None:
+                        table.discard(key)
+                    else:
+                        table.store(key, original)
+                raise
+            return {}
+        finally:
+            transaction_state.active = False
+            for table in reversed(tables):
+                table.lock.release()
+
+
+def install(handler_module, table):
+    """Point the handler module's DynamoDB handles at a LocalTable"""
+    handler_module.table = table
+    handler_module.table_name = table.name
+    handler_module.dynamodb = LocalDynamoDB(table)
+    if getattr(handler_module, 'dynamodb_client', None) is not None:
+        handler_module.dynamodb_client = LocalDynamoDBClient(table)
@@ -0,0 +1,60 @@
+"""
+In-memory stand-in for the S3 archive bucket used by the todo handler (index.py)
+
+Implements the subset of the boto3 S3 client the archive code relies on
+(put_object, get_object, list_objects_v2 with MaxKeys/ContinuationToken
+paging), so archiving can be exercised locally without AWS. Missing keys
+raise botocore ClientError with S3's NoSuchKey code. Usage:
+
+    install(index, LocalS3())
+"""
+
+import io
+import threading
+
+from botocore.exceptions import ClientError
+
+
+class LocalS3:
+    """Objects kept in a dict per bucket, shaped like boto3's S3 client"""
+
+    def __init__(self):
+        self.buckets = {}  # bucket -> {key: object dict}
+        self.lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, **metadata):
+        if isinstance(Body, str):
+            Body = Body.encode('utf-8')
+        with self.lock:
+            self.buckets.setdefault(Bucket, {})[Key] = dict(metadata, Body=bytes(Body))
+        return {}
+
+    def get_object(self, Bucket, Key):
+        with self.lock:
+            stored = self.buckets.get(Bucket, {}).get(Key)
+        if stored is None:
+            raise ClientError({'Error': {'Code': 'NoSuchKey', 'Message': 'The specified key does not exist.'}},
+                              'GetObject')
+        return dict(stored, Body=io.BytesIO(stored['Body']), ContentLength=len(stored['Body']))
+
+    def list_objects_v2(self, Bucket, Prefix='', MaxKeys=1000, ContinuationToken=None):
+        with self.lock:
+            keys = sorted(key for key in self.buckets.get(Bucket, {}) if key.startswith(Prefix))
+            sizes = {key: len(self.buckets[Bucket][key]['Body']) for key in keys}
+        if ContinuationToken:
+            keys = [key for key in keys if key > ContinuationToken]
+        page = keys[:MaxKeys]
+        response = {
+            'Contents': [{'Key': key, 'Size': sizes[key]} for key in page],
+            'KeyCount': len(page),
+            'IsTruncated': len(keys) > MaxKeys
+        }
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = page[-1]
+        return response
+
+
+def install(handler_module, s3, bucket='local-todo-archive'):
+    """Point the handler module's archive bucket at a LocalS3"""
+    handler_module.s3 = s3
+    handler_module.ARCHIVE_BUCKET = bucket
@@ -0,0 +1,61 @@
+"""
+Shared fixtures for the todo handler tests
+
+handler() runs against the in-memory table from local_dynamodb.py, so no
+AWS access is needed. boto3 must be importable, for example via the copy
+vendored with the AI extractor:
+
+    cd terraform/lambda
+    PYTHONPATH=gemini_extractor python -m pytest tests
+"""
+
+import base64
+import gzip
+import json
+import os
+import sys
+
+import pytest
+
+# index.py reads its configuration at import time
+os.environ.setdefault('DYNAMODB_TABLE', 'test-todos')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-west-2')
+os.environ.setdefault('TODOS_RANK_INDEX', 'user-rank-index')
+os.environ.setdefault('TODOS_OPEN_DUE_INDEX', 'user-open-due-index')
+os.environ.setdefault('TODOS_REQUEST_METRICS', 'false')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import index  # noqa: E402
+from load_test import TABLE_INDEXES, make_event  # noqa: E402
+from local_dynamodb import LocalDynamoDBClient, LocalTable, install  # noqa: E402
+
+
+@pytest.fixture(params=['resource', 'client'])
+def table(request, monkeypatch):
+    """
+    A fresh in-memory todos table and empty warm-container caches, read
+    through either data access mode (TODOS_DATA_ACCESS)
+    """
+    for name in ('table', 'table_name', 'dynamodb', 'dynamodb_client'):
+        monkeypatch.setattr(index, name, getattr(index, name))
+    table = LocalTable(name=os.environ['DYNAMODB_TABLE'], indexes=TABLE_INDEXES)
+    install(index, table)
+    index.dynamodb_client = LocalDynamoDBClient(table) if request.param == 'client' else None
+    monkeypatch.setattr(index, 'todo_list_cache', index.TodoListCache(
+        index.LIST_CACHE_MAX_USERS, index.LIST_CACHE_TTL_SECONDS, index.LIST_CACHE_MAX_TODOS))
+    monkeypatch.setattr(index, 'idempotency_cache', index.IdempotencyCache(index.IDEMPOTENCY_CACHE_SIZE))
+    return table
+
+
+@pytest.fixture
+def api(table):
+    """Call handler() as API Gateway does; returns (status code, body, response)"""
+    def call(method, resource, todo_id=None, body=None, query=None, headers=None, user_id='user-1'):
+        response = index.handler(make_event(method, resource, user_id, todo_id=todo_id, body=body,
+                                            query=query, headers=headers), None)
+        raw_body = response.get('body')
+        if response.get('isBase64Encoded'):
+            raw_body = gzip.decompress(base64.b64decode(raw_body)).decode('utf-8')
+        return response['statusCode'], json.loads(raw_body) if raw_body else None, response
+    return call
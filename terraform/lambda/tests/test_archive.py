@@ -0,0 +1,121 @@
+import io
+
+import pytest
+
+import index
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.objects[Key] = Body
+
+    def list_objects_v2(self, Bucket, Prefix, ContinuationToken=None):
+        # One key per page, to walk the continuation tokens
+        keys = sorted(key for key in self.objects if key.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        response = {'Contents': [{'Key': key} for key in keys[start:start + 1]],
+                    'IsTruncated': start + 1 < len(keys)}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = str(start + 1)
+        return response
+
+    def get_object(self, Bucket, Key):
+        return {'Body': io.BytesIO(self.objects[Key])}
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(index, 's3', fake)
+    monkeypatch.setattr(index, 'ARCHIVE_BUCKET', 'archive')
+    return fake
+
+
+def age(table, todo_id, user_id='user-1'):
+    table.update_item(Key={'user_id': user_id, 'id': todo_id}, UpdateExpression='SET updated_at = :old',
+                      ExpressionAttributeValues={':old': '2020-01-01T00:00:00'})
+
+
+@pytest.fixture
+def done_and_open(api, table):
+    api('POST', '/todos', body={'id': 'done', 'title': 'done', 'category': 'work'})
+    api('PUT', '/todos/{id}', todo_id='done', body={'completed': True})
+    api('POST', '/todos', body={'id': 'open', 'title': 'open'})
+    api('POST', '/todos', body={'id': 'recent', 'title': 'recent'})
+    api('PUT', '/todos/{id}', todo_id='recent', body={'completed': True})
+    age(table, 'done')
+    age(table, 'open')
+
+
+def test_old_completed_todos_move_to_the_archive(api, s3, done_and_open, monkeypatch):
+    monkeypatch.setattr(index, 'SYNC_WATERMARK_MARGIN_SECONDS', 0)
+    _, before, _ = api('GET', '/todos')
+
+    assert index.archive_completed_todos('user-1', older_than_days=30) == 1
+    assert len(s3.objects) == 1 and next(iter(s3.objects)).startswith('user-1/')
+    _, listing, _ = api('GET', '/todos')
+    assert [todo['id'] for todo in listing['todos']] == ['open', 'recent']
+    _, sync, _ = api('GET', '/todos', query={'since': before['watermark']})
+    assert sync['deleted'] == ['done']
+
+    _, counted, _ = api('GET', '/todos/stats')
+    _, recounted, _ = api('GET', '/todos/stats', query={'repair': 'true'})
+    assert counted == recounted and counted['stats']['total'] == 2
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_include_archived_merges_the_archive(api, s3, done_and_open, cached):
+    index.archive_completed_todos('user-1', older_than_days=30)
+    if not cached:
+        index.todo_list_cache.max_users = 0
+
+    _, body, _ = api('GET', '/todos', query={'includeArchived': 'true'})
+    assert [(todo['id'], todo.get('archived', False)) for todo in body['todos']] == [
+        ('open', False), ('recent', False), ('done', True)]
+    assert body['archivedCount'] == 1
+    _, filtered, _ = api('GET', '/todos', query={'includeArchived': 'true', 'category': 'work', 'fields': 'title'})
+    assert filtered['todos'] == [{'id': 'done', 'title': 'done', 'archived': True}]
+
+
+def test_latest_archived_copy_wins_and_live_todos_shadow_it(api, table, s3):
+    api('POST', '/todos', body={'id': 'a', 'title': 'first'})
+    api('PUT', '/todos/{id}', todo_id='a', body={'completed': True})
+    age(table, 'a')
+    index.archive_completed_todos('user-1', older_than_days=30)
+    # Object names start with the archive time: make the first run older
+    s3.objects = {'user-1/20200101T000000-first.ndjson.gz': body for body in s3.objects.values()}
+    api('POST', '/todos', body={'id': 'a', 'title': 'second'})
+    api('PUT', '/todos/{id}', todo_id='a', body={'completed': True})
+    age(table, 'a')
+    index.archive_completed_todos('user-1', older_than_days=30)
+    assert index.load_archived_todos('user-1')['a']['title'] == 'second'
+
+    api('POST', '/todos', body={'id': 'a', 'title': 'third'})
+    _, body, _ = api('GET', '/todos', query={'includeArchived': 'true'})
+    assert [(todo['title'], todo.get('archived')) for todo in body['todos']] == [('third', None)]
+
+
+def test_todo_edited_during_the_run_stays_live(api, table, s3):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+    api('PUT', '/todos/{id}', todo_id='a', body={'completed': True})
+    age(table, 'a')
+    put_object = s3.put_object
+
+    def put_then_edit(**kwargs):
+        put_object(**kwargs)
+        api('PUT', '/todos/{id}', todo_id='a', body={'title': 'edited'})
+
+    s3.put_object = put_then_edit
+    assert index.archive_completed_todos('user-1', older_than_days=30) == 0
+    _, body, _ = api('GET', '/todos', query={'includeArchived': 'true'})
+    assert [(todo['title'], todo.get('archived')) for todo in body['todos']] == [('edited', None)]
+
+
+def test_archive_needs_a_bucket(api, monkeypatch):
+    monkeypatch.setattr(index, 's3', None)
+    with pytest.raises(RuntimeError):
+        index.archive_completed_todos('user-1')
+    assert api('GET', '/todos', query={'includeArchived': 'true', 'limit': '5'})[0] == 400
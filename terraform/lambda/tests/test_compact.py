@@ -0,0 +1,72 @@
+import pytest
+
+import index
+
+
+FULL = {'task', 'description', 'priority', 'created_at'}
+COMPACT = {'t', 'd', 'p', 'c'}
+
+
+@pytest.fixture
+def compact(monkeypatch):
+    monkeypatch.setattr(index, 'COMPACT_SCHEMA', True)
+
+
+def stored(table, todo_id, user_id='user-1'):
+    return table.get_item(Key={'user_id': user_id, 'id': todo_id})['Item']
+
+
+def create(api, todo_id, **fields):
+    status, body, _ = api('POST', '/todos', body=dict({'id': todo_id, 'title': todo_id}, **fields))
+    assert status == 201, body
+    return body['todo']
+
+
+def test_items_round_trip_through_the_compact_schema():
+    item = {'id': 'a', 'task': 'x', 'description': '', 'priority': 'high',
+            'created_at': '2026-01-02T03:04:05.678901', 'updated_at': '2026-01-02T03:04:05.678901'}
+    compacted = index.compact_item(item)
+    assert set(compacted) == {'id', 'updated_at'} | COMPACT
+    assert compacted['p'] == 3 and isinstance(compacted['c'], int)
+    assert index.expand_item(compacted) == item
+
+    # Timestamps that would not decode to the same string are kept as sent
+    assert index.compact_item({'created_at': '2026-01-02T03:04:05Z'}) == {'c': '2026-01-02T03:04:05Z'}
+
+
+def test_compact_writes_serve_the_same_responses(api, table, compact):
+    todo = create(api, 'a', title='alpha', description='d', priority='high', category='work', dueDate='2026-01-01')
+    assert FULL.isdisjoint(stored(table, 'a')) and COMPACT <= set(stored(table, 'a'))
+    assert not isinstance(stored(table, 'a')['c'], str) and stored(table, 'a')['p'] == 3
+
+    index.todo_list_cache.max_users = 0
+    assert api('GET', '/todos/{id}', todo_id='a')[1]['todo'] == todo
+    assert api('GET', '/todos')[1]['todos'] == [todo]
+    assert api('GET', '/todos', query={'fields': 'title,priority'})[1]['todos'] == [
+        {'id': 'a', 'title': 'alpha', 'priority': 'high'}]
+    assert [found['id'] for found in api('GET', '/todos/search', query={'q': 'alp'})[1]['todos']] == ['a']
+
+
+def test_both_schemas_are_read_and_sorted_together(api, monkeypatch):
+    create(api, 'full', priority='low')
+    monkeypatch.setattr(index, 'COMPACT_SCHEMA', True)
+    create(api, 'compact', priority='high')
+    index.todo_list_cache.max_users = 0
+
+    _, body, _ = api('GET', '/todos', query={'sort': 'priority'})
+    assert [(todo['id'], todo['priority']) for todo in body['todos']] == [('compact', 'high'), ('full', 'low')]
+    _, body, _ = api('GET', '/todos', query={'sort': 'title'})
+    assert [todo['id'] for todo in body['todos']] == ['compact', 'full']
+
+
+@pytest.mark.parametrize('to_compact', [True, False])
+def test_items_migrate_when_next_rewritten(api, table, monkeypatch, to_compact):
+    monkeypatch.setattr(index, 'COMPACT_SCHEMA', not to_compact)
+    todo = create(api, 'a', description='d', priority='medium')
+    monkeypatch.setattr(index, 'COMPACT_SCHEMA', to_compact)
+
+    _, body, _ = api('PUT', '/todos/{id}', todo_id='a', body={'completed': True})
+    names = set(stored(table, 'a'))
+    assert COMPACT <= names and FULL.isdisjoint(names) if to_compact else FULL <= names and COMPACT.isdisjoint(names)
+    assert body['todo'] == dict(todo, completed=True, updatedAt=body['todo']['updatedAt'])
+    assert api('GET', '/todos/{id}', todo_id='a')[1]['todo'] == body['todo']
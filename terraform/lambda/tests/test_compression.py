@@ -0,0 +1,52 @@
+import base64
+import gzip
+import json
+
+import pytest
+
+import index
+from load_test import make_event
+
+
+@pytest.fixture
+def long_list(api):
+    operations = [{'type': 'create', 'todo': {'title': f'todo {number}', 'description': 'x' * 100}}
+                  for number in range(60)]
+    api('POST', '/todos/batch', body={'operations': operations})
+
+
+def get(accept_encoding, resource='/todos', headers=None):
+    return index.handler(make_event('GET', resource, 'user-1', headers=dict(headers or {},
+                                                                           **{'Accept-Encoding': accept_encoding})), None)
+
+
+def test_large_responses_are_gzipped_when_accepted(long_list):
+    plain = get('identity')
+    assert not plain.get('isBase64Encoded') and 'Content-Encoding' not in plain['headers']
+    assert len(plain['body'].encode('utf-8')) >= index.GZIP_MIN_BYTES
+
+    compressed = get('gzip, deflate')
+    assert compressed['isBase64Encoded'] is True
+    assert compressed['headers']['Content-Encoding'] == 'gzip'
+    assert compressed['headers']['Vary'] == plain['headers']['Vary'] == 'Accept-Encoding'
+    decoded = json.loads(gzip.decompress(base64.b64decode(compressed['body'])))
+    assert decoded['todos'] == json.loads(plain['body'])['todos']
+
+
+def test_compressed_responses_carry_a_weak_etag(long_list):
+    plain = get('identity')
+    compressed = get('gzip')
+    assert compressed['headers']['ETag'] == 'W/' + plain['headers']['ETag']
+    assert get('gzip', headers={'If-None-Match': compressed['headers']['ETag']})['statusCode'] == 304
+
+
+@pytest.mark.parametrize('accept_encoding', ['', 'br', 'gzip;q=0', 'deflate, gzip;q=0.0'])
+def test_gzip_refused_or_not_offered(long_list, accept_encoding):
+    response = get(accept_encoding)
+    assert not response.get('isBase64Encoded') and 'Content-Encoding' not in response['headers']
+
+
+def test_small_responses_are_not_compressed(api):
+    api('POST', '/todos', body={'title': 'a'})
+    response = get('gzip')
+    assert not response.get('isBase64Encoded') and 'Vary' not in response['headers']
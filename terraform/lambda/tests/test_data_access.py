@@ -0,0 +1,54 @@
+from decimal import Decimal
+
+import pytest
+
+import index
+from local_dynamodb import LocalDynamoDBClient
+
+
+@pytest.mark.parametrize('value', [
+    'text', True, False, None, 7, 2.5, {'nested': [1, 'two', {'three': False}]}, {'a', 'b'}, {1, 2}, b'raw'])
+def test_wire_format_round_trips(value):
+    assert index.from_wire(index.to_wire(value)) == value
+
+
+def test_wire_numbers_decode_without_decimal():
+    assert index.from_wire_item({'count': {'N': '3'}, 'ratio': {'N': '0.25'}}) == {'count': 3, 'ratio': 0.25}
+    assert index.to_wire(Decimal('1.50')) == {'N': '1.50'}
+    with pytest.raises(ValueError):
+        index.to_wire(object())
+
+
+def test_both_modes_serve_identical_responses(api, table, monkeypatch):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a', 'dueDate': '2026-01-01', 'category': 'work'})
+    api('POST', '/todos', body={'id': 'b', 'title': 'b', 'description': 'd'})
+    api('PUT', '/todos/{id}', todo_id='b', body={'completed': True})
+    table.update_item(Key={'user_id': 'user-1', 'id': 'a'}, UpdateExpression='SET extra = :extra',
+                      ExpressionAttributeValues={':extra': {'points': Decimal(3), 'tags': ['x']}})
+    index.todo_list_cache.max_users = 0
+
+    def responses():
+        return [api('GET', '/todos', query=query)[1] for query in (
+            None, {'limit': '1'}, {'fields': 'title,completed'}, {'category': 'work'}, {'completed': 'true'})] + [
+            api('GET', '/todos/{id}', todo_id='a')[1], api('GET', '/todos/search', query={'q': 'a'})[1]]
+
+    monkeypatch.setattr(index, 'dynamodb_client', None)
+    through_resource = responses()
+    monkeypatch.setattr(index, 'dynamodb_client', LocalDynamoDBClient(table))
+    through_client = responses()
+    for resource_body, client_body in zip(through_resource, through_client):
+        resource_body.pop('watermark', None)
+        client_body.pop('watermark', None)
+    assert through_client == through_resource
+
+
+def test_cursors_carry_over_between_modes(api, table, monkeypatch):
+    for number in range(5):
+        api('POST', '/todos', body={'id': f'todo-{number}', 'title': 'x'})
+    index.todo_list_cache.max_users = 0
+
+    monkeypatch.setattr(index, 'dynamodb_client', None)
+    _, first, _ = api('GET', '/todos', query={'limit': '2'})
+    monkeypatch.setattr(index, 'dynamodb_client', LocalDynamoDBClient(table))
+    _, second, _ = api('GET', '/todos', query={'limit': '2', 'cursor': first['nextCursor']})
+    assert [todo['id'] for todo in first['todos'] + second['todos']] == [f'todo-{number}' for number in range(4)]
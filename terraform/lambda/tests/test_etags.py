@@ -0,0 +1,55 @@
+import pytest
+
+
+def etag_of(api, resource='/todos', **kwargs):
+    status, _, response = api('GET', resource, **kwargs)
+    assert status == 200
+    return response['headers']['ETag']
+
+
+def revalidate(api, etag, resource='/todos', **kwargs):
+    status, body, response = api('GET', resource, headers={'If-None-Match': etag}, **kwargs)
+    return status, body, response
+
+
+def test_matching_if_none_match_is_answered_with_304(api):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+    etag = etag_of(api)
+
+    status, body, response = revalidate(api, etag)
+    assert status == 304 and body is None
+    assert response['headers']['ETag'] == etag
+    assert revalidate(api, f'"other", W/{etag}')[0] == 304
+    assert revalidate(api, '*')[0] == 304
+
+
+@pytest.mark.parametrize('write', [
+    lambda api: api('POST', '/todos', body={'title': 'b'}),
+    lambda api: api('PUT', '/todos/{id}', todo_id='a', body={'completed': True}),
+    lambda api: api('DELETE', '/todos/{id}', todo_id='a'),
+    lambda api: api('POST', '/todos/batch', body={'operations': [{'type': 'create', 'todo': {'title': 'b'}}]}),
+    lambda api: api('POST', '/todos/ops', body={'operations': [{'type': 'delete', 'id': 'a'}]}),
+])
+def test_every_write_changes_the_etag(api, write):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+    etag = etag_of(api)
+    single_etag = etag_of(api, '/todos/{id}', todo_id='a')
+
+    write(api)
+    assert revalidate(api, etag)[0] == 200
+    assert revalidate(api, single_etag, '/todos/{id}', todo_id='a')[0] != 304
+
+
+def test_etag_depends_on_the_request_and_the_user(api):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+    etag = etag_of(api)
+    assert etag_of(api, query={'completed': 'false'}) != etag
+    assert revalidate(api, etag, query={'completed': 'false'})[0] == 200
+
+    api('POST', '/todos', body={'title': 'other'}, user_id='user-2')
+    assert revalidate(api, etag)[0] == 304
+
+
+def test_failed_reads_carry_no_etag(api):
+    status, _, response = api('GET', '/todos/{id}', todo_id='missing')
+    assert status == 404 and 'ETag' not in response['headers']
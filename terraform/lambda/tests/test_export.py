@@ -0,0 +1,77 @@
+import base64
+import gzip
+import json
+
+import index
+import local_dynamodb
+from load_test import make_event
+
+
+def export(query=None, accept_encoding='identity', user_id='user-1'):
+    response = index.handler(make_event('GET', '/todos/export', user_id, query=query,
+                                        headers={'Accept-Encoding': accept_encoding}), None)
+    assert response['statusCode'] == 200, response
+    body = response['body']
+    if response.get('isBase64Encoded'):
+        body = gzip.decompress(base64.b64decode(body)).decode('utf-8')
+    return [json.loads(line) for line in body.splitlines()], response['headers']
+
+
+def export_all(user_id='user-1'):
+    responses = []
+    cursor = None
+    while True:
+        todos, headers = export({'cursor': cursor} if cursor else None, user_id=user_id)
+        responses.append([todo['id'] for todo in todos])
+        cursor = headers.get('X-Next-Cursor')
+        if not cursor:
+            return responses
+
+
+def test_export_is_ndjson_of_live_todos(api):
+    for name in ('a', 'b', 'c'):
+        api('POST', '/todos', body={'id': name, 'title': name})
+    api('DELETE', '/todos/{id}', todo_id='b')
+
+    todos, headers = export()
+    assert [(todo['id'], todo['title']) for todo in todos] == [('a', 'a'), ('c', 'c')]
+    assert headers['Content-Type'] == 'application/x-ndjson'
+    assert headers['X-Exported-Count'] == '2'
+    assert 'X-Next-Cursor' not in headers
+
+
+def test_export_compression(api):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+
+    todos, headers = export(accept_encoding='gzip')
+    assert headers['Content-Encoding'] == 'gzip' and [todo['id'] for todo in todos] == ['a']
+    todos, headers = export({'gzip': 'true'})
+    assert headers['Content-Type'] == 'application/gzip' and 'Content-Encoding' not in headers
+    assert [todo['id'] for todo in todos] == ['a']
+
+
+def test_export_over_the_size_cap_continues_with_a_cursor(api, monkeypatch):
+    monkeypatch.setattr(local_dynamodb, 'PAGE_SIZE_BYTES', 1000)
+    monkeypatch.setattr(index, 'EXPORT_MAX_BYTES', 1)
+    todo_ids = [f'todo-{number:02d}' for number in range(12)]
+    for todo_id in todo_ids:
+        api('POST', '/todos', body={'id': todo_id, 'title': todo_id})
+
+    responses = export_all()
+    assert len(responses) > 1
+    assert [todo_id for page in responses for todo_id in page] == todo_ids
+
+
+def test_export_stops_at_the_cap_between_shards(api, monkeypatch):
+    monkeypatch.setattr(index, 'SHARDED_USERS', frozenset({'hot-user'}))
+    monkeypatch.setattr(index, 'SHARD_COUNT', 3)
+    monkeypatch.setattr(index, 'EXPORT_MAX_BYTES', 1)
+    todo_ids = [f'todo-{number:02d}' for number in range(12)]
+    for todo_id in todo_ids:
+        api('POST', '/todos', body={'id': todo_id, 'title': todo_id}, user_id='hot-user')
+
+    responses = export_all('hot-user')
+    assert len(responses) == 3
+    for page in responses:
+        assert len({index.todo_partition('hot-user', todo_id) for todo_id in page}) == 1
+    assert sorted(todo_id for page in responses for todo_id in page) == todo_ids
@@ -0,0 +1,56 @@
+import pytest
+
+import index
+
+
+@pytest.fixture
+def two_todos(api):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a', 'category': 'work', 'dueDate': '2026-01-01'})
+    api('POST', '/todos', body={'id': 'b', 'title': 'b', 'description': 'long text'})
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_list_is_trimmed_to_the_fields(api, two_todos, cached):
+    if cached:
+        api('GET', '/todos')
+    else:
+        index.todo_list_cache.max_users = 0
+
+    _, body, _ = api('GET', '/todos', query={'fields': 'title, dueDate'})
+    assert body['todos'] == [{'id': 'a', 'title': 'a', 'dueDate': '2026-01-01'},
+                             {'id': 'b', 'title': 'b', 'dueDate': ''}]
+    _, page, _ = api('GET', '/todos', query={'fields': 'completed', 'limit': '1'})
+    assert page['todos'] == [{'id': 'a', 'completed': False}] and page['nextCursor']
+    _, filtered, _ = api('GET', '/todos', query={'fields': 'title', 'category': 'work', 'sort': '-title'})
+    assert filtered['todos'] == [{'id': 'a', 'title': 'a'}]
+
+
+def test_uncached_reads_project_the_query(api, table, two_todos, monkeypatch):
+    index.todo_list_cache.max_users = 0
+    projections = []
+    query = table.query
+
+    def recording_query(**params):
+        projections.append(params.get('ProjectionExpression'))
+        return query(**params)
+
+    monkeypatch.setattr(table, 'query', recording_query)
+    api('GET', '/todos', query={'fields': 'title'})
+    assert projections and all(projections)
+
+
+def test_single_todo_and_sync_honour_fields(api, two_todos, monkeypatch):
+    monkeypatch.setattr(index, 'SYNC_WATERMARK_MARGIN_SECONDS', 0)
+    _, body, _ = api('GET', '/todos/{id}', todo_id='b', query={'fields': 'description'})
+    assert body['todo'] == {'id': 'b', 'description': 'long text'}
+
+    _, full, _ = api('GET', '/todos')
+    api('PUT', '/todos/{id}', todo_id='a', body={'completed': True})
+    api('DELETE', '/todos/{id}', todo_id='b')
+    _, sync, _ = api('GET', '/todos', query={'since': full['watermark'], 'fields': 'completed'})
+    assert sync['todos'] == [{'id': 'a', 'completed': True}] and sync['deleted'] == ['b']
+
+
+def test_unknown_fields_are_rejected(api):
+    status, body, _ = api('GET', '/todos', query={'fields': 'title,owner'})
+    assert status == 400 and 'owner' in body['error']
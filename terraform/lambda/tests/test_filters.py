@@ -0,0 +1,58 @@
+import pytest
+from botocore.exceptions import ClientError
+
+
+def ids(api, **query):
+    status, body, _ = api('GET', '/todos', query=query)
+    assert status == 200, body
+    return [todo['id'] for todo in body['todos']]
+
+
+@pytest.mark.parametrize('due_date', ['', None])
+def test_empty_due_date_is_stored_as_none(api, table, due_date):
+    status, body, _ = api('POST', '/todos', body={'id': 'a', 'title': 'a', 'dueDate': due_date})
+    assert status == 201 and body['todo']['dueDate'] == ''
+    status, body, _ = api('POST', '/todos/batch', body={'operations': [
+        {'type': 'create', 'todo': {'id': 'b', 'title': 'b', 'dueDate': due_date}}]})
+    assert body['results'][0]['status'] == 201
+    assert not any('due_date' in item for item in table.scan()['Items'])
+
+
+@pytest.mark.parametrize('due_date', ['', None])
+def test_clearing_a_due_date_removes_it(api, table, due_date):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a', 'dueDate': '2026-01-01'})
+    assert ids(api, dueBefore='2026-02-01') == ['a']
+
+    status, body, _ = api('PUT', '/todos/{id}', todo_id='a', body={'dueDate': due_date})
+    assert status == 200 and body['todo']['dueDate'] == ''
+    assert ids(api, dueBefore='2026-02-01') == []
+    item = table.get_item(Key={'user_id': 'user-1', 'id': 'a'})['Item']
+    assert 'due_date' not in item and 'open_due_date' not in item
+
+    _, counted, _ = api('GET', '/todos/stats')
+    _, recounted, _ = api('GET', '/todos/stats', query={'repair': 'true'})
+    assert counted == recounted
+
+
+@pytest.mark.parametrize('category', ['', None, 7])
+def test_category_must_be_a_non_empty_string(api, category):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+    assert api('POST', '/todos', body={'title': 'b', 'category': category})[0] == 400
+    assert api('PUT', '/todos/{id}', todo_id='a', body={'category': category})[0] == 400
+    _, body, _ = api('POST', '/todos/ops', body={'operations': [
+        {'type': 'update', 'id': 'a', 'todo': {'category': category}}]})
+    assert body['results'][0]['status'] == 400
+    assert ids(api, category='other') == ['a']
+
+
+@pytest.mark.parametrize('value', ['', None, 5])
+def test_local_table_rejects_invalid_index_keys(table, value):
+    with pytest.raises(ClientError) as error:
+        table.put_item(Item={'user_id': 'user-1', 'id': 'a', 'due_date': value})
+    assert error.value.response['Error']['Code'] == 'ValidationException'
+
+    table.put_item(Item={'user_id': 'user-1', 'id': 'a', 'due_date': '2026-01-01'})
+    with pytest.raises(ClientError):
+        table.update_item(Key={'user_id': 'user-1', 'id': 'a'}, UpdateExpression='SET due_date = :value',
+                          ExpressionAttributeValues={':value': value})
+    assert table.get_item(Key={'user_id': 'user-1', 'id': 'a'})['Item']['due_date'] == '2026-01-01'
@@ -0,0 +1,56 @@
+import index
+
+
+def count_todos(api):
+    _, body, _ = api('GET', '/todos')
+    return len(body['todos'])
+
+
+def test_retry_replays_the_first_response(api):
+    headers = {'Idempotency-Key': 'key-1'}
+    status, first, first_response = api('POST', '/todos', body={'title': 'a'}, headers=headers)
+    assert status == 201
+
+    status, _, retry_response = api('POST', '/todos', body={'title': 'a'}, headers=headers)
+    assert status == 201
+    assert retry_response['body'] == first_response['body']
+    assert retry_response['headers']['Idempotent-Replayed'] == 'true'
+    assert count_todos(api) == 1
+
+
+def test_replay_from_the_table_after_a_cold_start(api):
+    headers = {'Idempotency-Key': 'key-1'}
+    operations = [{'type': 'create', 'todo': {'title': f'todo {number}'}} for number in range(3)]
+    _, _, first_response = api('POST', '/todos/batch', body={'operations': operations}, headers=headers)
+    index.idempotency_cache.entries.clear()
+
+    _, _, retry_response = api('POST', '/todos/batch', body={'operations': operations}, headers=headers)
+    assert retry_response['body'] == first_response['body']
+    assert count_todos(api) == 3
+
+
+def test_key_reused_for_another_request_is_rejected(api):
+    headers = {'Idempotency-Key': 'key-1'}
+    api('POST', '/todos', body={'title': 'a'}, headers=headers)
+
+    status, _, _ = api('POST', '/todos', body={'title': 'b'}, headers=headers)
+    assert status == 422
+    assert count_todos(api) == 1
+
+
+def test_keys_are_per_user(api):
+    headers = {'Idempotency-Key': 'key-1'}
+    api('POST', '/todos', body={'title': 'a'}, headers=headers)
+
+    status, _, response = api('POST', '/todos', body={'title': 'a'}, headers=headers, user_id='user-2')
+    assert status == 201 and 'Idempotent-Replayed' not in response['headers']
+
+
+def test_server_errors_release_the_key(api, monkeypatch):
+    headers = {'Idempotency-Key': 'key-1'}
+    with monkeypatch.context() as patch:
+        patch.setattr(index, 'create_todo', lambda user_id, body: index.create_error_response(500, 'boom'))
+        assert api('POST', '/todos', body={'title': 'a'}, headers=headers)[0] == 500
+
+    status, _, response = api('POST', '/todos', body={'title': 'a'}, headers=headers)
+    assert status == 201 and 'Idempotent-Replayed' not in response['headers']
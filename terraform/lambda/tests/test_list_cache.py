@@ -0,0 +1,66 @@
+import index
+
+
+def todos(*ids):
+    return [{'id': todo_id} for todo_id in ids]
+
+
+def test_lru_eviction_by_users_and_by_todos():
+    cache = index.TodoListCache(max_users=2, ttl_seconds=60, max_todos=5)
+    cache.put('a', 1, todos('1', '2'))
+    cache.put('b', 1, todos('1'))
+    cache.get('a', 1)
+    cache.put('c', 1, todos('1'))
+    assert list(cache.entries) == ['a', 'c']
+
+    cache.put('d', 1, todos('1', '2', '3'))
+    assert list(cache.entries) == ['c', 'd'] and cache.todo_count == 4
+    cache.put('e', 1, todos(*'123456'))
+    assert 'e' not in cache.entries and cache.todo_count == 4
+
+
+def test_entries_expire_and_mismatched_versions_miss(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(index.time, 'monotonic', lambda: now[0])
+    cache = index.TodoListCache(max_users=10, ttl_seconds=60, max_todos=100)
+    cache.put('a', 3, todos('1'))
+    assert cache.get('a', 4) is None and cache.todo_count == 0
+
+    cache.put('a', 3, todos('1'))
+    now[0] += 61
+    assert cache.version('a') is None and cache.get('a', 3) is None
+
+
+def test_apply_write_patches_only_the_next_version():
+    cache = index.TodoListCache(max_users=10, ttl_seconds=60, max_todos=100)
+    cache.put('a', 1, todos('1', '3'))
+    cache.apply_write('a', 2, todo={'id': '2'})
+    cache.apply_write('a', 3, deleted_id='1')
+    assert cache.get('a', 3)['ids'] == ['2', '3'] and cache.todo_count == 2
+
+    cache.apply_write('a', 5, todo={'id': '4'})
+    assert cache.entries == {} and cache.todo_count == 0
+
+
+def test_own_writes_keep_serving_from_the_cache(api, table):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+    api('GET', '/todos')
+
+    api('POST', '/todos', body={'id': 'b', 'title': 'b'})
+    api('PUT', '/todos/{id}', todo_id='a', body={'completed': True})
+    queries = table.operation_counts.get('Query', 0)
+    _, body, _ = api('GET', '/todos')
+    assert [(todo['id'], todo['completed']) for todo in body['todos']] == [('a', True), ('b', False)]
+    assert table.operation_counts.get('Query', 0) == queries
+
+
+def test_write_from_another_container_invalidates(api, table):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+    api('GET', '/todos')
+
+    # Another container creates a todo: this one's entry is left as it was
+    cached = index.todo_list_cache.entries['user-1']
+    api('POST', '/todos', body={'id': 'b', 'title': 'b'})
+    index.todo_list_cache.entries['user-1'] = cached
+    _, body, _ = api('GET', '/todos')
+    assert [todo['id'] for todo in body['todos']] == ['a', 'b']
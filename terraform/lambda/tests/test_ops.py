@@ -0,0 +1,116 @@
+import index
+
+
+def apply_operations(api, operations):
+    status, body, _ = api('POST', '/todos/ops', body={'operations': operations})
+    assert status == 200, body
+    return body
+
+
+def test_group_applies_every_operation(api):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+    api('POST', '/todos', body={'id': 'b', 'title': 'b'})
+
+    body = apply_operations(api, [
+        {'type': 'create', 'todo': {'id': 'c', 'title': 'c'}},
+        {'type': 'update', 'id': 'a', 'todo': {'completed': True}},
+        {'type': 'delete', 'id': 'b'},
+    ])
+    assert [result['status'] for result in body['results']] == [201, 200, 200]
+    _, listing, _ = api('GET', '/todos')
+    assert {todo['id']: todo['completed'] for todo in listing['todos']} == {'a': True, 'c': False}
+
+
+def test_failed_operation_fails_its_group_with_424(api):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+
+    body = apply_operations(api, [
+        {'type': 'update', 'id': 'a', 'todo': {'completed': True}},
+        {'type': 'create', 'todo': {'id': 'new', 'title': 'new'}},
+        {'type': 'delete', 'id': 'missing'},
+    ])
+    assert [result['status'] for result in body['results']] == [424, 424, 404]
+    assert body['succeeded'] == 0
+    _, listing, _ = api('GET', '/todos')
+    assert [(todo['id'], todo['completed']) for todo in listing['todos']] == [('a', False)]
+
+
+def test_create_over_a_live_todo_fails_its_group(api):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+
+    body = apply_operations(api, [
+        {'type': 'create', 'todo': {'id': 'b', 'title': 'b'}},
+        {'type': 'create', 'todo': {'id': 'a', 'title': 'again'}},
+    ])
+    assert [result['status'] for result in body['results']] == [424, 409]
+    assert api('GET', '/todos/{id}', todo_id='b')[0] == 404
+
+
+def test_groups_commit_independently(api, monkeypatch):
+    monkeypatch.setattr(index, 'OPS_GROUP_SIZE', 2)
+
+    body = apply_operations(api, [
+        {'type': 'create', 'todo': {'id': 'a', 'title': 'a'}},
+        {'type': 'create', 'todo': {'id': 'b', 'title': 'b'}},
+        {'type': 'create', 'todo': {'id': 'c', 'title': 'c'}},
+        {'type': 'update', 'id': 'missing', 'todo': {'completed': True}},
+    ])
+    assert [result['status'] for result in body['results']] == [201, 201, 424, 404]
+    _, listing, _ = api('GET', '/todos')
+    assert [todo['id'] for todo in listing['todos']] == ['a', 'b']
+
+    _, counted, _ = api('GET', '/todos/stats')
+    _, recounted, _ = api('GET', '/todos/stats', query={'repair': 'true'})
+    assert counted == recounted
+
+
+def test_invalid_and_duplicate_operations_fail_their_group(api, monkeypatch):
+    monkeypatch.setattr(index, 'OPS_GROUP_SIZE', 2)
+
+    body = apply_operations(api, [
+        {'type': 'create', 'todo': {'id': 'a', 'title': 'a'}},
+        {'type': 'create', 'todo': {'id': 'b'}},
+        {'type': 'create', 'todo': {'id': 'c', 'title': 'c'}},
+        {'type': 'delete', 'id': 'c'},
+        {'type': 'rename', 'id': 'd'},
+        {'type': 'create', 'todo': {'id': 'e', 'title': 'e'}},
+    ])
+    assert [(result['status'], result['group']) for result in body['results']] == [
+        (424, 0), (400, 0), (424, 1), (409, 1), (400, 2), (424, 2)]
+    assert (body['succeeded'], body['failed']) == (0, 6)
+    assert api('GET', '/todos')[1]['todos'] == []
+
+
+def test_malformed_envelopes_are_rejected(api, monkeypatch):
+    monkeypatch.setattr(index, 'BATCH_MAX_OPERATIONS', 2)
+    for body in ({}, {'operations': []}, {'operations': 'create'},
+                 {'operations': [{'type': 'delete', 'id': str(number)} for number in range(3)]}):
+        assert api('POST', '/todos/ops', body=body)[0] == 400
+
+
+def test_operations_reach_sharded_partitions(api, table, monkeypatch):
+    monkeypatch.setattr(index, 'SHARDED_USERS', frozenset({'user-1'}))
+    monkeypatch.setattr(index, 'SHARD_COUNT', 3)
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+
+    body = apply_operations(api, [
+        {'type': 'update', 'id': 'a', 'todo': {'completed': True}},
+        {'type': 'create', 'todo': {'id': 'b', 'title': 'b'}},
+    ])
+    assert [result['status'] for result in body['results']] == [200, 201]
+    assert sorted((item['id'], item['user_id']) for item in table.scan()['Items'] if item['id'] in ('a', 'b')) == [
+        ('a', index.todo_partition('user-1', 'a')), ('b', index.todo_partition('user-1', 'b'))]
+    _, listing, _ = api('GET', '/todos')
+    assert [(todo['id'], todo['completed']) for todo in listing['todos']] == [('a', True), ('b', False)]
+
+
+def test_create_reuses_a_deleted_id(api, monkeypatch):
+    monkeypatch.setattr(index, 'SYNC_WATERMARK_MARGIN_SECONDS', 0)
+    api('POST', '/todos', body={'id': 'a', 'title': 'old'})
+    _, before, _ = api('GET', '/todos')
+    apply_operations(api, [{'type': 'delete', 'id': 'a'}])
+
+    body = apply_operations(api, [{'type': 'create', 'todo': {'id': 'a', 'title': 'new'}}])
+    assert body['results'][0]['status'] == 201
+    _, sync, _ = api('GET', '/todos', query={'since': before['watermark']})
+    assert [todo['title'] for todo in sync['todos']] == ['new'] and sync['deleted'] == []
@@ -0,0 +1,57 @@
+import pytest
+
+import index
+
+
+@pytest.fixture
+def sharded(monkeypatch):
+    monkeypatch.setattr(index, 'SHARDED_USERS', frozenset({'hot-user'}))
+    monkeypatch.setattr(index, 'SHARD_COUNT', 3)
+
+
+def read_all_pages(api, user_id, limit, query=None, resource='/todos'):
+    ids = []
+    cursor = None
+    while True:
+        params = dict(query or {}, limit=str(limit))
+        if cursor:
+            params['cursor'] = cursor
+        status, body, _ = api('GET', resource, query=params, user_id=user_id)
+        assert status == 200, body
+        assert len(body['todos']) <= limit
+        ids.extend(todo['id'] for todo in body['todos'])
+        cursor = body['nextCursor']
+        if not cursor:
+            return ids
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_sharded_cursor_paging_returns_every_todo_once(api, table, sharded, cached):
+    todo_ids = [f'todo-{number:02d}' for number in range(25)]
+    for todo_id in todo_ids:
+        api('POST', '/todos', body={'id': todo_id, 'title': todo_id}, user_id='hot-user')
+    assert len({item['user_id'] for item in table.scan()['Items'] if item['id'] in todo_ids}) == 3
+    if cached:
+        api('GET', '/todos', user_id='hot-user')
+    else:
+        index.todo_list_cache.max_users = 0
+
+    assert read_all_pages(api, 'hot-user', 7) == sorted(todo_ids)
+
+
+def test_sharded_index_paging_merges_in_index_order(api, sharded):
+    for number in range(12):
+        api('POST', '/todos', body={'id': f'todo-{number:02d}', 'title': 't',
+                                    'dueDate': f'2026-01-{28 - number:02d}'}, user_id='hot-user')
+    index.todo_list_cache.max_users = 0
+
+    ids = read_all_pages(api, 'hot-user', 5, {'before': '2027-01-01'}, '/todos/due')
+    assert ids == [f'todo-{number:02d}' for number in reversed(range(12))]
+
+
+def test_cursor_of_another_user_is_rejected(api):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+    api('POST', '/todos', body={'id': 'b', 'title': 'b'})
+    _, body, _ = api('GET', '/todos', query={'limit': '1'})
+    status, _, _ = api('GET', '/todos', query={'limit': '1', 'cursor': body['nextCursor']}, user_id='user-2')
+    assert status == 400
@@ -0,0 +1,50 @@
+import random
+
+import index
+
+
+def test_key_between_orders_keys():
+    first = index.key_between(None, None)
+    assert index.key_between(None, first) < first < index.key_between(first, None)
+    lower, upper = 'a0', 'a1'
+    middle = index.key_between(lower, upper)
+    assert lower < middle < upper
+
+
+def test_key_between_keeps_random_insertions_sorted():
+    rng = random.Random(7)
+    keys = []
+    for _ in range(500):
+        position = rng.randint(0, len(keys))
+        lower = keys[position - 1] if position else None
+        upper = keys[position] if position < len(keys) else None
+        key = index.key_between(lower, upper)
+        assert (lower is None or lower < key) and (upper is None or key < upper)
+        keys.insert(position, key)
+    assert keys == sorted(keys) and len(set(keys)) == len(keys)
+
+
+def test_key_between_appends_stay_short():
+    key = None
+    for _ in range(1000):
+        key = index.key_between(key, None)
+    assert len(key) <= index.RANK_REBALANCE_LENGTH
+
+
+def test_move_places_todo_between_neighbours(api):
+    for name in ('a', 'b', 'c'):
+        api('POST', '/todos', body={'id': name, 'title': name})
+    status, _, _ = api('POST', '/todos/{id}/move', todo_id='c', body={'afterId': 'a', 'beforeId': 'b'})
+    assert status == 200
+    _, body, _ = api('GET', '/todos', query={'sort': 'rank'})
+    assert [todo['id'] for todo in body['todos']] == ['a', 'c', 'b']
+
+
+def test_rank_sort_with_fields_orders_unranked_todos(api, monkeypatch):
+    monkeypatch.setattr(index, 'RANK_INDEX', '')
+    index.todo_list_cache.max_users = 0
+    for name in ('b', 'a'):
+        api('POST', '/todos', body={'id': name, 'title': name})
+    status, body, _ = api('GET', '/todos', query={'sort': 'rank', 'fields': 'title'})
+    assert status == 200, body
+    assert body['todos'] == [{'id': 'b', 'title': 'b'}, {'id': 'a', 'title': 'a'}]
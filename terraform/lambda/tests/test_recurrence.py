@@ -0,0 +1,53 @@
+import pytest
+
+
+def window(api, start, end, **query):
+    status, body, _ = api('GET', '/todos', query=dict(query, **{'from': start, 'to': end}))
+    assert status == 200, body
+    return body
+
+
+def series(body, series_id):
+    return [todo for todo in body['todos'] if todo.get('seriesId') == series_id]
+
+
+@pytest.fixture
+def weekly(api):
+    status, _, _ = api('POST', '/todos', body={'id': 'weekly', 'title': 'report', 'dueDate': '2026-10-05',
+                                               'recurrence': 'FREQ=WEEKLY;BYDAY=MO'})
+    assert status == 201
+    api('POST', '/todos', body={'id': 'plain', 'title': 'plain'})
+
+
+def test_window_expands_occurrences(api, weekly):
+    body = window(api, '2026-10-01', '2026-10-31')
+    assert [todo['occurrence'] for todo in series(body, 'weekly')] == [
+        '2026-10-05', '2026-10-12', '2026-10-19', '2026-10-26']
+    assert 'plain' in [todo['id'] for todo in body['todos']]
+    assert 'weekly' not in [todo['id'] for todo in body['todos']]
+
+    _, listing, _ = api('GET', '/todos')
+    assert sorted(todo['id'] for todo in listing['todos']) == ['plain', 'weekly']
+
+
+def test_window_bounds_are_inclusive(api, weekly):
+    assert [todo['id'] for todo in series(window(api, '2026-10-12', '2026-10-12'), 'weekly')] == ['weekly#2026-10-12']
+    assert series(window(api, '2026-10-13', '2026-10-18'), 'weekly') == []
+
+
+def test_completed_occurrence_is_reported_in_windows(api, weekly):
+    status, body, _ = api('POST', '/todos/{id}/occurrences', todo_id='weekly', body={'occurrence': '2026-10-12'})
+    assert status == 200 and body['todo']['completed'] is True
+
+    body = window(api, '2026-10-01', '2026-10-31')
+    assert [todo['id'] for todo in series(body, 'weekly') if todo['completed']] == ['weekly#2026-10-12']
+
+    api('POST', '/todos/{id}/occurrences', todo_id='weekly', body={'occurrence': '2026-10-12', 'completed': False})
+    assert not any(todo['completed'] for todo in series(window(api, '2026-10-01', '2026-10-31'), 'weekly'))
+
+
+def test_invalid_rules_and_occurrences_are_rejected(api, weekly):
+    assert api('POST', '/todos', body={'title': 'x', 'recurrence': 'FREQ=HOURLY'})[0] == 400
+    assert api('POST', '/todos', body={'title': 'x', 'recurrence': 'bogus'})[0] == 400
+    assert api('POST', '/todos/{id}/occurrences', todo_id='weekly', body={'occurrence': '2026-10-13'})[0] == 400
+    assert api('GET', '/todos', query={'from': '2026-10-01', 'to': '2026-10-31', 'limit': '5'})[0] == 400
@@ -0,0 +1,74 @@
+import pytest
+
+import index
+from admin_scan import ReshardTodos
+from test_paging import read_all_pages
+
+
+@pytest.fixture
+def unsharded_todos(api):
+    todo_ids = [f'todo-{number:02d}' for number in range(8)]
+    for todo_id in todo_ids:
+        api('POST', '/todos', body={'id': todo_id, 'title': todo_id}, user_id='hot-user')
+    return todo_ids
+
+
+@pytest.fixture
+def resharding(monkeypatch, unsharded_todos):
+    monkeypatch.setattr(index, 'SHARDED_USERS', frozenset({'hot-user'}))
+    monkeypatch.setattr(index, 'SHARD_COUNT', 3)
+    monkeypatch.setattr(index, 'RESHARDING_USERS', frozenset({'hot-user'}))
+    index.todo_list_cache.max_users = 0
+
+
+def reshard(table):
+    transform = ReshardTodos(index)
+    for item in table.scan()['Items']:
+        transform(item)
+    return transform.moved
+
+
+def partitions_of(table, todo_id):
+    return [item['user_id'] for item in table.scan()['Items'] if item['id'] == todo_id]
+
+
+def test_unmoved_todos_are_read_and_written_in_place(api, table, unsharded_todos, resharding):
+    assert read_all_pages(api, 'hot-user', 3) == unsharded_todos
+
+    assert api('PUT', '/todos/{id}', todo_id='todo-01', body={'completed': True}, user_id='hot-user')[0] == 200
+    assert api('GET', '/todos/{id}', todo_id='todo-01', user_id='hot-user')[1]['todo']['completed'] is True
+    assert api('DELETE', '/todos/{id}', todo_id='todo-02', user_id='hot-user')[0] == 200
+    assert partitions_of(table, 'todo-01') == partitions_of(table, 'todo-02') == ['hot-user']
+    assert api('POST', '/todos', body={'id': 'todo-03', 'title': 'again'}, user_id='hot-user')[0] == 409
+
+    api('POST', '/todos', body={'id': 'new', 'title': 'new'}, user_id='hot-user')
+    assert partitions_of(table, 'new') == [index.todo_partition('hot-user', 'new')]
+    assert sorted(read_all_pages(api, 'hot-user', 3)) == sorted(set(unsharded_todos) - {'todo-02'} | {'new'})
+
+
+def test_reshard_moves_every_todo(api, table, unsharded_todos, resharding, monkeypatch):
+    api('DELETE', '/todos/{id}', todo_id='todo-02', user_id='hot-user')
+    assert reshard(table) == len(unsharded_todos)
+    assert not [item for item in table.scan()['Items'] if item['user_id'] == 'hot-user']
+
+    monkeypatch.setattr(index, 'RESHARDING_USERS', frozenset())
+    assert read_all_pages(api, 'hot-user', 3) == [todo_id for todo_id in unsharded_todos if todo_id != 'todo-02']
+    assert api('GET', '/todos/{id}', todo_id='todo-02', user_id='hot-user')[0] == 404
+
+
+def test_write_during_a_move_is_copied_again(api, table, resharding, monkeypatch):
+    put_item = table.put_item
+    raced = []
+
+    def put_then_race(**params):
+        put_item(**params)
+        if not raced and params['Item']['user_id'] != 'hot-user':
+            raced.append(params['Item']['id'])
+            api('PUT', '/todos/{id}', todo_id=params['Item']['id'], body={'title': 'edited'}, user_id='hot-user')
+
+    monkeypatch.setattr(table, 'put_item', put_then_race)
+    reshard(table)
+
+    todo_id, = raced
+    assert partitions_of(table, todo_id) == [index.todo_partition('hot-user', todo_id)]
+    assert api('GET', '/todos/{id}', todo_id=todo_id, user_id='hot-user')[1]['todo']['title'] == 'edited'
@@ -0,0 +1,75 @@
+import pytest
+
+import index
+
+
+@pytest.fixture
+def uncached():
+    index.todo_list_cache.max_users = 0
+
+
+def search(api, q):
+    status, body, _ = api('GET', '/todos/search', query={'q': q})
+    assert status == 200, body
+    return [todo['id'] for todo in body['todos']]
+
+
+def postings(table, user_id='user-1'):
+    return sorted(item['id'] for item in table.scan()['Items'] if item['user_id'] == user_id + index.SEARCH_USER_SUFFIX)
+
+
+def test_postings_follow_writes(api, table, uncached):
+    api('POST', '/todos', body={'id': 'a', 'title': 'Buy milk', 'description': 'oat'})
+    assert postings(table) == ['buy#a', 'milk#a', 'oat#a']
+
+    api('PUT', '/todos/{id}', todo_id='a', body={'title': 'Buy bread'})
+    assert postings(table) == ['bread#a', 'buy#a', 'oat#a']
+    assert search(api, 'milk') == [] and search(api, 'bre') == ['a']
+
+    api('DELETE', '/todos/{id}', todo_id='a')
+    assert postings(table) == [] and search(api, 'buy') == []
+
+
+def test_batch_and_ops_writes_maintain_postings(api, table, uncached):
+    api('POST', '/todos/batch', body={'operations': [
+        {'type': 'create', 'todo': {'id': 'a', 'title': 'alpha'}},
+        {'type': 'create', 'todo': {'id': 'b', 'title': 'beta'}}]})
+    api('POST', '/todos/ops', body={'operations': [
+        {'type': 'update', 'id': 'a', 'todo': {'title': 'gamma'}},
+        {'type': 'create', 'todo': {'id': 'c', 'title': 'delta'}}]})
+    api('POST', '/todos/batch', body={'operations': [{'type': 'delete', 'id': 'b'}]})
+    assert postings(table) == ['delta#c', 'gamma#a']
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_ranking_and_prefix_matching(api, cached):
+    api('POST', '/todos', body={'id': 'title', 'title': 'report', 'description': 'quarterly'})
+    api('POST', '/todos', body={'id': 'description', 'title': 'call', 'description': 'report numbers'})
+    api('POST', '/todos', body={'id': 'prefix', 'title': 'reporting'})
+    if cached:
+        api('GET', '/todos')
+    else:
+        index.todo_list_cache.max_users = 0
+
+    assert search(api, 'report') == ['title', 'prefix', 'description']
+    assert search(api, 'rep qua') == ['title']
+    assert search(api, 'Report, NUMBERS!') == ['description']
+
+
+def test_todos_without_postings_are_indexed_on_first_search(api, table, uncached):
+    table.put_item(Item={'user_id': 'user-1', 'id': 'old', 'task': 'legacy task', 'completed': False,
+                         'updated_at': '2020-01-01T00:00:00'})
+    assert search(api, 'legacy') == ['old']
+    assert postings(table) == ['legacy#old', 'task#old']
+
+
+def test_stale_postings_are_dropped(api, table, uncached):
+    api('POST', '/todos', body={'id': 'a', 'title': 'apples'})
+    table.put_item(Item={'user_id': 'user-1' + index.SEARCH_USER_SUFFIX, 'id': 'pears#a', 'weight': 3})
+    assert search(api, 'pears') == []
+    assert postings(table) == ['apples#a']
+
+
+def test_short_queries_are_rejected(api):
+    assert api('GET', '/todos/search', query={'q': 'a'})[0] == 400
+    assert api('GET', '/todos/search')[0] == 400
@@ -0,0 +1,75 @@
+import index
+
+
+def test_stats_deltas_of_create_update_and_delete():
+    todo = {'id': 'a', 'category': 'work', 'completed': False, 'due_date': '2026-01-02'}
+    assert index.stats_deltas(None, todo) == {'total': 1, 'category:work': 1, 'open_due:2026-01-02': 1}
+    assert index.stats_deltas(todo, None) == {'total': -1, 'category:work': -1, 'open_due:2026-01-02': -1}
+
+    completed = dict(todo, completed=True, category='home')
+    assert index.stats_deltas(todo, completed) == {
+        'completed': 1, 'category:home': 1, 'category:work': -1, 'open_due:2026-01-02': -1}
+
+
+def test_stats_deltas_ignore_unchanged_and_deleted_items():
+    todo = {'id': 'a', 'category': 'work', 'completed': True}
+    assert index.stats_deltas(todo, dict(todo, task='renamed')) == {}
+    assert index.stats_deltas({'id': 'a', 'deleted': True}, None) == {}
+
+
+def test_counters_match_a_recount(api):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a', 'category': 'work', 'dueDate': '2000-01-01'})
+    api('POST', '/todos', body={'id': 'b', 'title': 'b', 'category': 'home'})
+    api('POST', '/todos', body={'id': 'c', 'title': 'c', 'dueDate': '2999-01-01'})
+    api('PUT', '/todos/{id}', todo_id='b', body={'completed': True})
+    api('DELETE', '/todos/{id}', todo_id='c')
+
+    _, counted, _ = api('GET', '/todos/stats')
+    _, recounted, _ = api('GET', '/todos/stats', query={'repair': 'true'})
+    assert counted == recounted
+    assert counted['stats']['total'] == 2
+    assert counted['stats']['completed'] == 1
+    assert counted['stats']['overdue'] == 1
+
+
+def stored_counters(table, user_id='user-1'):
+    item = table.get_item(Key={'user_id': user_id + index.META_USER_SUFFIX, 'id': index.STATS_ITEM_ID})['Item']
+    return {name: count for name, count in item.items() if ':' in name}
+
+
+def test_due_date_counters_are_removed_when_they_reach_zero(api, table):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a', 'dueDate': '2026-01-01'})
+    api('POST', '/todos', body={'id': 'b', 'title': 'b', 'dueDate': '2026-01-01'})
+    api('PUT', '/todos/{id}', todo_id='a', body={'dueDate': '2026-01-02'})
+    assert stored_counters(table) == {'category:other': 2, 'open_due:2026-01-01': 1, 'open_due:2026-01-02': 1}
+
+    api('PUT', '/todos/{id}', todo_id='a', body={'completed': True})
+    api('DELETE', '/todos/{id}', todo_id='b')
+    assert stored_counters(table) == {'category:other': 1}
+
+
+def test_stats_read_removes_leftover_zero_counters(api, table):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a', 'category': 'work'})
+    table.update_item(Key={'user_id': 'user-1' + index.META_USER_SUFFIX, 'id': index.STATS_ITEM_ID},
+                      UpdateExpression='SET #old = :zero, #home = :zero',
+                      ExpressionAttributeNames={'#old': 'open_due:2020-01-01', '#home': 'category:home'},
+                      ExpressionAttributeValues={':zero': 0})
+
+    _, body, _ = api('GET', '/todos/stats')
+    assert body['stats']['byCategory'] == {'work': 1}
+    assert stored_counters(table) == {'category:work': 1}
+
+
+def test_repair_that_keeps_losing_races_logs_and_keeps_the_item(api, table, monkeypatch, capsys):
+    api('POST', '/todos', body={'id': 'a', 'title': 'a'})
+    original_query = index.query_todo_pages
+
+    def racing_query(user_id, query_params, limit=None):
+        index.transact_write([index.stats_update(user_id, {'total': 0, 'category:race': 1})])
+        return original_query(user_id, query_params, limit)
+
+    monkeypatch.setattr(index, 'query_todo_pages', racing_query)
+    stats_item = index.repair_todo_stats('user-1')
+    assert stats_item['total'] == 1
+    assert 'writes raced all' in capsys.readouterr().out
+    assert stored_counters(table)['category:race'] == index.WRITE_CONFLICT_RETRIES
@@ -42,12 +42,125 @@ resource "aws_dynamodb_table" "todos" {
     type = "S"
   }
 
+  attribute {
+    name = "updated_at"
+    type = "S"
+  }
+
+  attribute {
+    name = "category"
+    type = "S"
+  }
+
+  attribute {
+    name = "due_date"
+    type = "S"
+  }
+
+  attribute {
+    name = "open_due_date"
+    type = "S"
+  }
+
+  dynamic "attribute" {
+    for_each = var.dynamodb_rank_index ? ["rank"] : []
+    content {
+      name = attribute.value
+      type = "S"
+    }
+  }
+
+  # Delta sync: changes (including delete tombstones) per user in update order.
+  # Sparse, so bookkeeping items without updated_at are never projected.
+  global_secondary_index {
+    name            = "user-updated-at-index"
+    hash_key        = "user_id"
+    range_key       = "updated_at"
+    projection_type = "ALL"
+  }
+
+  # Filtered GET /todos: one category, or todos due before a date. Tombstones
+  # carry neither attribute, so both indexes only hold live todos.
+  global_secondary_index {
+    name            = "user-category-index"
+    hash_key        = "user_id"
+    range_key       = "category"
+    projection_type = "ALL"
+  }
+
+  global_secondary_index {
+    name            = "user-due-date-index"
+    hash_key        = "user_id"
+    range_key       = "due_date"
+    projection_type = "ALL"
+  }
+
+  # GET /todos/due: only incomplete todos carry open_due_date, so completing
+  # a todo drops it from this index. Existing todos need
+  # admin_scan.py --transform backfill-open-due once after it is created.
+  global_secondary_index {
+    name            = "user-open-due-index"
+    hash_key        = "user_id"
+    range_key       = "open_due_date"
+    projection_type = "ALL"
+  }
+
+  # Manual ordering: todos by their fractional rank key (GET /todos?sort=rank).
+  # A local index can only be created together with the table, so turning it
+  # on replaces an existing table; export its items first and write them
+  # back, then rank them with admin_scan.py --transform rebalance-ranks. It
+  # also caps each user's (or shard's) items at 10 GB.
+  dynamic "local_secondary_index" {
+    for_each = var.dynamodb_rank_index ? ["user-rank-index"] : []
+    content {
+      name            = local_secondary_index.value
+      range_key       = "rank"
+      projection_type = "ALL"
+    }
+  }
+
+  # Delete and archive tombstones and Idempotency-Key records carry an
+  # expiry and are removed by DynamoDB TTL
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
   tags = {
     Name        = "TodosTable"
     Environment = var.environment
   }
 }
 
+# Cold storage for archived todos: gzipped NDJSON objects per user, written
+# by admin_scan.py --transform archive and read for ?includeArchived=true
+resource "aws_s3_bucket" "todo_archive" {
+  bucket = "${var.project_name}-todo-archive-${random_string.bucket_suffix.result}"
+
+  tags = merge(var.common_tags, {
+    Name = "TodoArchiveBucket"
+  })
+}
+
+resource "aws_s3_bucket_public_access_block" "todo_archive_pab" {
+  bucket = aws_s3_bucket.todo_archive.id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+resource "aws_s3_bucket_server_side_encryption_configuration" "todo_archive_sse" {
+  bucket = aws_s3_bucket.todo_archive.id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
 # Cognito User Pool is defined in cognito-enhanced.tf (using flowless configuration)
 
 # Cognito User Pool Client is defined in cognito-enhanced.tf (using flowless configuration)
@@ -108,9 +221,25 @@ resource "aws_iam_policy" "lambda_policy" {
           "dynamodb:UpdateItem",
           "dynamodb:DeleteItem",
           "dynamodb:Query",
-          "dynamodb:Scan"
+          "dynamodb:Scan",
+          "dynamodb:BatchWriteItem",
+          "dynamodb:BatchGetItem",
+          "dynamodb:ConditionCheckItem"
+        ]
+        Resource = [
+          aws_dynamodb_table.todos.arn,
+          "${aws_dynamodb_table.todos.arn}/index/*"
         ]
-        Resource = aws_dynamodb_table.todos.arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["s3:ListBucket"]
+        Resource = aws_s3_bucket.todo_archive.arn
+      },
+      {
+        Effect   = "Allow"
+        Action   = ["s3:GetObject"]
+        Resource = "${aws_s3_bucket.todo_archive.arn}/*"
       }
     ]
   })
@@ -131,10 +260,33 @@ resource "aws_lambda_function" "todos_handler" {
   source_code_hash = data.archive_file.lambda_zip.output_base64sha256
   runtime         = "python3.11"
   timeout         = 30
+  # Warm containers keep todo lists in memory (TODOS_CACHE_MAX_TODOS)
+  memory_size     = var.lambda_memory_size
 
   environment {
     variables = {
-      DYNAMODB_TABLE = aws_dynamodb_table.todos.name
+      DYNAMODB_TABLE       = aws_dynamodb_table.todos.name
+      TODOS_GZIP_MIN_BYTES = var.response_compression_min_bytes
+      TODOS_GZIP_LEVEL     = var.response_compression_level
+      TODOS_DATA_ACCESS    = var.dynamodb_data_access_mode
+      TODOS_COMPACT_SCHEMA = var.dynamodb_compact_schema
+      TODOS_RANK_INDEX     = var.dynamodb_rank_index ? "user-rank-index" : ""
+      TODOS_OPEN_DUE_INDEX = var.dynamodb_open_due_index_enabled ? "user-open-due-index" : ""
+
+      TODOS_SHARDED_USERS    = join(",", var.dynamodb_sharded_users)
+      TODOS_SHARD_COUNT      = var.dynamodb_shard_count
+      TODOS_RESHARDING_USERS = join(",", var.dynamodb_resharding_users)
+
+      TODOS_ARCHIVE_BUCKET     = aws_s3_bucket.todo_archive.bucket
+      TODOS_ARCHIVE_AFTER_DAYS = var.todo_archive_after_days
+
+      TODOS_CACHE_MAX_USERS   = var.todo_list_cache_max_users
+      TODOS_CACHE_MAX_TODOS   = var.todo_list_cache_max_todos
+      TODOS_CACHE_TTL_SECONDS = var.todo_list_cache_ttl_seconds
+
+      TODOS_IDEMPOTENCY_TTL_HOURS = var.idempotency_key_ttl_hours
+
+      TODOS_METRICS_NAMESPACE = var.custom_metrics_namespace
     }
   }
 
@@ -158,6 +310,9 @@ resource "aws_api_gateway_rest_api" "todos_api" {
   name        = "${var.project_name}-api"
   description = "API for Todo application"
 
+  # Lets Lambda return gzip-compressed (base64-encoded) bodies
+  binary_media_types = ["*/*"]
+
   tags = {
     Name        = "TodoAPI"
     Environment = var.environment
@@ -180,6 +335,62 @@ resource "aws_api_gateway_resource" "todo_item_resource" {
   path_part   = "{id}"
 }
 
+# API Gateway Resource - /todos/batch
+resource "aws_api_gateway_resource" "todos_batch_resource" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  parent_id   = aws_api_gateway_resource.todos_resource.id
+  path_part   = "batch"
+}
+
+# API Gateway Resource - /todos/stats
+resource "aws_api_gateway_resource" "todos_stats_resource" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  parent_id   = aws_api_gateway_resource.todos_resource.id
+  path_part   = "stats"
+}
+
+# API Gateway Resource - /todos/search
+resource "aws_api_gateway_resource" "todos_search_resource" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  parent_id   = aws_api_gateway_resource.todos_resource.id
+  path_part   = "search"
+}
+
+# API Gateway Resource - /todos/export
+resource "aws_api_gateway_resource" "todos_export_resource" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  parent_id   = aws_api_gateway_resource.todos_resource.id
+  path_part   = "export"
+}
+
+# API Gateway Resource - /todos/ops
+resource "aws_api_gateway_resource" "todos_ops_resource" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  parent_id   = aws_api_gateway_resource.todos_resource.id
+  path_part   = "ops"
+}
+
+# API Gateway Resource - /todos/{id}/move
+resource "aws_api_gateway_resource" "todo_move_resource" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  parent_id   = aws_api_gateway_resource.todo_item_resource.id
+  path_part   = "move"
+}
+
+# API Gateway Resource - /todos/{id}/occurrences
+resource "aws_api_gateway_resource" "todo_occurrences_resource" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  parent_id   = aws_api_gateway_resource.todo_item_resource.id
+  path_part   = "occurrences"
+}
+
+# API Gateway Resource - /todos/due
+resource "aws_api_gateway_resource" "todos_due_resource" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  parent_id   = aws_api_gateway_resource.todos_resource.id
+  path_part   = "due"
+}
+
 # API Gateway Method - GET /todos
 resource "aws_api_gateway_method" "get_todos" {
   rest_api_id   = aws_api_gateway_rest_api.todos_api.id
@@ -216,6 +427,78 @@ resource "aws_api_gateway_method" "delete_todo" {
   authorizer_id = aws_api_gateway_authorizer.cognito_authorizer.id
 }
 
+# API Gateway Method - POST /todos/batch
+resource "aws_api_gateway_method" "post_todos_batch" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_batch_resource.id
+  http_method   = "POST"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito_authorizer.id
+}
+
+# API Gateway Method - GET /todos/stats
+resource "aws_api_gateway_method" "get_todos_stats" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_stats_resource.id
+  http_method   = "GET"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito_authorizer.id
+}
+
+# API Gateway Method - GET /todos/search
+resource "aws_api_gateway_method" "get_todos_search" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_search_resource.id
+  http_method   = "GET"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito_authorizer.id
+}
+
+# API Gateway Method - GET /todos/export
+resource "aws_api_gateway_method" "get_todos_export" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_export_resource.id
+  http_method   = "GET"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito_authorizer.id
+}
+
+# API Gateway Method - POST /todos/ops
+resource "aws_api_gateway_method" "post_todos_ops" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_ops_resource.id
+  http_method   = "POST"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito_authorizer.id
+}
+
+# API Gateway Method - POST /todos/{id}/move
+resource "aws_api_gateway_method" "post_todo_move" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todo_move_resource.id
+  http_method   = "POST"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito_authorizer.id
+}
+
+# API Gateway Method - POST /todos/{id}/occurrences
+resource "aws_api_gateway_method" "post_todo_occurrences" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todo_occurrences_resource.id
+  http_method   = "POST"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito_authorizer.id
+}
+
+# API Gateway Method - GET /todos/due
+resource "aws_api_gateway_method" "get_todos_due" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_due_resource.id
+  http_method   = "GET"
+  authorization = "COGNITO_USER_POOLS"
+  authorizer_id = aws_api_gateway_authorizer.cognito_authorizer.id
+}
+
 # API Gateway Integration - GET /todos
 resource "aws_api_gateway_integration" "get_todos_integration" {
   rest_api_id = aws_api_gateway_rest_api.todos_api.id
@@ -260,6 +543,94 @@ resource "aws_api_gateway_integration" "delete_todo_integration" {
   uri                    = aws_lambda_function.todos_handler.invoke_arn
 }
 
+# API Gateway Integration - POST /todos/batch
+resource "aws_api_gateway_integration" "post_todos_batch_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_batch_resource.id
+  http_method = aws_api_gateway_method.post_todos_batch.http_method
+
+  integration_http_method = "POST"
+  type                   = "AWS_PROXY"
+  uri                    = aws_lambda_function.todos_handler.invoke_arn
+}
+
+# API Gateway Integration - GET /todos/stats
+resource "aws_api_gateway_integration" "get_todos_stats_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_stats_resource.id
+  http_method = aws_api_gateway_method.get_todos_stats.http_method
+
+  integration_http_method = "POST"
+  type                   = "AWS_PROXY"
+  uri                    = aws_lambda_function.todos_handler.invoke_arn
+}
+
+# API Gateway Integration - GET /todos/search
+resource "aws_api_gateway_integration" "get_todos_search_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_search_resource.id
+  http_method = aws_api_gateway_method.get_todos_search.http_method
+
+  integration_http_method = "POST"
+  type                   = "AWS_PROXY"
+  uri                    = aws_lambda_function.todos_handler.invoke_arn
+}
+
+# API Gateway Integration - GET /todos/export
+resource "aws_api_gateway_integration" "get_todos_export_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_export_resource.id
+  http_method = aws_api_gateway_method.get_todos_export.http_method
+
+  integration_http_method = "POST"
+  type                   = "AWS_PROXY"
+  uri                    = aws_lambda_function.todos_handler.invoke_arn
+}
+
+# API Gateway Integration - POST /todos/ops
+resource "aws_api_gateway_integration" "post_todos_ops_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_ops_resource.id
+  http_method = aws_api_gateway_method.post_todos_ops.http_method
+
+  integration_http_method = "POST"
+  type                   = "AWS_PROXY"
+  uri                    = aws_lambda_function.todos_handler.invoke_arn
+}
+
+# API Gateway Integration - POST /todos/{id}/move
+resource "aws_api_gateway_integration" "post_todo_move_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todo_move_resource.id
+  http_method = aws_api_gateway_method.post_todo_move.http_method
+
+  integration_http_method = "POST"
+  type                   = "AWS_PROXY"
+  uri                    = aws_lambda_function.todos_handler.invoke_arn
+}
+
+# API Gateway Integration - POST /todos/{id}/occurrences
+resource "aws_api_gateway_integration" "post_todo_occurrences_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todo_occurrences_resource.id
+  http_method = aws_api_gateway_method.post_todo_occurrences.http_method
+
+  integration_http_method = "POST"
+  type                   = "AWS_PROXY"
+  uri                    = aws_lambda_function.todos_handler.invoke_arn
+}
+
+# API Gateway Integration - GET /todos/due
+resource "aws_api_gateway_integration" "get_todos_due_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_due_resource.id
+  http_method = aws_api_gateway_method.get_todos_due.http_method
+
+  integration_http_method = "POST"
+  type                   = "AWS_PROXY"
+  uri                    = aws_lambda_function.todos_handler.invoke_arn
+}
+
 # CORS Configuration for /todos
 resource "aws_api_gateway_method" "options_todos" {
   rest_api_id   = aws_api_gateway_rest_api.todos_api.id
@@ -274,6 +645,9 @@ resource "aws_api_gateway_integration" "options_todos_integration" {
   http_method = aws_api_gateway_method.options_todos.http_method
   type        = "MOCK"
 
+  # Keep the mock template working now that */* is a binary media type
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = jsonencode({
       statusCode = 200
@@ -301,7 +675,7 @@ resource "aws_api_gateway_integration_response" "options_todos_integration_respo
   status_code = "200"
 
   response_parameters = {
-    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match,Idempotency-Key'"
     "method.response.header.Access-Control-Allow-Methods" = "'GET,POST,OPTIONS'"
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
   }
@@ -323,6 +697,9 @@ resource "aws_api_gateway_integration" "options_todo_item_integration" {
   http_method = aws_api_gateway_method.options_todo_item.http_method
   type        = "MOCK"
 
+  # Keep the mock template working now that */* is a binary media type
+  content_handling = "CONVERT_TO_TEXT"
+
   request_templates = {
     "application/json" = jsonencode({
       statusCode = 200
@@ -350,7 +727,7 @@ resource "aws_api_gateway_integration_response" "options_todo_item_integration_r
   status_code = "200"
 
   response_parameters = {
-    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match'"
     "method.response.header.Access-Control-Allow-Methods" = "'PUT,DELETE,OPTIONS'"
     "method.response.header.Access-Control-Allow-Origin"  = "'*'"
   }
@@ -358,6 +735,422 @@ resource "aws_api_gateway_integration_response" "options_todo_item_integration_r
   depends_on = [aws_api_gateway_integration.options_todo_item_integration]
 }
 
+# CORS Configuration for /todos/batch
+resource "aws_api_gateway_method" "options_todos_batch" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_batch_resource.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_todos_batch_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_batch_resource.id
+  http_method = aws_api_gateway_method.options_todos_batch.http_method
+  type        = "MOCK"
+
+  # Keep the mock template working now that */* is a binary media type
+  content_handling = "CONVERT_TO_TEXT"
+
+  request_templates = {
+    "application/json" = jsonencode({
+      statusCode = 200
+    })
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_todos_batch_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_batch_resource.id
+  http_method = aws_api_gateway_method.options_todos_batch.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_todos_batch_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_batch_resource.id
+  http_method = aws_api_gateway_method.options_todos_batch.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,Idempotency-Key'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.options_todos_batch_integration]
+}
+
+# CORS Configuration for /todos/stats
+resource "aws_api_gateway_method" "options_todos_stats" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_stats_resource.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_todos_stats_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_stats_resource.id
+  http_method = aws_api_gateway_method.options_todos_stats.http_method
+  type        = "MOCK"
+
+  # Keep the mock template working now that */* is a binary media type
+  content_handling = "CONVERT_TO_TEXT"
+
+  request_templates = {
+    "application/json" = jsonencode({
+      statusCode = 200
+    })
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_todos_stats_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_stats_resource.id
+  http_method = aws_api_gateway_method.options_todos_stats.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_todos_stats_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_stats_resource.id
+  http_method = aws_api_gateway_method.options_todos_stats.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.options_todos_stats_integration]
+}
+
+# CORS Configuration for /todos/search
+resource "aws_api_gateway_method" "options_todos_search" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_search_resource.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_todos_search_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_search_resource.id
+  http_method = aws_api_gateway_method.options_todos_search.http_method
+  type        = "MOCK"
+
+  # Keep the mock template working now that */* is a binary media type
+  content_handling = "CONVERT_TO_TEXT"
+
+  request_templates = {
+    "application/json" = jsonencode({
+      statusCode = 200
+    })
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_todos_search_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_search_resource.id
+  http_method = aws_api_gateway_method.options_todos_search.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_todos_search_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_search_resource.id
+  http_method = aws_api_gateway_method.options_todos_search.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.options_todos_search_integration]
+}
+
+# CORS Configuration for /todos/export
+resource "aws_api_gateway_method" "options_todos_export" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_export_resource.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_todos_export_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_export_resource.id
+  http_method = aws_api_gateway_method.options_todos_export.http_method
+  type        = "MOCK"
+
+  # Keep the mock template working now that */* is a binary media type
+  content_handling = "CONVERT_TO_TEXT"
+
+  request_templates = {
+    "application/json" = jsonencode({
+      statusCode = 200
+    })
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_todos_export_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_export_resource.id
+  http_method = aws_api_gateway_method.options_todos_export.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_todos_export_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_export_resource.id
+  http_method = aws_api_gateway_method.options_todos_export.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.options_todos_export_integration]
+}
+
+# CORS Configuration for /todos/ops
+resource "aws_api_gateway_method" "options_todos_ops" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_ops_resource.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_todos_ops_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_ops_resource.id
+  http_method = aws_api_gateway_method.options_todos_ops.http_method
+  type        = "MOCK"
+
+  # Keep the mock template working now that */* is a binary media type
+  content_handling = "CONVERT_TO_TEXT"
+
+  request_templates = {
+    "application/json" = jsonencode({
+      statusCode = 200
+    })
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_todos_ops_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_ops_resource.id
+  http_method = aws_api_gateway_method.options_todos_ops.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_todos_ops_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_ops_resource.id
+  http_method = aws_api_gateway_method.options_todos_ops.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.options_todos_ops_integration]
+}
+
+# CORS Configuration for /todos/{id}/move
+resource "aws_api_gateway_method" "options_todo_move" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todo_move_resource.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_todo_move_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todo_move_resource.id
+  http_method = aws_api_gateway_method.options_todo_move.http_method
+  type        = "MOCK"
+
+  # Keep the mock template working now that */* is a binary media type
+  content_handling = "CONVERT_TO_TEXT"
+
+  request_templates = {
+    "application/json" = jsonencode({
+      statusCode = 200
+    })
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_todo_move_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todo_move_resource.id
+  http_method = aws_api_gateway_method.options_todo_move.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_todo_move_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todo_move_resource.id
+  http_method = aws_api_gateway_method.options_todo_move.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.options_todo_move_integration]
+}
+
+# CORS Configuration for /todos/{id}/occurrences
+resource "aws_api_gateway_method" "options_todo_occurrences" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todo_occurrences_resource.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_todo_occurrences_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todo_occurrences_resource.id
+  http_method = aws_api_gateway_method.options_todo_occurrences.http_method
+  type        = "MOCK"
+
+  # Keep the mock template working now that */* is a binary media type
+  content_handling = "CONVERT_TO_TEXT"
+
+  request_templates = {
+    "application/json" = jsonencode({
+      statusCode = 200
+    })
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_todo_occurrences_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todo_occurrences_resource.id
+  http_method = aws_api_gateway_method.options_todo_occurrences.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_todo_occurrences_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todo_occurrences_resource.id
+  http_method = aws_api_gateway_method.options_todo_occurrences.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token'"
+    "method.response.header.Access-Control-Allow-Methods" = "'POST,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.options_todo_occurrences_integration]
+}
+
+# CORS Configuration for /todos/due
+resource "aws_api_gateway_method" "options_todos_due" {
+  rest_api_id   = aws_api_gateway_rest_api.todos_api.id
+  resource_id   = aws_api_gateway_resource.todos_due_resource.id
+  http_method   = "OPTIONS"
+  authorization = "NONE"
+}
+
+resource "aws_api_gateway_integration" "options_todos_due_integration" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_due_resource.id
+  http_method = aws_api_gateway_method.options_todos_due.http_method
+  type        = "MOCK"
+
+  # Keep the mock template working now that */* is a binary media type
+  content_handling = "CONVERT_TO_TEXT"
+
+  request_templates = {
+    "application/json" = jsonencode({
+      statusCode = 200
+    })
+  }
+}
+
+resource "aws_api_gateway_method_response" "options_todos_due_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_due_resource.id
+  http_method = aws_api_gateway_method.options_todos_due.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = true
+    "method.response.header.Access-Control-Allow-Methods" = true
+    "method.response.header.Access-Control-Allow-Origin"  = true
+  }
+}
+
+resource "aws_api_gateway_integration_response" "options_todos_due_integration_response" {
+  rest_api_id = aws_api_gateway_rest_api.todos_api.id
+  resource_id = aws_api_gateway_resource.todos_due_resource.id
+  http_method = aws_api_gateway_method.options_todos_due.http_method
+  status_code = "200"
+
+  response_parameters = {
+    "method.response.header.Access-Control-Allow-Headers" = "'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match'"
+    "method.response.header.Access-Control-Allow-Methods" = "'GET,OPTIONS'"
+    "method.response.header.Access-Control-Allow-Origin"  = "'*'"
+  }
+
+  depends_on = [aws_api_gateway_integration.options_todos_due_integration]
+}
+
 # Lambda permissions for API Gateway
 resource "aws_lambda_permission" "allow_api_gateway" {
   statement_id  = "AllowExecutionFromAPIGateway"
@@ -374,8 +1167,18 @@ resource "aws_api_gateway_deployment" "todos_deployment" {
     aws_api_gateway_integration.post_todos_integration,
     aws_api_gateway_integration.put_todo_integration,
     aws_api_gateway_integration.delete_todo_integration,
+    aws_api_gateway_integration.post_todos_batch_integration,
+    aws_api_gateway_integration.get_todos_stats_integration,
     aws_api_gateway_integration.options_todos_integration,
     aws_api_gateway_integration.options_todo_item_integration,
+    aws_api_gateway_integration.options_todos_batch_integration,
+    aws_api_gateway_integration.options_todos_stats_integration,
+    aws_api_gateway_integration.options_todos_search_integration,
+    aws_api_gateway_integration.options_todos_export_integration,
+    aws_api_gateway_integration.options_todos_ops_integration,
+    aws_api_gateway_integration.options_todo_move_integration,
+    aws_api_gateway_integration.options_todo_occurrences_integration,
+    aws_api_gateway_integration.options_todos_due_integration,
     aws_api_gateway_integration.ai_extract_integration,
     aws_api_gateway_integration.ai_extract_options_integration,
   ]
@@ -386,17 +1189,41 @@ resource "aws_api_gateway_deployment" "todos_deployment" {
     redeployment = sha1(jsonencode([
       aws_api_gateway_resource.todos_resource.id,
       aws_api_gateway_resource.todo_item_resource.id,
+      aws_api_gateway_resource.todos_batch_resource.id,
+      aws_api_gateway_resource.todos_stats_resource.id,
+      aws_api_gateway_resource.todos_search_resource.id,
+      aws_api_gateway_resource.todos_export_resource.id,
+      aws_api_gateway_resource.todos_ops_resource.id,
+      aws_api_gateway_resource.todo_move_resource.id,
+      aws_api_gateway_resource.todo_occurrences_resource.id,
+      aws_api_gateway_resource.todos_due_resource.id,
       aws_api_gateway_resource.ai_extract_resource.id,
       aws_api_gateway_method.get_todos.id,
       aws_api_gateway_method.post_todos.id,
       aws_api_gateway_method.put_todo.id,
       aws_api_gateway_method.delete_todo.id,
+      aws_api_gateway_method.post_todos_batch.id,
+      aws_api_gateway_method.get_todos_stats.id,
+      aws_api_gateway_method.get_todos_search.id,
+      aws_api_gateway_method.get_todos_export.id,
+      aws_api_gateway_method.post_todos_ops.id,
+      aws_api_gateway_method.post_todo_move.id,
+      aws_api_gateway_method.post_todo_occurrences.id,
+      aws_api_gateway_method.get_todos_due.id,
       aws_api_gateway_method.ai_extract_post.id,
       aws_api_gateway_method.ai_extract_options.id,
       aws_api_gateway_integration.get_todos_integration.id,
       aws_api_gateway_integration.post_todos_integration.id,
       aws_api_gateway_integration.put_todo_integration.id,
       aws_api_gateway_integration.delete_todo_integration.id,
+      aws_api_gateway_integration.post_todos_batch_integration.id,
+      aws_api_gateway_integration.get_todos_stats_integration.id,
+      aws_api_gateway_integration.get_todos_search_integration.id,
+      aws_api_gateway_integration.get_todos_export_integration.id,
+      aws_api_gateway_integration.post_todos_ops_integration.id,
+      aws_api_gateway_integration.post_todo_move_integration.id,
+      aws_api_gateway_integration.post_todo_occurrences_integration.id,
+      aws_api_gateway_integration.get_todos_due_integration.id,
       aws_api_gateway_integration.ai_extract_integration.id,
       aws_api_gateway_integration.ai_extract_options_integration.id,
     ]))
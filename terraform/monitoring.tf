@@ -89,6 +89,30 @@ resource "aws_cloudwatch_dashboard" "todo_app_dashboard" {
           title   = "Cognito Authentication Metrics"
           period  = 300
         }
+      },
+      {
+        type   = "metric"
+        x      = 0
+        y      = 24
+        width  = 12
+        height = 6
+
+        properties = {
+          metrics = [
+            [var.custom_metrics_namespace, "ParseLatency", "Route", "GET /todos"],
+            [".", "DynamoDBLatency", ".", "."],
+            [".", "FormatLatency", ".", "."],
+            [".", "SerializeLatency", ".", "."],
+            [".", "CompressLatency", ".", "."],
+            [".", "TotalLatency", ".", "."]
+          ]
+          view    = "timeSeries"
+          stacked = false
+          region  = var.aws_region
+          stat    = "p95"
+          title   = "GET /todos Latency by Phase (p95)"
+          period  = 300
+        }
       }
     ]
   })
@@ -30,6 +30,11 @@ output "dynamodb_table_arn" {
   value       = aws_dynamodb_table.todos.arn
 }
 
+output "todo_archive_bucket_name" {
+  description = "S3 bucket holding archived todos (TODOS_ARCHIVE_BUCKET for admin_scan.py)"
+  value       = aws_s3_bucket.todo_archive.bucket
+}
+
 output "lambda_function_name" {
   description = "Name of the Lambda function"
   value       = aws_lambda_function.todos_handler.function_name
@@ -78,6 +78,53 @@ variable "lambda_timeout" {
   }
 }
 
+variable "response_compression_min_bytes" {
+  description = "Minimum response body size in bytes before the todos API gzips it"
+  type        = number
+  default     = 4096
+}
+
+variable "response_compression_level" {
+  description = "gzip compression level (1-9) for todos API responses"
+  type        = number
+  default     = 5
+  
+  validation {
+    condition     = var.response_compression_level >= 1 && var.response_compression_level <= 9
+    error_message = "Compression level must be between 1 and 9."
+  }
+}
+
+variable "todo_list_cache_max_users" {
+  description = "Users whose todo lists each warm Lambda container keeps in memory (0 disables the cache)"
+  type        = number
+  default     = 256
+}
+
+variable "todo_list_cache_max_todos" {
+  description = "Todos, across all cached lists, each warm Lambda container keeps in memory; raise together with lambda_memory_size"
+  type        = number
+  default     = 20000
+}
+
+variable "todo_list_cache_ttl_seconds" {
+  description = "Seconds a cached todo list may be served before it is re-read"
+  type        = number
+  default     = 60
+}
+
+variable "idempotency_key_ttl_hours" {
+  description = "Hours a POST /todos or /todos/batch result is replayed for retries with the same Idempotency-Key"
+  type        = number
+  default     = 24
+}
+
+variable "todo_archive_after_days" {
+  description = "Days a todo must have been completed and unchanged before the archive job moves it to S3"
+  type        = number
+  default     = 90
+}
+
 variable "api_gateway_caching_enabled" {
   description = "Enable caching for API Gateway"
   type        = bool
@@ -144,6 +191,58 @@ variable "dynamodb_billing_mode" {
   }
 }
 
+variable "dynamodb_data_access_mode" {
+  description = "Read path used by the todos Lambda: resource (boto3 Table) or client (low-level client with direct wire decoding)"
+  type        = string
+  default     = "resource"
+  
+  validation {
+    condition     = contains(["resource", "client"], var.dynamodb_data_access_mode)
+    error_message = "Data access mode must be resource or client."
+  }
+}
+
+variable "dynamodb_compact_schema" {
+  description = "Write todos with short attribute names, epoch timestamps and priority codes (both schemas are always read)"
+  type        = bool
+  default     = false
+}
+
+variable "dynamodb_rank_index" {
+  description = "Create the user_id+rank local secondary index for manual ordering; changing it replaces the todos table"
+  type        = bool
+  default     = false
+}
+
+variable "dynamodb_open_due_index_enabled" {
+  description = "Serve GET /todos/due from the sparse open-due index; enable after admin_scan.py --transform backfill-open-due"
+  type        = bool
+  default     = false
+}
+
+variable "dynamodb_sharded_users" {
+  description = "Cognito user ids (sub) whose todos are write-sharded across several partitions"
+  type        = list(string)
+  default     = []
+}
+
+variable "dynamodb_resharding_users" {
+  description = "Newly sharded users whose todos admin_scan.py --transform reshard is still moving; reads also check their unsharded partition"
+  type        = list(string)
+  default     = []
+}
+
+variable "dynamodb_shard_count" {
+  description = "Partitions per sharded user; changing it requires resharding their todos with admin_scan.py"
+  type        = number
+  default     = 8
+  
+  validation {
+    condition     = var.dynamodb_shard_count >= 2 && var.dynamodb_shard_count <= 64
+    error_message = "Shard count must be between 2 and 64."
+  }
+}
+
 variable "dynamodb_read_capacity" {
   description = "Read capacity units for DynamoDB (only used with PROVISIONED billing)"
   type        = number